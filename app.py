@@ -3,8 +3,10 @@ from app import create_app, db
 from app.models import User, Dive, Site, Review, Share
 import click
 from flask.cli import with_appcontext
+from config import Config, DevelopmentConfig
 
-app = create_app()
+# Run directly, this is the debug server; `flask run` and WSGI servers use Config
+app = create_app(DevelopmentConfig if __name__ == '__main__' else Config)
 
 @app.shell_context_processor
 def make_shell_context():
@@ -1,20 +1,38 @@
 import os
+import click
 import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
 from flask_wtf.csrf import CSRFProtect
-from logging.handlers import RotatingFileHandler
 from config import Config
 from flask_cors import CORS
+from app.caching import ResponseCache
+from app.media import MediaStore
+from app.assets import Assets
+from app.fragments import FragmentCache
+from app.user_cache import UserCache
+from app.passwords import PasswordHasher
+from app.ratelimit import RateLimiter
+from app.lifecycle import Lifecycle
+from app.logs import LogPipeline
+from app.database import configure_engines, tune_engines, prepare_schema, RoutingSession, ReplicaRouter
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager.login_message_category = 'info'
 csrf = CSRFProtect()
+cache = ResponseCache()
+media_store = MediaStore()
+assets = Assets()
+fragments = FragmentCache()
+user_cache = UserCache()
+passwords = PasswordHasher()
+limiter = RateLimiter()
+replicas = ReplicaRouter()
+lifecycle = Lifecycle()
+logs = LogPipeline()
 
 logger = logging.getLogger(__name__)
 
@@ -22,11 +40,26 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
+    # Logging first, so everything after it goes through the log queue
+    logs.init_app(app)
+    
     # Initialize extensions
+    configure_engines(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    tune_engines(app, db)
+    replicas.init_app(app)
+    init_migrations(app)
     login_manager.init_app(app)
+    # Rate limits are checked before CSRFProtect reads (and buffers) request bodies
+    limiter.init_app(app)
     csrf.init_app(app)
+    cache.init_app(app)
+    media_store.init_app(app)
+    assets.init_app(app)
+    fragments.init_app(app)
+    user_cache.init_app(app)
+    passwords.init_app(app)
+    lifecycle.init_app(app)
     
     # Set up CORS for API routes in development
     if app.debug:
@@ -63,17 +96,30 @@ def create_app(config_class=Config):
     from app.shark import shark_bp
     app.register_blueprint(shark_bp)
     
+    from app.health import health_bp
+    app.register_blueprint(health_bp)
+    
     # Register dev blueprints only in development
     if app.debug:
         from app.dev import dev_bp
         app.register_blueprint(dev_bp, url_prefix="/dev")
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
-        logger.info("Database tables created or confirmed to exist")
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
+    # Create or check tables according to DB_SCHEMA_MODE
+    prepare_schema(app, db)
     
     return app
 
+def init_migrations(app):
+    # Flask-Migrate imports Alembic, Mako and Pygments, which only the
+    # `flask db` commands need; skip it when a server or test builds the app
+    if click.get_current_context(silent=True) is None:
+        return
+    from flask_migrate import Migrate
+    Migrate(app, db, directory=app.config['DB_MIGRATIONS_DIR'])
+
 # Import models here to avoid circular imports
 from app import models 
@@ -5,7 +5,7 @@ from flask import Blueprint
 bp = Blueprint('api', __name__, url_prefix='/api')
 
 # Import routes at the bottom to avoid circular imports
-from app.api import routes, auth, users, shared_routes, species
+from app.api import routes, auth, users, shared_routes, species, stats
 
 # Register shared routes blueprint
 from app.api.shared_routes import api_shared_bp
@@ -1,9 +1,9 @@
 from flask import jsonify, request, current_app, url_for
 from flask_login import login_user, logout_user, current_user
-from werkzeug.security import generate_password_hash
-from app import db
+from app import db, passwords, limiter
 from app.api import bp
 from app.models import User
+from app.passwords import PasswordVerifyBusy
 from datetime import datetime, timedelta
 import secrets
 import jwt
@@ -39,6 +39,7 @@ def require_json(f):
 
 # Register a new user
 @bp.route('/auth/register', methods=['POST'])
+@limiter.limit('register', key='ip')
 @require_json
 def register():
     try:
@@ -47,19 +48,16 @@ def register():
         
         data = request.json
         
-        # Log incoming request
-        current_app.logger.info(f"Registration attempt with data: {data}")
-        
         # Validate required fields
         required_fields = ['username', 'email', 'password']
         for field in required_fields:
             if field not in data:
-                current_app.logger.warning(f"Missing required field: {field}")
+                current_app.logger.warning("Missing required field: %s", field)
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
         # Validate email format
         if not is_valid_email(data['email']):
-            current_app.logger.warning(f"Invalid email format: {data['email']}")
+            current_app.logger.warning("Invalid email format: %s", data['email'])
             return jsonify({"error": "Invalid email format"}), 400
         
         # Validate password strength
@@ -69,25 +67,22 @@ def register():
         
         # Check if user already exists
         if User.query.filter_by(username=data['username']).first():
-            current_app.logger.warning(f"Username already exists: {data['username']}")
+            current_app.logger.warning("Username already exists: %s", data['username'])
             return jsonify({"error": "Username already exists"}), 400
         
         if User.query.filter_by(email=data['email']).first():
-            current_app.logger.warning(f"Email already registered: {data['email']}")
+            current_app.logger.warning("Email already registered: %s", data['email'])
             return jsonify({"error": "Email already registered"}), 400
         
         # Create new user
         try:
-            current_app.logger.info("Creating user object")
-            
             # Handle date of birth parsing safely
             dob = None
             if data.get('dob'):
                 try:
                     dob = datetime.strptime(data.get('dob'), '%Y-%m-%d').date()
-                    current_app.logger.info(f"Parsed DOB: {dob}")
                 except Exception as date_error:
-                    current_app.logger.warning(f"Failed to parse date of birth: {date_error}")
+                    current_app.logger.warning("Failed to parse date of birth: %s", date_error)
                     # Continue with None value for dob
             
             user = User(
@@ -101,14 +96,10 @@ def register():
                 avatar=data.get('avatar', ''),
                 status='active'
             )
-            current_app.logger.info("Setting password")
             user.set_password(data['password'])
-            
-            current_app.logger.info("Adding user to database session")
             db.session.add(user)
-            current_app.logger.info("Committing to database")
             db.session.commit()
-            current_app.logger.info(f"User registered successfully: {user.username} (ID: {user.id})")
+            current_app.logger.info("User registered: %s (ID: %s)", user.username, user.id)
             return jsonify({
                 "message": "User registered successfully",
                 "user_id": user.id,
@@ -116,14 +107,15 @@ def register():
             }), 201
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Database error: {str(e)}")
+            current_app.logger.error("Database error: %s", e)
             return jsonify({"error": str(e)}), 500
     except Exception as e:
-        current_app.logger.error(f"Unhandled exception in registration: {str(e)}", exc_info=True)
+        current_app.logger.error("Unhandled exception in registration: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 # User login
 @bp.route('/auth/login', methods=['POST'])
+@limiter.limit('login', key='ip')
 @require_json
 def login():
     if current_user.is_authenticated:
@@ -139,13 +131,32 @@ def login():
     user = User.query.filter_by(email=data['email']).first()
     
     # Check user exists and password is correct
-    if user is None or not user.check_password(data['password']):
-        return jsonify({"error": "Invalid email or password"}), 401
+    try:
+        if user is None or not user.check_password(data['password']):
+            return jsonify({"error": "Invalid email or password"}), 401
+    except PasswordVerifyBusy:
+        current_app.logger.warning("Password verify pool is full, rejecting login")
+        response = jsonify({"error": "Too many login attempts in progress, please try again shortly"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
     
     # Check if account is active
     if user.status != 'active':
         return jsonify({"error": "Account is deactivated"}), 403
     
+    # Upgrade hashes made under an older hashing policy
+    if passwords.needs_rehash(user.password_hash):
+        try:
+            user.password_hash = passwords.rehash(data['password'])
+            db.session.commit()
+            current_app.logger.info("Rehashed password for user %s", user.id)
+        except PasswordVerifyBusy:
+            # The old hash still works; it is upgraded on a later login
+            current_app.logger.info("Password pool is busy, not rehashing for user %s", user.id)
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.warning("Failed to rehash password for user %s: %s", user.id, e)
+    
     # Log in the user
     login_user(user, remember=data.get('remember', False))
     
@@ -191,6 +202,7 @@ def verify_reset_token(token):
 
 # Forgot password - request reset link
 @bp.route('/auth/forgot-password', methods=['POST'])
+@limiter.limit('forgot-password', key='ip')
 @require_json
 def forgot_password():
     data = request.json
@@ -1,28 +1,20 @@
-from flask import jsonify, request, current_app
+from flask import jsonify, current_app
 from app.api import bp
 from app.models import Dive, Share
 from app import db
-from flask_wtf.csrf import validate_csrf, CSRFError
+from app.shared.routes import SHARE_LINK_SCHEMA
+from app.validation import validated
 from datetime import datetime, timedelta
 import secrets
 
 @bp.route('/shared/dives/<int:dive_id>/share', methods=['POST'])
-def create_share_link(dive_id):
+@validated(SHARE_LINK_SCHEMA)
+def create_share_link(dive_id, data):
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            try:
-                validate_csrf(token)
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
-                
         dive = Dive.query.get_or_404(dive_id)
         token = secrets.token_urlsafe(32)
         
         # Get expiration setting from request
-        data = request.get_json()
         expiration_days = data.get('expiration_days') if data else 7
         
         # Calculate expiration time (None if never expires)
@@ -52,6 +44,6 @@ def create_share_link(dive_id):
             "created_at": share.created_at.isoformat()
         }), 201
     except Exception as e:
-        current_app.logger.error(f"Error creating share link: {str(e)}", exc_info=True)
+        current_app.logger.error("Error creating share link: %s", e, exc_info=True)
         db.session.rollback()
         return jsonify({"error": str(e)}), 500 
\ No newline at end of file
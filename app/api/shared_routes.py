@@ -1,27 +1,20 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, jsonify, current_app
 from app.models import Dive, Share, User
 from app import db
-from flask_wtf.csrf import validate_csrf, CSRFError
 from datetime import datetime, timedelta
 import secrets
 from flask_login import current_user, login_required
+from app.shared.routes import SHARE_LINK_SCHEMA, SHARE_WITH_USER_SCHEMA
+from app.validation import validated
 
 api_shared_bp = Blueprint('api_shared', __name__)
 
 # API route to create a share link
 @api_shared_bp.route('/dives/<int:dive_id>/share', methods=['POST'])
 @login_required
-def api_create_share_link(dive_id):
+@validated(SHARE_LINK_SCHEMA)
+def api_create_share_link(dive_id, data):
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            try:
-                validate_csrf(token)
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
-                
         dive = Dive.query.get_or_404(dive_id)
         
         # Ensure dive belongs to current user
@@ -31,7 +24,6 @@ def api_create_share_link(dive_id):
         token = secrets.token_urlsafe(32)
         
         # Get expiration setting from request
-        data = request.get_json()
         expiration_days = data.get('expiration_days') if data else 7
         
         # Calculate expiration time (None if never expires)
@@ -61,32 +53,23 @@ def api_create_share_link(dive_id):
             "created_at": share.created_at.isoformat()
         }), 201
     except Exception as e:
-        current_app.logger.error(f"Error creating share link: {str(e)}", exc_info=True)
+        current_app.logger.error("Error creating share link: %s", e, exc_info=True)
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
         
 # API route to share dive with specific user
 @api_shared_bp.route('/dives/<int:dive_id>/share-with-user', methods=['POST'])
 @login_required
-def api_share_with_user(dive_id):
+@validated(SHARE_WITH_USER_SCHEMA)
+def api_share_with_user(dive_id, data):
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            try:
-                validate_csrf(token)
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
-                
         dive = Dive.query.get_or_404(dive_id)
         
         # Ensure dive belongs to current user
         if dive.user_id != current_user.id:
             return jsonify({"error": "You can only share your own dives"}), 403
             
-        data = request.get_json()
-        recipient = data.get('username')
+        recipient = data['username'].strip()
         
         if not recipient:
             return jsonify({"error": "Username or email is required"}), 400
@@ -97,14 +80,14 @@ def api_share_with_user(dive_id):
         # Find user to share with
         if is_email:
             shared_with_user = User.query.filter_by(email=recipient).first()
-            current_app.logger.info(f"Searching for user by email: {recipient}, found: {shared_with_user is not None}")
+            current_app.logger.info("Searching for user by email: %s, found: %s", recipient, shared_with_user is not None)
         else:
             shared_with_user = User.query.filter_by(username=recipient).first()
-            current_app.logger.info(f"Searching for user by username: {recipient}, found: {shared_with_user is not None}")
+            current_app.logger.info("Searching for user by username: %s, found: %s", recipient, shared_with_user is not None)
         
         if not shared_with_user:
             # Return a specific 404 response for user not found
-            current_app.logger.warning(f"User not found: {recipient}")
+            current_app.logger.warning("User not found: %s", recipient)
             return jsonify({"error": f"User with {'email' if is_email else 'username'} {recipient} not found"}), 404
             
         # Check if already shared with this user
@@ -143,6 +126,6 @@ def api_share_with_user(dive_id):
             "created_at": share.created_at.isoformat()
         }), 201
     except Exception as e:
-        current_app.logger.error(f"Error sharing dive with user: {str(e)}", exc_info=True)
+        current_app.logger.error("Error sharing dive with user: %s", e, exc_info=True)
         db.session.rollback()
         return jsonify({"error": str(e)}), 500 
\ No newline at end of file
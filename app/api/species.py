@@ -1,14 +1,15 @@
 from flask import request, jsonify, current_app
 from flask_login import login_required, current_user
-from app import db
-from app.models import DiveSpecies, Dive
-import requests
+from app import db, limiter
+from app.models import DiveSpecies, Dive, Site
+from app.services import occurrence, sightings
 from flask import Blueprint
 
 species_api = Blueprint('species', __name__)
 
 # Helper: iNaturalist API search function
 def inat_search(q, n=10, locale="en"):
+    import requests  # deferred: only searches need it, and it is slow to import
     url = "https://api.inaturalist.org/v1/taxa"
     try:
         r = requests.get(url, params={"q": q, "rank": "species",
@@ -24,12 +25,13 @@ def inat_search(q, n=10, locale="en"):
             })
         return results
     except Exception as e:
-        current_app.logger.error(f"Error searching iNaturalist API: {str(e)}", exc_info=True)
+        current_app.logger.error("Error searching iNaturalist API: %s", e, exc_info=True)
         return []
 
 # Search for species on iNaturalist API
 @species_api.route('/search', methods=['GET'])
 @login_required
+@limiter.limit('search')
 def search_species():
     query = request.args.get('q', '')
     limit = request.args.get('limit', 10, type=int)
@@ -42,7 +44,7 @@ def search_species():
         results = inat_search(query, limit, locale)
         return jsonify(results), 200
     except Exception as e:
-        current_app.logger.error(f"Error in species search: {str(e)}", exc_info=True)
+        current_app.logger.error("Error in species search: %s", e, exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 # Add a species to a dive log
@@ -60,6 +62,9 @@ def add_species_to_dive(dive_id):
         if not data:
             return jsonify({"error": "No input data provided"}), 400
         
+        if DiveSpecies.query.filter_by(dive_id=dive_id, taxon_id=data['taxon_id']).first():
+            return jsonify({"error": "Species is already logged for this dive"}), 409
+        
         # Create new species entry
         species = DiveSpecies(
             dive_id=dive_id,
@@ -71,6 +76,7 @@ def add_species_to_dive(dive_id):
         )
         
         db.session.add(species)
+        occurrence.add_sighting(dive, species)
         db.session.commit()
         
         return jsonify(species.to_dict()), 201
@@ -78,7 +84,42 @@ def add_species_to_dive(dive_id):
         return jsonify({"error": f"Missing required field: {e.args[0]}"}), 400
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error adding species to dive {dive_id}: {str(e)}", exc_info=True)
+        current_app.logger.error("Error adding species to dive %s: %s", dive_id, e, exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+# Add, update and remove several species on a dive in one transaction
+#
+# Body: {"species": [{taxon_id, scientific_name, common_name, rank, notes}, ...],
+#        "remove": [taxon_id, ...], "replace": false}
+# Listed taxa are inserted or updated in place; with "replace" any taxon not
+# listed is removed as well. Returns the dive's resulting species list.
+@species_api.route('/dive/<int:dive_id>/species/batch', methods=['POST'])
+@login_required
+def batch_dive_species(dive_id):
+    # Check if dive exists and belongs to the current user
+    dive = Dive.query.get_or_404(dive_id)
+    if dive.user_id != current_user.id:
+        return jsonify({"error": "Unauthorized"}), 403
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "No input data provided"}), 400
+    
+    try:
+        wanted, remove_ids = sightings.parse_batch(data.get('species', []), data.get('remove', []))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    try:
+        result = sightings.apply_batch(dive, wanted, remove_ids, replace=bool(data.get('replace')))
+        db.session.commit()
+        return jsonify([s.to_dict() for s in result]), 200
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Error updating species batch for dive %s: %s", dive_id, e, exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 # Get all species for a dive
@@ -94,7 +135,7 @@ def get_dive_species(dive_id):
         species = DiveSpecies.query.filter_by(dive_id=dive_id).all()
         return jsonify([s.to_dict() for s in species]), 200
     except Exception as e:
-        current_app.logger.error(f"Error fetching species for dive {dive_id}: {str(e)}", exc_info=True)
+        current_app.logger.error("Error fetching species for dive %s: %s", dive_id, e, exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 # Delete a species from a dive
@@ -111,11 +152,39 @@ def delete_dive_species(dive_id, species_id):
         if species.dive_id != dive_id:
             return jsonify({"error": "Species not found in this dive"}), 404
         
+        occurrence.remove_sighting(dive, species)
         db.session.delete(species)
         db.session.commit()
         
         return '', 204
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error deleting species {species_id} from dive {dive_id}: {str(e)}", exc_info=True)
-        return jsonify({"error": str(e)}), 500 
\ No newline at end of file
+        current_app.logger.error("Error deleting species %s from dive %s: %s", species_id, dive_id, e, exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+# Most observed species at a location (by name or site id), optionally for one month
+@species_api.route('/occurrence', methods=['GET'])
+@login_required
+def get_species_occurrence():
+    location = request.args.get('location')
+    site_id = request.args.get('site_id', type=int)
+    month = request.args.get('month', 0, type=int)
+    limit = request.args.get('limit', 10, type=int)
+
+    if site_id is not None:
+        site = Site.query.get_or_404(site_id)
+        location = site.name
+    if not location:
+        return jsonify({"error": "location or site_id is required"}), 400
+    if month < 0 or month > 12:
+        return jsonify({"error": "month must be between 1 and 12 (0 for all months)"}), 400
+
+    try:
+        return jsonify({
+            "location": occurrence.location_cell(location),
+            "month": month,
+            "species": occurrence.top_species(location, month, limit)
+        }), 200
+    except Exception as e:
+        current_app.logger.error("Error fetching species occurrence for %s: %s", location, e, exc_info=True)
+        return jsonify({"error": str(e)}), 500
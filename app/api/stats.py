@@ -1,101 +1,128 @@
-from flask import jsonify, request
+from flask import jsonify, request, current_app
 from flask_login import login_required, current_user
-from app import db
+from app import db, cache
 from app.api import bp
-from app.models import User, Dive
+from app.models import Dive, DiveSpecies
+from app.services import stats as stats_service
+from app.services import species as species_service
 from datetime import datetime, timedelta, date
 from functools import wraps
 from sqlalchemy import func, extract
+from app.etag import conditional, collection_stamp
 import calendar
-import traceback
+
+# Version stamp shared by every per-user stats endpoint
+def user_dives_stamp(user_id):
+    return ('user_dives', user_id) + collection_stamp(Dive, Dive.user_id == user_id)
+
+# Version stamps for the current user's own stats page datasets
+def own_dives_stamp(user_id):
+    if not current_user.is_authenticated or current_user.id != user_id:
+        return None
+    return user_dives_stamp(user_id)
+
+# Species datasets group sightings by their dive's date and location, so they
+# change with either the user's dives or the sightings themselves
+def own_species_stamp(user_id):
+    if not current_user.is_authenticated or current_user.id != user_id:
+        return None
+    species = db.session.query(
+        func.count(DiveSpecies.id), func.max(DiveSpecies.id), func.max(DiveSpecies.updated_at)
+    ).join(Dive, Dive.id == DiveSpecies.dive_id).filter(Dive.user_id == user_id).one()
+    return user_dives_stamp(user_id) + ('user_species',) + tuple(species)
+
+# Compute the summary statistics payload for a user
+def user_stats_payload(user_id):
+    # Get user's dives
+    dives = Dive.query.filter_by(user_id=user_id).all()
+    
+    # Calculate statistics
+    total_dives = len(dives)
+    
+    if total_dives == 0:
+        return {
+            "total_dives": 0,
+            "total_dive_time_minutes": 0,
+            "average_dive_time_minutes": 0,
+            "max_depth": 0,
+            "average_depth": 0,
+            "most_recent_dive": None
+        }
+    
+    total_dive_time = sum((dive.end_time - dive.start_time).total_seconds() / 60 for dive in dives)
+    average_dive_time = total_dive_time / total_dives
+    
+    max_depth = max(dive.max_depth for dive in dives)
+    average_depth = sum(dive.max_depth for dive in dives) / total_dives
+    
+    # Get the most recent dive
+    most_recent_dive = max(dives, key=lambda dive: dive.start_time)
+    most_recent_dive_data = {
+        "id": most_recent_dive.id,
+        "date": most_recent_dive.start_time.strftime('%Y-%m-%d'),
+        "location": most_recent_dive.location,
+        "max_depth": most_recent_dive.max_depth,
+        "dive_time_minutes": round((most_recent_dive.end_time - most_recent_dive.start_time).total_seconds() / 60, 2)
+    }
+    
+    return {
+        "total_dives": total_dives,
+        "total_dive_time_minutes": round(total_dive_time, 2),
+        "average_dive_time_minutes": round(average_dive_time, 2),
+        "max_depth": max_depth,
+        "average_depth": round(average_depth, 2),
+        "most_recent_dive": most_recent_dive_data
+    }
 
 # User statistics endpoint
 @bp.route('/users/<int:user_id>/stats', methods=['GET'])
+@login_required
+@conditional(own_dives_stamp, per_user=True)
 def get_user_stats(user_id):
+    if user_id != current_user.id:
+        return jsonify({"error": "You can only view your own statistics"}), 403
     try:
-        # Find the user
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({"error": "User not found"}), 404
-        
-        # Get user's dives
-        dives = Dive.query.filter_by(user_id=user_id).all()
-        
-        # Calculate statistics
-        total_dives = len(dives)
         
-        if total_dives == 0:
-            return jsonify({
-                "total_dives": 0,
-                "total_dive_time_minutes": 0,
-                "average_dive_time_minutes": 0,
-                "max_depth": 0,
-                "average_depth": 0,
-                "most_recent_dive": None
-            }), 200
-        
-        total_dive_time = sum((dive.end_time - dive.start_time).total_seconds() / 60 for dive in dives)
-        average_dive_time = total_dive_time / total_dives
-        
-        max_depth = max(dive.max_depth for dive in dives)
-        average_depth = sum(dive.max_depth for dive in dives) / total_dives
-        
-        # Get the most recent dive
-        most_recent_dive = max(dives, key=lambda dive: dive.start_time)
-        most_recent_dive_data = {
-            "id": most_recent_dive.id,
-            "date": most_recent_dive.start_time.strftime('%Y-%m-%d'),
-            "location": most_recent_dive.location,
-            "max_depth": most_recent_dive.max_depth,
-            "dive_time_minutes": round((most_recent_dive.end_time - most_recent_dive.start_time).total_seconds() / 60, 2)
-        }
-        
-        return jsonify({
-            "total_dives": total_dives,
-            "total_dive_time_minutes": round(total_dive_time, 2),
-            "average_dive_time_minutes": round(average_dive_time, 2),
-            "max_depth": max_depth,
-            "average_depth": round(average_depth, 2),
-            "most_recent_dive": most_recent_dive_data
-        }), 200
+        payload = cache.cached_for_user(user_id, 'stats', lambda: user_stats_payload(user_id))
+        return jsonify(payload), 200
     except Exception as e:
-        print(f"Error in get_user_stats: {str(e)}")
-        traceback.print_exc()
-        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+        current_app.logger.error("Error in get_user_stats: %s", e, exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+# Compute the depth/time series for a user
+def depth_time_payload(user_id):
+    # Get user's dives, ordered by start_time
+    dives = Dive.query.filter_by(user_id=user_id).order_by(Dive.start_time).all()
+    
+    chart_data = []
+    for dive in dives:
+        dive_time_minutes = (dive.end_time - dive.start_time).total_seconds() / 60
+        
+        chart_data.append({
+            "dive_id": dive.id,
+            "dive_number": dive.dive_number,
+            "date": dive.start_time.strftime('%Y-%m-%d'),
+            "location": dive.location,
+            "max_depth": dive.max_depth,
+            "dive_time_minutes": round(dive_time_minutes, 2)
+        })
+    
+    return {"data": chart_data}
 
 # Depth-time chart data endpoint
 @bp.route('/users/<int:user_id>/depth-time-chart', methods=['GET'])
+@login_required
+@conditional(own_dives_stamp, per_user=True)
 def get_depth_time_chart(user_id):
+    if user_id != current_user.id:
+        return jsonify({"error": "You can only view your own statistics"}), 403
     try:
-        # Find the user
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({"error": "User not found"}), 404
-        
-        # Get user's dives, ordered by start_time
-        dives = Dive.query.filter_by(user_id=user_id).order_by(Dive.start_time).all()
-        
-        if not dives:
-            return jsonify({"data": []}), 200
-        
-        chart_data = []
-        for dive in dives:
-            dive_time_minutes = (dive.end_time - dive.start_time).total_seconds() / 60
-            
-            chart_data.append({
-                "dive_id": dive.id,
-                "dive_number": dive.dive_number,
-                "date": dive.start_time.strftime('%Y-%m-%d'),
-                "location": dive.location,
-                "max_depth": dive.max_depth,
-                "dive_time_minutes": round(dive_time_minutes, 2)
-            })
         
-        return jsonify({"data": chart_data}), 200
+        payload = cache.cached_for_user(user_id, 'depth_time', lambda: depth_time_payload(user_id))
+        return jsonify(payload), 200
     except Exception as e:
-        print(f"Error in get_depth_time_chart: {str(e)}")
-        traceback.print_exc()
-        return jsonify({"error": "Internal server error", "details": str(e)}), 500
+        current_app.logger.error("Error in get_depth_time_chart: %s", e, exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
 
 # Helper function to get week number and start/end dates
 def get_week_bounds(year, week_number):
@@ -121,14 +148,87 @@ def get_week_bounds(year, week_number):
     
     return start_date, end_date
 
+# Count dives per month for a user and year
+def monthly_frequency_payload(user_id, year):
+    # Query database to count dives by month for the specified year
+    monthly_counts = db.session.query(
+        extract('month', Dive.start_time).label('month'),
+        func.count(Dive.id).label('count')
+    ).filter(
+        Dive.user_id == user_id,
+        extract('year', Dive.start_time) == year
+    ).group_by(
+        extract('month', Dive.start_time)
+    ).all()
+    
+    # Initialize all months with zero counts
+    result = {month: 0 for month in range(1, 13)}
+    
+    # Update with actual counts
+    for month, count in monthly_counts:
+        result[int(month)] = count
+    
+    # Format response with month names
+    formatted_result = [
+        {"month": calendar.month_name[month], "count": count} 
+        for month, count in result.items()
+    ]
+    
+    return {
+        "period": "monthly",
+        "year": year,
+        "data": formatted_result
+    }
+
+# Count dives per ISO week for a user and year
+def weekly_frequency_payload(user_id, year):
+    # Query database to get all dives in the specified year
+    dives = Dive.query.filter(
+        Dive.user_id == user_id,
+        extract('year', Dive.start_time) == year
+    ).all()
+    
+    # Count dives by ISO week number
+    weekly_counts = {}
+    for dive in dives:
+        # isocalendar() returns (year, week_number, weekday)
+        week_number = dive.start_time.isocalendar()[1]
+        if week_number not in weekly_counts:
+            weekly_counts[week_number] = 0
+        weekly_counts[week_number] += 1
+    
+    # Determine max week number for the year
+    # A year can have 52 or 53 ISO weeks
+    max_week = 53 if date(year, 12, 31).isocalendar()[1] == 53 else 52
+    
+    # Initialize all weeks with zero counts and add date ranges
+    result = []
+    for week in range(1, max_week + 1):
+        # Get start and end dates for the week
+        start_date, end_date = get_week_bounds(year, week)
+        
+        date_range = f"{start_date.strftime('%b %d')} - {end_date.strftime('%b %d')}"
+        
+        result.append({
+            "week": week,
+            "date_range": date_range,
+            "count": weekly_counts.get(week, 0)
+        })
+    
+    return {
+        "period": "weekly",
+        "year": year,
+        "data": result
+    }
+
 # Frequency chart data endpoint
 @bp.route('/users/<int:user_id>/frequency-chart', methods=['GET'])
+@login_required
+@conditional(own_dives_stamp, per_user=True)
 def get_frequency_chart(user_id):
+    if user_id != current_user.id:
+        return jsonify({"error": "You can only view your own statistics"}), 403
     try:
-        # Find the user
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({"error": "User not found"}), 404
         
         # Get period and year from query parameters (default to monthly and current year)
         period = request.args.get('period', 'monthly')
@@ -142,78 +242,12 @@ def get_frequency_chart(user_id):
         if period not in ['monthly', 'weekly', 'daily']:
             return jsonify({"error": "Period must be one of: monthly, weekly, daily"}), 400
         
-        # Monthly frequency
         if period == 'monthly':
-            # Query database to count dives by month for the specified year
-            monthly_counts = db.session.query(
-                extract('month', Dive.start_time).label('month'),
-                func.count(Dive.id).label('count')
-            ).filter(
-                Dive.user_id == user_id,
-                extract('year', Dive.start_time) == year
-            ).group_by(
-                extract('month', Dive.start_time)
-            ).all()
-            
-            # Initialize all months with zero counts
-            result = {month: 0 for month in range(1, 13)}
-            
-            # Update with actual counts
-            for month, count in monthly_counts:
-                result[int(month)] = count
-            
-            # Format response with month names
-            formatted_result = [
-                {"month": calendar.month_name[month], "count": count} 
-                for month, count in result.items()
-            ]
-            
-            return jsonify({
-                "period": "monthly",
-                "year": year,
-                "data": formatted_result
-            }), 200
-        
-        # Weekly frequency
+            payload = cache.cached_for_user(user_id, 'frequency', lambda: monthly_frequency_payload(user_id, year), period, year)
+            return jsonify(payload), 200
         elif period == 'weekly':
-            # Query database to get all dives in the specified year
-            dives = Dive.query.filter(
-                Dive.user_id == user_id,
-                extract('year', Dive.start_time) == year
-            ).all()
-            
-            # Count dives by ISO week number
-            weekly_counts = {}
-            for dive in dives:
-                # isocalendar() returns (year, week_number, weekday)
-                week_number = dive.start_time.isocalendar()[1]
-                if week_number not in weekly_counts:
-                    weekly_counts[week_number] = 0
-                weekly_counts[week_number] += 1
-            
-            # Determine max week number for the year
-            # A year can have 52 or 53 ISO weeks
-            max_week = 53 if date(year, 12, 31).isocalendar()[1] == 53 else 52
-            
-            # Initialize all weeks with zero counts and add date ranges
-            result = []
-            for week in range(1, max_week + 1):
-                # Get start and end dates for the week
-                start_date, end_date = get_week_bounds(year, week)
-                
-                date_range = f"{start_date.strftime('%b %d')} - {end_date.strftime('%b %d')}"
-                
-                result.append({
-                    "week": week,
-                    "date_range": date_range,
-                    "count": weekly_counts.get(week, 0)
-                })
-            
-            return jsonify({
-                "period": "weekly",
-                "year": year,
-                "data": result
-            }), 200
+            payload = cache.cached_for_user(user_id, 'frequency', lambda: weekly_frequency_payload(user_id, year), period, year)
+            return jsonify(payload), 200
         
         # Daily frequency not yet implemented
         return jsonify({
@@ -222,6 +256,100 @@ def get_frequency_chart(user_id):
             "error": f"{period} period not yet implemented"
         }), 501
     except Exception as e:
-        print(f"Error in get_frequency_chart: {str(e)}")
-        traceback.print_exc()
-        return jsonify({"error": "Internal server error", "details": str(e)}), 500 
\ No newline at end of file
+        current_app.logger.error("Error in get_frequency_chart: %s", e, exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500 
+
+# Serve one stats page dataset for the current user through the cache
+def dataset_response(user_id, name, builder, *parts):
+    if user_id != current_user.id:
+        return jsonify({"error": "You can only view your own statistics"}), 403
+    try:
+        payload = cache.cached_for_user(user_id, name, lambda: builder(user_id), *parts)
+        return jsonify(payload), 200
+    except Exception as e:
+        current_app.logger.error("Error building %s dataset for user %s: %s", name, user_id, e, exc_info=True)
+        return jsonify({"error": "Internal server error"}), 500
+
+# Stats page: header cards
+@bp.route('/users/<int:user_id>/summary', methods=['GET'])
+@login_required
+@conditional(own_dives_stamp, per_user=True)
+def get_stats_summary(user_id):
+    return dataset_response(user_id, 'summary', stats_service.summary)
+
+# Stats page: depth and duration over time
+@bp.route('/users/<int:user_id>/timeline', methods=['GET'])
+@login_required
+@conditional(own_dives_stamp, per_user=True)
+def get_stats_timeline(user_id):
+    return dataset_response(user_id, 'timeline', stats_service.timeline)
+
+# Stats page: dives per calendar month
+@bp.route('/users/<int:user_id>/monthly', methods=['GET'])
+@login_required
+@conditional(own_dives_stamp, per_user=True)
+def get_stats_monthly(user_id):
+    return dataset_response(user_id, 'monthly', stats_service.monthly)
+
+# Stats page: location chart and heatmap points
+@bp.route('/users/<int:user_id>/locations', methods=['GET'])
+@login_required
+@conditional(own_dives_stamp, per_user=True)
+def get_stats_locations(user_id):
+    return dataset_response(user_id, 'locations', stats_service.locations)
+
+# Stats page: species pie chart
+@bp.route('/users/<int:user_id>/species-chart', methods=['GET'])
+@login_required
+@conditional(own_species_stamp, per_user=True)
+def get_stats_species_chart(user_id):
+    return dataset_response(user_id, 'species_chart', stats_service.species_chart)
+
+# Stats page: top species with images (calls iNaturalist on a cache miss)
+@bp.route('/users/<int:user_id>/top-species', methods=['GET'])
+@login_required
+@conditional(own_species_stamp, per_user=True)
+def get_stats_top_species(user_id):
+    return dataset_response(user_id, 'top_species', stats_service.top_species)
+
+# Life list: every taxon the user has logged, paginated
+@bp.route('/users/<int:user_id>/species/life-list', methods=['GET'])
+@login_required
+@conditional(own_species_stamp, per_user=True)
+def get_life_list(user_id):
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    sort = request.args.get('sort', 'first_seen')
+    if sort not in ('first_seen', 'count', 'name'):
+        return jsonify({"error": "sort must be one of: first_seen, count, name"}), 400
+    return dataset_response(
+        user_id, 'life_list',
+        lambda uid: species_service.life_list(uid, page, per_page, sort),
+        page, per_page, sort
+    )
+
+# Sightings per taxon and dive location, paginated
+@bp.route('/users/<int:user_id>/species/by-site', methods=['GET'])
+@login_required
+@conditional(own_species_stamp, per_user=True)
+def get_species_by_site(user_id):
+    taxon_id = request.args.get('taxon_id', type=int)
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    return dataset_response(
+        user_id, 'species_by_site',
+        lambda uid: species_service.sightings_by_site(uid, taxon_id, page, per_page),
+        taxon_id, page, per_page
+    )
+
+# Sightings per calendar month
+@bp.route('/users/<int:user_id>/species/by-month', methods=['GET'])
+@login_required
+@conditional(own_species_stamp, per_user=True)
+def get_species_by_month(user_id):
+    taxon_id = request.args.get('taxon_id', type=int)
+    return dataset_response(
+        user_id, 'species_by_month',
+        lambda uid: species_service.sightings_by_month(uid, taxon_id),
+        taxon_id
+    )
@@ -1,6 +1,6 @@
 from flask import jsonify, request, g, current_app
 from flask_login import login_required, current_user
-from app import db
+from app import db, limiter
 from app.api import bp
 from app.models import User
 from datetime import datetime
@@ -114,6 +114,7 @@ def deactivate_account():
 
 @bp.route('/users/search', methods=['GET'])
 @login_required
+@limiter.limit('search')
 def search_users():
     """Search for users by username or email (partial match)"""
     query = request.args.get('q', '')
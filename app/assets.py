@@ -0,0 +1,209 @@
+# Static asset pipeline
+#
+# `flask assets-build`, run as a deploy step, copies every stylesheet, script
+# and image under app/static (plus the per-page bundles below) to
+# app/static/dist with a content hash in its file name, next to pre-compressed
+# gzip and brotli copies, and writes manifest.json. Startup only reads that
+# manifest; in debug mode the files are rebuilt on the first request and
+# whenever a source changes. Without a manifest, files are served from
+# /static/ and bundles are concatenated from their sources on each request.
+# Templates call
+# asset_url() instead of url_for('static', ...); the fingerprinted URLs are
+# served from /assets/ with a one-year immutable Cache-Control, so repeat
+# page loads are answered from the browser cache without a request.
+import os
+import gzip
+import json
+import hashlib
+import logging
+import mimetypes
+import threading
+from flask import current_app, request, send_from_directory, url_for, g
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bundle name -> source files, concatenated in order
+BUNDLES = {
+    'css/base.bundle.css': ['css/main.css', 'css/ui_utilities.css'],
+    'js/base.bundle.js': ['js/csrf-handler.js', 'js/main.js'],
+    'css/my_logs.bundle.css': ['css/dive_log.css', 'css/my_logs.css', 'css/my_logs_extra.css'],
+    'css/shared_with_me.bundle.css': ['css/dive_log.css', 'css/my_logs.css', 'css/shared_with_me.css'],
+}
+FINGERPRINT_EXTENSIONS = {'.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.ico', '.webp', '.woff', '.woff2'}
+COMPRESS_EXTENSIONS = {'.css', '.js', '.svg'}
+SKIP_DIRS = {'dist', 'uploads', 'templates'}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def fingerprinted_name(logical, content):
+    stem, ext = os.path.splitext(logical)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def join_bundle(bundle, contents):
+    """Concatenate a bundle's sources from `contents` (logical name -> bytes)."""
+    separator = b'\n;\n' if bundle.endswith('.js') else b'\n'
+    return separator.join(contents[name] for name in BUNDLES[bundle] if name in contents)
+
+
+def _write_atomic(path, content):
+    if os.path.exists(path):
+        return  # content-addressed: an existing file is already correct
+    if callable(content):
+        content = content()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+class Assets:
+    """Flask extension that fingerprints, bundles and pre-compresses static files."""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('ASSETS_OUTPUT_DIR', os.path.join(app.static_folder, 'dist'))
+        app.config.setdefault('ASSETS_AUTO_REBUILD', app.debug)
+        app.extensions['assets'] = {'manifest': {}, 'signature': None, 'lock': threading.Lock()}
+        app.add_template_global(self.asset_url, 'asset_url')
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        self.load(app)
+
+    def load(self, app):
+        """Read the manifest written by build(); returns it, or {} if there is none."""
+        path = os.path.join(app.config['ASSETS_OUTPUT_DIR'], 'manifest.json')
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+            if not (app.config['ASSETS_AUTO_REBUILD'] or app.testing):
+                logger.warning("No asset manifest at %s; run `flask assets-build` when deploying", path)
+        app.extensions['assets']['manifest'] = manifest
+        return manifest
+
+    def _sources(self, app):
+        static_folder = app.static_folder
+        for dirpath, dirnames, filenames in os.walk(static_folder):
+            if dirpath == static_folder:
+                dirnames[:] = [d for d in dirnames if d not in SKIP_DIRS]
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() in FINGERPRINT_EXTENSIONS:
+                    path = os.path.join(dirpath, filename)
+                    yield os.path.relpath(path, static_folder).replace(os.sep, '/'), path
+
+    def _signature(self, app):
+        return tuple(sorted((logical, os.path.getmtime(path)) for logical, path in self._sources(app)))
+
+    def build(self, app):
+        """Write fingerprinted copies and the manifest; returns the manifest."""
+        output_dir = app.config['ASSETS_OUTPUT_DIR']
+        state = app.extensions['assets']
+        with state['lock']:
+            manifest = {}
+            contents = {}
+            for logical, path in self._sources(app):
+                with open(path, 'rb') as f:
+                    contents[logical] = f.read()
+
+            outputs = dict(contents)
+            for bundle in BUNDLES:
+                outputs[bundle] = join_bundle(bundle, contents)
+
+            try:
+                for logical, content in outputs.items():
+                    name = fingerprinted_name(logical, content)
+                    path = os.path.join(output_dir, *name.split('/'))
+                    _write_atomic(path, content)
+                    if os.path.splitext(logical)[1] in COMPRESS_EXTENSIONS:
+                        # Compression is deferred so unchanged files cost only a stat
+                        _write_atomic(f"{path}.gz", lambda: gzip.compress(content, compresslevel=9, mtime=0))
+                        if brotli is not None:
+                            _write_atomic(f"{path}.br", lambda: brotli.compress(content))
+                    manifest[logical] = name
+
+                # Written for deploy tooling and CDNs; the app keeps its own copy in memory
+                manifest_path = os.path.join(output_dir, 'manifest.json')
+                temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+                with open(temp_path, 'w') as f:
+                    json.dump(manifest, f, indent=2, sort_keys=True)
+                os.replace(temp_path, manifest_path)
+            except OSError as e:
+                # Read-only deployments fall back to plain static URLs
+                logger.warning("Could not write fingerprinted assets to %s: %s", output_dir, e)
+                manifest = {}
+
+            state['manifest'] = manifest
+            state['signature'] = self._signature(app)
+            logger.info("Built %s fingerprinted assets", len(manifest))
+            return manifest
+
+    def _manifest(self):
+        app = current_app._get_current_object()
+        state = app.extensions['assets']
+        # In debug mode pick up edited files, checking at most once per request
+        if app.config['ASSETS_AUTO_REBUILD'] and not g.get('assets_checked'):
+            g.assets_checked = True
+            if self._signature(app) != state['signature']:
+                self.build(app)
+        return state['manifest']
+
+    def asset_url(self, filename, **kwargs):
+        """url_for('static', filename=...) replacement that returns the fingerprinted URL."""
+        name = self._manifest().get(filename)
+        if name is None:
+            if filename in BUNDLES:
+                # Not built: serve() concatenates the sources on request
+                return url_for('assets', filename=filename, **kwargs)
+            return url_for('static', filename=filename, **kwargs)
+        return url_for('assets', filename=name, **kwargs)
+
+    def _serve_unbuilt_bundle(self, bundle):
+        static_folder = current_app.static_folder
+        contents = {}
+        for name in BUNDLES[bundle]:
+            path = os.path.join(static_folder, *name.split('/'))
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    contents[name] = f.read()
+        response = current_app.response_class(join_bundle(bundle, contents),
+                                              mimetype=mimetypes.guess_type(bundle)[0])
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    def serve(self, filename):
+        output_dir = current_app.config['ASSETS_OUTPUT_DIR']
+        manifest = self._manifest()
+        if filename not in manifest.values():
+            if filename in BUNDLES and filename not in manifest:
+                return self._serve_unbuilt_bundle(filename)
+            # Relative url() references inside fingerprinted CSS land here
+            return send_from_directory(current_app.static_folder, filename)
+
+        mimetype = mimetypes.guess_type(filename)[0]
+        encoding = None
+        if brotli is not None and request.accept_encodings['br'] and \
+                os.path.exists(os.path.join(output_dir, f"{filename}.br")):
+            encoding = 'br'
+        elif request.accept_encodings['gzip'] and os.path.exists(os.path.join(output_dir, f"{filename}.gz")):
+            encoding = 'gzip'
+
+        suffix = {'br': '.br', 'gzip': '.gz'}.get(encoding, '')
+        response = send_from_directory(output_dir, filename + suffix, mimetype=mimetype,
+                                       max_age=31536000, conditional=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if os.path.splitext(filename)[1] in COMPRESS_EXTENSIONS:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
@@ -0,0 +1,397 @@
+# Response cache for computed statistics
+#
+# Cached payloads are keyed by user plus a per-user data version. Writes to
+# dives, species and shares bump that version when the transaction commits,
+# so stale entries are simply never looked up again and age out of the backend.
+# With the in-process LRU backend that version only moves in the worker that
+# committed, so views under @conditional also key entries by the ETag they are
+# sent with; a worker that missed the bump recomputes rather than sending an
+# old payload under the new ETag.
+import json
+import time
+import decimal
+import threading
+import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+from sqlalchemy import event, select
+from flask import current_app, g, has_app_context
+
+logger = logging.getLogger(__name__)
+
+
+# Numeric columns declared with a scale come back as Decimal; charts want floats
+def _encode_default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class LRUBackend:
+    """In-process LRU store bounded by entry count and total payload bytes."""
+
+    def __init__(self, max_entries=2048, max_bytes=32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (expires_at, payload)
+        self._versions = {}            # never evicted
+        self._locks = {}
+        self._bytes = 0
+        self._mutex = threading.RLock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._mutex:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key, payload, ttl=None):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._mutex:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, payload)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._mutex:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def get_counter(self, key):
+        with self._mutex:
+            return self._versions.get(key, 0)
+
+    def incr(self, key):
+        with self._mutex:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            return self._versions[key]
+
+    @contextmanager
+    def lock(self, key, timeout):
+        with self._mutex:
+            lock = self._locks.setdefault(key, threading.Lock())
+        acquired = lock.acquire(timeout=timeout)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                lock.release()
+            with self._mutex:
+                # Drop the lock once nobody is waiting on it
+                if not lock.locked() and self._locks.get(key) is lock:
+                    del self._locks[key]
+
+    def info(self):
+        with self._mutex:
+            return {
+                'backend': 'lru',
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions
+            }
+
+
+class RedisBackend:
+    """Shared store on a local Redis-compatible server (requires `redis`)."""
+
+    def __init__(self, url, prefix='divelogger'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, key):
+        return f"{self.prefix}:{key}"
+
+    def get(self, key):
+        value = self.client.get(self._key(key))
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, payload, ttl=None):
+        self.client.set(self._key(key), payload, ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(self._key(key))
+
+    def get_counter(self, key):
+        value = self.client.get(self._key(key))
+        return int(value) if value is not None else 0
+
+    def incr(self, key):
+        return self.client.incr(self._key(key))
+
+    @contextmanager
+    def lock(self, key, timeout):
+        lock = self.client.lock(self._key(f"lock:{key}"), timeout=timeout, blocking_timeout=timeout)
+        acquired = lock.acquire()
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                try:
+                    lock.release()
+                except Exception:
+                    # The lock expired while computing; nothing to release
+                    pass
+
+    def info(self):
+        stats = self.client.info('stats')
+        memory = self.client.info('memory')
+        return {
+            'backend': 'redis',
+            'bytes': memory.get('used_memory'),
+            'max_bytes': memory.get('maxmemory'),
+            'evictions': stats.get('evicted_keys')
+        }
+
+
+class NullBackend:
+    """Backend that never stores anything (caching disabled)."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, payload, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def get_counter(self, key):
+        return 0
+
+    def incr(self, key):
+        return 0
+
+    @contextmanager
+    def lock(self, key, timeout):
+        yield True
+
+    def info(self):
+        return {'backend': 'null'}
+
+
+def make_backend(kind, redis_url, max_entries=2048, max_bytes=32 * 1024 * 1024, prefix='divelogger'):
+    """Backend for a cache setting: 'redis' at `redis_url`, 'null', or an LRU with the given limits."""
+    if kind == 'redis':
+        try:
+            return RedisBackend(redis_url, prefix=prefix)
+        except ImportError:
+            logger.warning("redis package is not installed, falling back to the in-process LRU cache")
+    elif kind in ('null', 'none', None):
+        return NullBackend()
+    return LRUBackend(max_entries=max_entries, max_bytes=max_bytes)
+
+
+class CacheMetrics:
+    """Thread-safe lookup counters for a cache extension."""
+
+    def __init__(self, *extra):
+        self._counts = dict.fromkeys(('hits', 'misses') + extra, 0)
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def report(self, backend):
+        """Counters plus hit ratio, merged with the backend's own info."""
+        with self._lock:
+            metrics = dict(self._counts)
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_ratio'] = round(metrics['hits'] / lookups, 3) if lookups else 0.0
+        metrics.update(backend.info())
+        return metrics
+
+
+class ResponseCache:
+    """Flask extension wrapping a cache backend with per-user versioning."""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('STATS_CACHE_BACKEND', 'lru')
+        app.config.setdefault('STATS_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('STATS_CACHE_MAX_ENTRIES', 2048)
+        app.config.setdefault('STATS_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+        app.config.setdefault('STATS_CACHE_TTL', 300)
+        app.config.setdefault('STATS_CACHE_LOCK_TIMEOUT', 10)
+        app.extensions['response_cache'] = {
+            'backend': make_backend(
+                app.config['STATS_CACHE_BACKEND'],
+                app.config['STATS_CACHE_REDIS_URL'],
+                max_entries=app.config['STATS_CACHE_MAX_ENTRIES'],
+                max_bytes=app.config['STATS_CACHE_MAX_BYTES']
+            ),
+            'metrics': CacheMetrics('sets', 'lock_waits')
+        }
+
+        from app import db
+        invalidate_on_commit(db.session, 'response_cache', _affected_user_ids, _bump_users)
+
+    @property
+    def _state(self):
+        return current_app.extensions['response_cache']
+
+    @property
+    def backend(self):
+        return self._state['backend']
+
+    def _count(self, name):
+        self._state['metrics'].count(name)
+
+    def user_version(self, user_id):
+        return self.backend.get_counter(f"ver:user:{user_id}")
+
+    def bump_user_version(self, user_id):
+        return self.backend.incr(f"ver:user:{user_id}")
+
+    def user_key(self, user_id, *parts):
+        suffix = ':'.join(str(part) for part in parts)
+        return f"user:{user_id}:v{self.user_version(user_id)}:{suffix}"
+
+    def get_or_set(self, key, compute, ttl=None):
+        """Return the cached JSON payload for `key`, computing it at most once.
+
+        Concurrent misses for the same key wait on a lock so only one caller
+        recomputes; the others pick up its result.
+        """
+        backend = self.backend
+        ttl = ttl or current_app.config['STATS_CACHE_TTL']
+
+        payload = backend.get(key)
+        if payload is not None:
+            self._count('hits')
+            return json.loads(payload)
+
+        with backend.lock(key, current_app.config['STATS_CACHE_LOCK_TIMEOUT']) as acquired:
+            if not acquired:
+                self._count('lock_waits')
+            payload = backend.get(key)
+            if payload is not None:
+                self._count('hits')
+                return json.loads(payload)
+
+            self._count('misses')
+            payload = json.dumps(compute(), default=_encode_default)
+            backend.set(key, payload, ttl=ttl)
+            self._count('sets')
+            # Decode what was stored so hits and misses return identical data
+            return json.loads(payload)
+
+    def cached_for_user(self, user_id, name, compute, *parts):
+        etag = g.get('response_etag')
+        if etag is not None:
+            parts += (etag,)
+        return self.get_or_set(self.user_key(user_id, name, *parts), compute)
+
+    def metrics(self):
+        return self._state['metrics'].report(self.backend)
+
+
+# ---------------------------------------------------------------------------
+# Write-through invalidation shared by the cache extensions: each registers a
+# `collect(session)` returning the ids a flush touches and an `apply(ids)`
+# that bumps their versions. Ids are gathered across every flush of a
+# transaction and applied only once it has committed; a rollback drops them.
+# ---------------------------------------------------------------------------
+
+_invalidations = {}  # extension name -> (collect, apply)
+
+
+def invalidate_on_commit(session, extension, collect, apply):
+    """Call `apply(ids)` after each commit with the ids `collect` found.
+
+    Both callbacks are skipped unless the app has `extension` registered.
+    """
+    _invalidations[extension] = (collect, apply)
+    if event.contains(session, 'before_flush', _before_flush):
+        return
+    event.listen(session, 'before_flush', _before_flush)
+    event.listen(session, 'after_commit', _after_commit)
+    event.listen(session, 'after_soft_rollback', _after_soft_rollback)
+
+
+def _active_invalidations():
+    if not has_app_context():
+        return {}
+    return {
+        extension: callbacks for extension, callbacks in _invalidations.items()
+        if extension in current_app.extensions
+    }
+
+
+def _before_flush(session, flush_context, instances):
+    for extension, (collect, apply) in _active_invalidations().items():
+        ids = collect(session)
+        if ids:
+            session.info.setdefault('cache_invalidations', {}).setdefault(extension, set()).update(ids)
+
+
+def _after_commit(session):
+    pending = session.info.pop('cache_invalidations', None)
+    if not pending:
+        return
+    for extension, (collect, apply) in _active_invalidations().items():
+        if pending.get(extension):
+            apply(pending[extension])
+
+
+def _after_soft_rollback(session, previous_transaction):
+    session.info.pop('cache_invalidations', None)
+
+
+# Statistics: users whose dives, species or shares changed
+def _affected_user_ids(session):
+    from app.models import Dive, DiveSpecies, Share
+
+    user_ids = set()
+    dive_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Dive):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, DiveSpecies):
+            dive_ids.add(obj.dive_id)
+        elif isinstance(obj, Share):
+            user_ids.add(obj.creator_user_id)
+            if obj.shared_with_user_id:
+                user_ids.add(obj.shared_with_user_id)
+
+    if dive_ids:
+        rows = session.connection().execute(
+            select(Dive.user_id).where(Dive.id.in_(dive_ids))
+        )
+        user_ids.update(row[0] for row in rows)
+    user_ids.discard(None)
+    return user_ids
+
+
+def _bump_users(user_ids):
+    cache = ResponseCache()
+    for user_id in user_ids:
+        cache.bump_user_version(user_id)
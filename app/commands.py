@@ -0,0 +1,42 @@
+# Maintenance commands, available as `flask <command>`
+import click
+
+
+def register_commands(app):
+    @app.cli.command('schema-check')
+    def schema_check_command():
+        """Exit non-zero unless the database is at the latest migration."""
+        from app import db
+        from app.database import schema_is_current, schema_status
+        status = schema_status(app, db)
+        click.echo(f"Database revision: {', '.join(status['current']) or 'none'}")
+        click.echo(f"Latest migration:  {', '.join(status['heads'])}")
+        if status['missing_tables']:
+            click.echo(f"Missing tables:    {', '.join(status['missing_tables'])}")
+        if not schema_is_current(status):
+            click.echo('Schema is out of date; run `flask db upgrade`.')
+            raise SystemExit(1)
+        click.echo('Schema is up to date.')
+
+    @app.cli.command('rebuild-species-occurrence')
+    def rebuild_species_occurrence_command():
+        """Recompute the species occurrence cube from logged sightings."""
+        from app.services import occurrence
+        rows = occurrence.rebuild()
+        click.echo(f'Rebuilt species occurrence cube ({rows} rows).')
+
+    @app.cli.command('media-gc')
+    @click.option('--grace', type=int, default=None,
+                  help='Only remove objects untouched for this many seconds.')
+    def media_gc_command(grace):
+        """Delete media blobs that no dive references any more."""
+        from app import media_store
+        result = media_store.collect_garbage(grace)
+        click.echo(f"Removed {result['blobs']} unreferenced blobs and {result['orphans']} orphaned files.")
+
+    @app.cli.command('assets-build')
+    def assets_build_command():
+        """Fingerprint, bundle and pre-compress static assets."""
+        from app import assets
+        manifest = assets.build(app)
+        click.echo(f"Built {len(manifest)} assets into {app.config['ASSETS_OUTPUT_DIR']}.")
@@ -0,0 +1,373 @@
+# Database engine tuning
+#
+# SQLite: every connection is switched to WAL with synchronous=NORMAL, so
+# readers no longer wait for a writer and commits append to the log instead
+# of fsyncing the database file. busy_timeout makes a second writer wait for
+# the lock rather than fail with "database is locked", and cache_size/mmap_size
+# keep hot pages in memory. Server databases (PostgreSQL, MySQL) get a bounded
+# connection pool that pings connections before use and recycles them before
+# the server or a proxy drops them.
+#
+# Read replicas: binds listed in DB_REPLICAS (by default every SQLALCHEMY_BINDS
+# entry named replica*) serve GET requests whose URL rule matches
+# DB_REPLICA_ROUTES. Anything that writes goes to the primary, as do reads
+# later in a request that has flushed, reads from a client that wrote within
+# DB_REPLICA_STICKY_SECONDS, and reads while every replica lags by more than
+# DB_REPLICA_MAX_LAG seconds or cannot be reached.
+#
+# Schema: DB_SCHEMA_MODE decides what create_app does about tables. 'create'
+# runs db.create_all() (the default in debug), 'check' refuses to start
+# unless the database is at the latest Alembic revision, and 'none' (the
+# default otherwise) leaves the schema to `flask db upgrade`.
+import time
+import itertools
+import threading
+from fnmatch import fnmatch
+from flask import current_app, request, session as client_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+# Applied in this order; journal_mode must come first to take effect
+DEFAULT_SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,        # milliseconds
+    'cache_size': -64000,        # negative means KiB, i.e. 64 MB
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(uri, config):
+    """SQLAlchemy create_engine() options for `uri` under the DB_* settings."""
+    if is_sqlite(uri):
+        # SQLite has no server to pool connections to; keep SQLAlchemy's defaults
+        return {}
+    return {
+        'pool_size': config.get('DB_POOL_SIZE', 10),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+    }
+
+
+def sqlite_pragmas(uri, config):
+    """The pragmas to run on each new connection to `uri`, or {}."""
+    if not is_sqlite(uri) or not config.get('SQLITE_TUNING', True):
+        return {}
+    pragmas = dict(DEFAULT_SQLITE_PRAGMAS)
+    pragmas.update(config.get('SQLITE_PRAGMAS') or {})
+    if is_memory_sqlite(uri):
+        # WAL and mmap need a file; in-memory databases keep their own journal
+        pragmas.pop('journal_mode', None)
+        pragmas.pop('mmap_size', None)
+    return pragmas
+
+
+def set_sqlite_pragmas(engine, pragmas):
+    """Run `pragmas` on every connection `engine` opens."""
+    if not pragmas:
+        return
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    event.listen(engine, 'connect', on_connect)
+
+
+def configure_engines(app):
+    """Fill in SQLALCHEMY_ENGINE_OPTIONS; call before db.init_app()."""
+    app.config.setdefault('SQLITE_TUNING', True)
+    options = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+    # Explicit engine options in the config win over the computed ones
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def tune_engines(app, db):
+    """Install the SQLite pragmas on the app's engines; call after db.init_app()."""
+    with app.app_context():
+        for engine in db.engines.values():
+            set_sqlite_pragmas(engine, sqlite_pragmas(str(engine.url), app.config))
+
+
+# ---------------------------------------------------------------------------
+# Read replicas
+# ---------------------------------------------------------------------------
+
+# Flask session key holding the time until which this client reads the primary
+PRIMARY_PIN_KEY = 'db_primary_until'
+
+DEFAULT_REPLICA_ROUTES = (
+    '/api/dives/*',
+    '/api/sites/*',
+    '/api/shark-warnings/*',
+    '/api/shared/*',
+    '/api/users/<int:user_id>/*',
+)
+
+# Seconds the standby is behind, or 0 when it has replayed everything it received
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica chosen for the request."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica')
+        if (replica and bind is None and not self._flushing and not self.info.get('wrote')
+                and not isinstance(clause, UpdateBase)):
+            engine = self._db.engines.get(replica)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_lag(engine):
+    """Replication delay of `engine` in seconds; 0 where the dialect cannot tell."""
+    if engine.dialect.name != 'postgresql':
+        return 0.0
+    with engine.connect() as conn:
+        return float(conn.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+
+
+class ReplicaRouter:
+    """Flask extension choosing a replica bind for read-only requests."""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        binds = app.config.get('SQLALCHEMY_BINDS') or {}
+        app.config.setdefault('DB_REPLICAS', [name for name in binds if name.startswith('replica')])
+        app.config.setdefault('DB_REPLICA_ROUTES', DEFAULT_REPLICA_ROUTES)
+        app.config.setdefault('DB_REPLICA_MAX_LAG', 5)
+        app.config.setdefault('DB_REPLICA_LAG_CHECK_INTERVAL', 2)
+        app.config.setdefault('DB_REPLICA_STICKY_SECONDS', 10)
+
+        missing = [name for name in app.config['DB_REPLICAS'] if name not in binds]
+        if missing:
+            raise ValueError(f"DB_REPLICAS names binds missing from SQLALCHEMY_BINDS: {missing}")
+
+        app.extensions['replicas'] = {
+            'lag': {},  # bind -> (checked_at, seconds or None if unreachable)
+            'turn': itertools.count(),
+            'lock': threading.Lock()
+        }
+        if app.config['DB_REPLICAS']:
+            app.before_request(self._route_request)
+            app.after_request(self._pin_writer)
+            app.teardown_request(self._reset_session)
+
+        from app import db
+        register_session_events(db.session)
+
+    @property
+    def _state(self):
+        return current_app.extensions['replicas']
+
+    def lag(self, name):
+        """Cached lag of replica `name`, or None if it could not be checked."""
+        state = self._state
+        now = time.monotonic()
+        with state['lock']:
+            checked_at, lag = state['lag'].get(name, (None, None))
+        if checked_at is not None and now - checked_at < current_app.config['DB_REPLICA_LAG_CHECK_INTERVAL']:
+            return lag
+
+        from app import db
+        try:
+            lag = replica_lag(db.engines[name])
+        except Exception as e:
+            current_app.logger.warning("Replica %s is unavailable: %s", name, e)
+            lag = None
+        with state['lock']:
+            state['lag'][name] = (now, lag)
+        return lag
+
+    def choose(self):
+        """A replica within DB_REPLICA_MAX_LAG, round robin, or None for the primary."""
+        max_lag = current_app.config['DB_REPLICA_MAX_LAG']
+        healthy = []
+        for name in current_app.config['DB_REPLICAS']:
+            lag = self.lag(name)
+            if lag is not None and lag <= max_lag:
+                healthy.append(name)
+        if not healthy:
+            return None
+        return healthy[next(self._state['turn']) % len(healthy)]
+
+    def is_read_only(self):
+        if request.method not in ('GET', 'HEAD') or request.url_rule is None:
+            return False
+        return any(fnmatch(request.url_rule.rule, pattern) for pattern in current_app.config['DB_REPLICA_ROUTES'])
+
+    def _route_request(self):
+        from app import db
+        db.session.info.pop('wrote', None)
+        if not self.is_read_only():
+            return
+        # Read your own writes: recent writers stay on the primary
+        if client_session.get(PRIMARY_PIN_KEY, 0) > time.time():
+            return
+        replica = self.choose()
+        if replica is not None:
+            db.session.info['replica'] = replica
+
+    def _pin_writer(self, response):
+        from app import db
+        if db.session.info.get('wrote'):
+            client_session[PRIMARY_PIN_KEY] = time.time() + current_app.config['DB_REPLICA_STICKY_SECONDS']
+        return response
+
+    def _reset_session(self, exc):
+        from app import db
+        db.session.info.pop('replica', None)
+        db.session.info.pop('wrote', None)
+
+
+def _after_flush(session, flush_context):
+    # From here on this session must read what it just wrote
+    session.info['wrote'] = True
+
+
+def register_session_events(session):
+    if event.contains(session, 'after_flush', _after_flush):
+        return
+    event.listen(session, 'after_flush', _after_flush)
+
+
+# ---------------------------------------------------------------------------
+# Conflict-safe inserts
+# ---------------------------------------------------------------------------
+
+def insert_on_conflict(model, values, index_elements, set_=None):
+    """INSERT a `model` row in the current session, tolerating an existing key.
+
+    The existing row is updated with `set_`, or left alone when it is None,
+    so concurrent requests inserting the same key neither fail nor race.
+    PostgreSQL, SQLite and MySQL use their native upsert; other dialects
+    select first and insert inside a savepoint, falling back to the update
+    when a concurrent insert wins.
+    """
+    from app import db
+
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(model).values(**values)
+        # MySQL has no DO NOTHING; assigning a key column to itself is the idiom
+        db.session.execute(stmt.on_duplicate_key_update(
+            set_ or {index_elements[0]: getattr(model, index_elements[0])}
+        ))
+        return
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as upsert_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert_insert
+        stmt = upsert_insert(model).values(**values)
+        if set_ is None:
+            stmt = stmt.on_conflict_do_nothing(index_elements=index_elements)
+        else:
+            stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+        db.session.execute(stmt)
+        return
+    _insert_or_update(db.session, model, values, {name: values[name] for name in index_elements}, set_)
+
+
+def _insert_or_update(session, model, values, key, set_):
+    # Portable upsert. Not used on SQLite, where pysqlite commits a released
+    # outermost savepoint and a later rollback would keep the row.
+    exists = session.query(select(model).filter_by(**key).exists()).scalar()
+    if not exists:
+        try:
+            with session.begin_nested():
+                session.execute(insert(model).values(**values))
+            return
+        except IntegrityError:
+            pass  # a concurrent request inserted the key first
+    if set_ is not None:
+        session.execute(
+            update(model).filter_by(**key).values(set_).execution_options(synchronize_session=False)
+        )
+
+
+# ---------------------------------------------------------------------------
+# Schema management at startup
+# ---------------------------------------------------------------------------
+
+SCHEMA_MODES = ('create', 'check', 'none')
+
+
+def schema_mode(app):
+    mode = app.config.get('DB_SCHEMA_MODE') or ('create' if app.debug else 'none')
+    if mode not in SCHEMA_MODES:
+        raise ValueError(f"DB_SCHEMA_MODE must be one of {', '.join(SCHEMA_MODES)}, not {mode!r}")
+    return mode
+
+
+def schema_status(app, db):
+    """Compare the database with the latest migration and the models.
+
+    Returns a dict with the database's current revisions, the migration
+    heads, and model tables missing from the database.
+    """
+    # Alembic is only needed here; keep it out of worker startup
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+    from sqlalchemy import inspect
+
+    heads = ScriptDirectory(app.config['DB_MIGRATIONS_DIR']).get_heads()
+    with app.app_context():
+        with db.engine.connect() as conn:
+            current = MigrationContext.configure(conn).get_current_heads()
+            existing = set(inspect(conn).get_table_names())
+    return {
+        'current': sorted(current),
+        'heads': sorted(heads),
+        'missing_tables': sorted(set(db.metadata.tables) - existing)
+    }
+
+
+def schema_is_current(status):
+    return status['current'] == status['heads'] and not status['missing_tables']
+
+
+def prepare_schema(app, db):
+    """Apply DB_SCHEMA_MODE; call once the models are imported."""
+    mode = schema_mode(app)
+    if mode == 'create':
+        with app.app_context():
+            db.create_all()
+        app.logger.info("Database tables created or confirmed to exist")
+    elif mode == 'check':
+        status = schema_status(app, db)
+        if not schema_is_current(status):
+            raise RuntimeError(
+                f"Database schema is out of date (at {status['current'] or 'no revision'}, "
+                f"head is {status['heads']}, missing tables {status['missing_tables']}); "
+                "run `flask db upgrade`"
+            )
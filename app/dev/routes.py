@@ -1,10 +1,26 @@
 from flask import jsonify
 from flask_wtf.csrf import generate_csrf
 from app.dev import dev_bp
+from app import cache, fragments, user_cache
 
 @dev_bp.route("/get-csrf-token", methods=["GET"])
 def get_csrf_token():
     token = generate_csrf()
     response = jsonify({"csrf_token": token})
     response.set_cookie("csrf_token", token)
-    return response
\ No newline at end of file
+    return response
+
+# Hit/miss/eviction counters for the statistics cache
+@dev_bp.route("/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify(cache.metrics())
+
+# Hit/miss counters for cached template fragments
+@dev_bp.route("/fragment-cache-stats", methods=["GET"])
+def fragment_cache_stats():
+    return jsonify(fragments.metrics())
+
+# Hit/miss counters for the user loader cache
+@dev_bp.route("/user-cache-stats", methods=["GET"])
+def user_cache_stats():
+    return jsonify(user_cache.metrics())
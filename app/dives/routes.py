@@ -5,12 +5,17 @@ from app.models import Dive
 from app.dives import dives_bp
 from app import db
 from app import csrf
+from app import media_store
+from app import limiter
+from app import lifecycle
 from datetime import datetime
-import os
-from werkzeug.utils import secure_filename
-import uuid
-from flask_wtf.csrf import validate_csrf, CSRFError, generate_csrf
+from flask_wtf.csrf import generate_csrf
 from flask_login import login_required, current_user
+from sqlalchemy.orm.exc import StaleDataError
+from app.etag import conditional, collection_stamp
+from app.services import occurrence, sightings
+from app.validation import Field, Schema, ValidationError, integer, iso_datetime, number, string, validated
+import json
 
 # Helper: Convert a Dive object to dictionary
 def dive_to_dict(dive):
@@ -30,6 +35,8 @@ def dive_to_dict(dive):
         'media': dive.media,
         'location_thumbnail': dive.location_thumbnail,
         'created_at': dive.created_at.isoformat() if dive.created_at else None,
+        'updated_at': dive.updated_at.isoformat() if dive.updated_at else None,
+        'version': dive.version,
         'suit_type': dive.suit_type,
         'suit_thickness': dive.suit_thickness,
         'weight': dive.weight,
@@ -44,165 +51,374 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg', 'gif', 'csv'}
 
+# Writable dive fields, with the coercion for each JSON value
+DIVE_FIELDS = {
+    'dive_number': Field(integer()),
+    'start_time': Field(iso_datetime, required=True),
+    'end_time': Field(iso_datetime, required=True),
+    'max_depth': Field(number(minimum=0), required=True),
+    'weight_belt': Field(string(50)),
+    'visibility': Field(string(50)),
+    'weather': Field(string(100)),
+    'location': Field(string(255), required=True),
+    'dive_partner': Field(string(255)),
+    'notes': Field(string()),
+    'location_thumbnail': Field(string(255)),
+    'suit_type': Field(string(20)),
+    'suit_thickness': Field(number()),
+    'weight': Field(number()),
+    'tank_type': Field(string(20)),
+    'tank_size': Field(number()),
+    'gas_mix': Field(string(20)),
+    'o2_percentage': Field(number()),
+}
+# `media` is not a field: it is only set by the upload endpoints, which hold a
+# reference on the stored blob, so clients can't point a dive at another blob
+DIVE_SCHEMA = Schema(DIVE_FIELDS)
+# PATCH names exactly what it changes, so anything else is an error
+DIVE_PATCH_SCHEMA = Schema(DIVE_FIELDS, strict=True)
+
+# Helper: Build a new Dive for the current user from a loaded DIVE_SCHEMA payload
+def build_dive(data):
+    return Dive(user_id=current_user.id, **data)
+
+# Helper: Store an uploaded media file and return its public URL
+def save_media_file(file):
+    blob = media_store.save(file.stream, file.filename, file.mimetype)
+    current_app.logger.info("Stored media blob %s (%s bytes)", blob.sha256, blob.size)
+    return media_store.url(blob)
+
+# Helper: Validate an uploaded dive profile CSV and return its text
+# Raises ValueError with a user-facing message if the file is not usable.
+def read_profile_csv(file):
+    # Handle empty filename
+    if file.filename == '' or not file.filename:
+        current_app.logger.warning("Empty filename")
+        raise ValueError("No file selected")
+        
+    # Check file extension
+    if not file.filename.lower().endswith('.csv'):
+        current_app.logger.warning("Invalid file extension: %s", file.filename)
+        raise ValueError("File must have .csv extension")
+    
+    # Save file content to memory first
+    file_content = file.read()
+    
+    # Check if file is empty
+    if len(file_content) == 0:
+        current_app.logger.warning("Empty file")
+        raise ValueError("CSV file is empty")
+        
+    # Try to decode as UTF-8
+    try:
+        csv_content = file_content.decode('utf-8')
+    except UnicodeDecodeError:
+        current_app.logger.warning("Failed to decode as UTF-8, trying with Latin-1")
+        csv_content = file_content.decode('latin-1')
+    
+    current_app.logger.debug("CSV content length: %d bytes", len(csv_content))
+    
+    # Check if content is empty after stripping whitespace
+    if len(csv_content.strip()) == 0:
+        current_app.logger.warning("CSV content is empty")
+        raise ValueError("CSV file contains no data")
+    
+    # Basic validation of CSV format
+    lines = csv_content.strip().split('\n')
+    current_app.logger.debug("CSV has %d lines", len(lines))
+    
+    if len(lines) < 2:  # At least a header and one data row
+        current_app.logger.warning("CSV has too few lines")
+        raise ValueError("CSV must have a header row and at least one data row")
+        
+    # Check if file has comma-separated values
+    if ',' not in lines[0]:
+        current_app.logger.warning("CSV header has no commas")
+        raise ValueError("CSV must contain comma-separated values")
+        
+    # Check if it has columns for time and depth
+    header_row = lines[0].lower()
+    if not any(word in header_row for word in ['time', 'minute', 'min']) or \
+    not any(word in header_row for word in ['depth', 'profundidad', 'tiefe']):
+        current_app.logger.warning("CSV missing required columns")
+        raise ValueError("CSV must have columns for time and depth")
+    
+    return csv_content
+
 # Helper function to check if the current user owns the dive
 def check_dive_ownership(dive_id):
     dive = Dive.query.get_or_404(dive_id)
     if dive.user_id != current_user.id:
-        current_app.logger.warning(f"User {current_user.id} attempted to access dive {dive_id} owned by user {dive.user_id}")
+        current_app.logger.warning("User %s attempted to access dive %s owned by user %s", current_user.id, dive_id, dive.user_id)
         abort(403)  # Forbidden
     return dive
 
+# Most dives that can be requested at once with ?ids=
+MAX_BATCH_IDS = 100
+
+# Helper: Parse a comma-separated ?ids= value into unique dive ids
+# Raises ValueError with a user-facing message if the list is not usable.
+def parse_dive_ids(value):
+    try:
+        ids = list(dict.fromkeys(int(part) for part in value.split(',') if part.strip()))
+    except ValueError:
+        raise ValueError("ids must be a comma-separated list of integers")
+    if not ids:
+        raise ValueError("ids must not be empty")
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f"At most {MAX_BATCH_IDS} ids can be requested at once")
+    return ids
+
+# Version stamp for the dive list, or for the current user's dives in ?ids=
+def dives_stamp():
+    if 'ids' not in request.args:
+        return ('dives',) + collection_stamp(Dive)
+    if not current_user.is_authenticated:
+        return None
+    try:
+        ids = parse_dive_ids(request.args['ids'])
+    except ValueError:
+        return None
+    return ('dives', current_user.id) + collection_stamp(Dive, Dive.id.in_(ids), Dive.user_id == current_user.id)
+
+# Version stamp for a single dive, only for its owner
+def dive_stamp(dive_id):
+    if not current_user.is_authenticated:
+        return None
+    row = db.session.query(Dive.user_id, Dive.version).filter(Dive.id == dive_id).first()
+    if row is None or row.user_id != current_user.id:
+        return None
+    return ('dive', dive_id, row.version)
+
+# ETag of a single dive; clients send it back in If-Match when updating
+def dive_etag(dive_id, version):
+    return f"dive-{dive_id}-v{version}"
+
+# Helper: Representation of a dive with its ETag
+def dive_response(dive, status=200):
+    response = jsonify(dive_to_dict(dive))
+    response.status_code = status
+    response.set_etag(dive_etag(dive.id, dive.version))
+    return response
+
+# Helper: 412 response if the request's If-Match does not name the dive's current version
+def precondition_failed(dive):
+    if not request.if_match or request.if_match.contains(dive_etag(dive.id, dive.version)):
+        return None
+    current_app.logger.info("Rejected stale update of dive %s (now version %s)", dive.id, dive.version)
+    response = jsonify({"error": "Dive was changed by another request", "dive": dive_to_dict(dive)})
+    response.status_code = 412
+    response.set_etag(dive_etag(dive.id, dive.version))
+    return response
+
 # GET /api/dives/ - Retrieve all diving records
 @dives_bp.route('/', methods=['GET'])
+@conditional(dives_stamp)
 def get_dives():
+    if 'ids' in request.args:
+        return get_dives_by_ids()
     try:
         dives = Dive.query.all()
         return jsonify([dive_to_dict(dive) for dive in dives]), 200
     except Exception as e:
-        current_app.logger.error(f"Error fetching dives: {str(e)}", exc_info=True)
+        current_app.logger.error("Error fetching dives: %s", e, exc_info=True)
         return jsonify({"error": str(e)}), 500
 
-@dives_bp.route('/', methods=['POST'])
-@login_required
-def create_dive():
+# GET /api/dives/?ids=1,2,3 - Retrieve several of the current user's dives in one query
+def get_dives_by_ids():
+    if not current_user.is_authenticated:
+        return jsonify({"error": "Authentication required"}), 401
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            try:
-                validate_csrf(token)
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
+        ids = parse_dive_ids(request.args['ids'])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        data = request.get_json()
-        current_app.logger.info(f"Received dive creation request with data: {data}")
+    try:
+        dives = {dive.id: dive for dive in Dive.query.filter(Dive.id.in_(ids))}
 
-        if not data:
-            current_app.logger.warning("No input data provided in request")
-            return jsonify({"error": "No input data provided"}), 400
+        missing = [dive_id for dive_id in ids if dive_id not in dives]
+        if missing:
+            return jsonify({"error": "Dives not found", "missing": missing}), 404
+        if any(dive.user_id != current_user.id for dive in dives.values()):
+            current_app.logger.warning("User %s requested dives they do not own: %s", current_user.id, ids)
+            return jsonify({"error": "You can only view your own dives"}), 403
 
-        try:
-            # Log individual field values to help debug
-            current_app.logger.info(f"start_time: {data.get('start_time')}")
-            current_app.logger.info(f"end_time: {data.get('end_time')}")
-            current_app.logger.info(f"max_depth: {data.get('max_depth')}")
-            current_app.logger.info(f"location: {data.get('location')}")
-            
-            dive = Dive(
-                user_id=current_user.id,  # Get user ID from current_user
-                dive_number=data.get('dive_number'),
-                start_time=datetime.fromisoformat(data['start_time']),
-                end_time=datetime.fromisoformat(data['end_time']),
-                max_depth=data['max_depth'],
-                weight_belt=data.get('weight_belt'),
-                visibility=data.get('visibility'),
-                weather=data.get('weather'),
-                location=data['location'],
-                dive_partner=data.get('dive_partner'),
-                notes=data.get('notes'),
-                media=data.get('media'),
-                location_thumbnail=data.get('location_thumbnail'),
-                suit_type=data.get('suit_type'),
-                suit_thickness=data.get('suit_thickness'),
-                weight=data.get('weight'),
-                tank_type=data.get('tank_type'),
-                tank_size=data.get('tank_size'),
-                gas_mix=data.get('gas_mix'),
-                o2_percentage=data.get('o2_percentage'),
-            )
-            current_app.logger.info("Successfully created dive object")
-        except KeyError as e:
-            current_app.logger.error(f"Missing required field: {e.args[0]}")
-            return jsonify({"error": f"Missing required field: {e.args[0]}"}), 400
-        except Exception as e:
-            current_app.logger.error(f"Error creating dive object: {str(e)}", exc_info=True)
-            return jsonify({"error": str(e)}), 400
+        # Same order as requested
+        return jsonify([dive_to_dict(dives[dive_id]) for dive_id in ids]), 200
+    except Exception as e:
+        current_app.logger.error("Error fetching dives %s: %s", ids, e, exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+@dives_bp.route('/', methods=['POST'])
+@login_required
+@validated(DIVE_SCHEMA)
+def create_dive(data):
+    try:
+        current_app.logger.debug("Creating dive from fields %s", sorted(data))
+        dive = build_dive(data)
 
         try:
-            current_app.logger.info("Adding dive to database session")
             db.session.add(dive)
-            current_app.logger.info("Committing to database")
             db.session.commit()
-            current_app.logger.info(f"Successfully created dive with ID: {dive.id}")
+            current_app.logger.info("Created dive %s", dive.id)
             return jsonify({'id': dive.id}), 201
         except Exception as e:
             db.session.rollback()
-            current_app.logger.error(f"Database error: {str(e)}", exc_info=True)
+            current_app.logger.error("Database error: %s", e, exc_info=True)
             return jsonify({"error": str(e)}), 500
     except Exception as e:
-        current_app.logger.error(f"Unhandled exception in create_dive: {str(e)}", exc_info=True)
+        current_app.logger.error("Unhandled exception in create_dive: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
+# POST /api/dives/full - Create a dive with its media, profile and species at once
+#
+# multipart/form-data fields:
+#   dive        JSON object with the same fields as POST /api/dives/
+#   species     JSON list of {taxon_id, scientific_name, common_name, rank, notes} (optional)
+#   media       image file (optional)
+#   profile_csv dive profile CSV file (optional)
+# Everything is validated before anything is written, and the dive, profile and
+# species are committed together. A newly stored media file is removed if the commit fails.
+@dives_bp.route('/full', methods=['POST'])
+@login_required
+@limiter.limit('upload')
+@lifecycle.upload
+@validated()
+def create_full_dive():
+    try:
+        data = json.loads(request.form.get('dive') or 'null')
+        species_items = json.loads(request.form.get('species') or '[]')
+    except ValueError:
+        return jsonify({"error": "dive and species must be valid JSON"}), 400
+    if not isinstance(data, dict) or not data:
+        return jsonify({"error": "No input data provided"}), 400
+    
+    # Validate every part before touching the database or the disk
+    try:
+        dive = build_dive(DIVE_SCHEMA.load(data))
+        wanted, _ = sightings.parse_batch(species_items)
+        profile_csv = request.files.get('profile_csv')
+        if profile_csv is not None:
+            dive.profile_csv_data = read_profile_csv(profile_csv)
+        media = request.files.get('media')
+        if media is not None and not (media.filename and allowed_file(media.filename)):
+            return jsonify({"error": "Invalid file type"}), 400
+    except ValidationError as e:
+        return e.response()
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    
+    media_path = None
+    try:
+        if media is not None:
+            media_path = save_media_file(media)
+            media_store.retain(media_path)
+            dive.media = media_path
+        
+        db.session.add(dive)
+        species = sightings.apply_batch(dive, wanted)
+        db.session.commit()
+        if media_path:
+            media_store.queue_variants(media_path)
+        
+        current_app.logger.info("Created dive %s with %s species in one request", dive.id, len(species))
+        result = dive_to_dict(dive)
+        result['species'] = [s.to_dict() for s in species]
+        return jsonify(result), 201
+    except ValueError as e:
+        db.session.rollback()
+        if media_path:
+            media_store.discard(media_path)
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        if media_path:
+            media_store.discard(media_path)
+        current_app.logger.error("Error creating full dive: %s", e, exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
 # GET /api/dives/<dive_id> - Retrieve a single dive record
 @dives_bp.route('/<int:dive_id>', methods=['GET'])
 @login_required
+@conditional(dive_stamp, per_user=True, etag_func=lambda stamp: dive_etag(*stamp[1:]))
 def get_dive(dive_id):
     try:
         dive = check_dive_ownership(dive_id)
-        return jsonify(dive_to_dict(dive)), 200
+        return dive_response(dive)
     except Exception as e:
-        current_app.logger.error(f"Error fetching dive {dive_id}: {str(e)}", exc_info=True)
+        current_app.logger.error("Error fetching dive %s: %s", dive_id, e, exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 # PUT /api/dives/<dive_id> - Update a dive record
 @dives_bp.route('/<int:dive_id>', methods=['PUT'])
 @login_required
-def update_dive(dive_id):
+@validated(DIVE_SCHEMA, partial=True)
+def update_dive(dive_id, data):
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            try:
-                validate_csrf(token)
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
-        
         dive = check_dive_ownership(dive_id)
-        data = request.get_json()
-
-        dive.dive_number = data.get('dive_number', dive.dive_number)
-        dive.start_time = datetime.fromisoformat(data['start_time']) if 'start_time' in data else dive.start_time
-        dive.end_time = datetime.fromisoformat(data['end_time']) if 'end_time' in data else dive.end_time
-        dive.max_depth = data.get('max_depth', dive.max_depth)
-        dive.weight_belt = data.get('weight_belt', dive.weight_belt)
-        dive.visibility = data.get('visibility', dive.visibility)
-        dive.weather = data.get('weather', dive.weather)
-        dive.location = data.get('location', dive.location)
-        dive.dive_partner = data.get('dive_partner', dive.dive_partner)
-        dive.notes = data.get('notes', dive.notes)
-        dive.media = data.get('media', dive.media)
-        dive.location_thumbnail = data.get('location_thumbnail', dive.location_thumbnail)
-        dive.suit_type = data.get('suit_type', dive.suit_type)
-        dive.suit_thickness = data.get('suit_thickness', dive.suit_thickness)
-        dive.weight = data.get('weight', dive.weight)
-        dive.tank_type = data.get('tank_type', dive.tank_type)
-        dive.tank_size = data.get('tank_size', dive.tank_size)
-        dive.gas_mix = data.get('gas_mix', dive.gas_mix)
-        dive.o2_percentage = data.get('o2_percentage', dive.o2_percentage)
+        failed = precondition_failed(dive)
+        if failed is not None:
+            return failed
+        old_location, old_start_time = dive.location, dive.start_time
+
+        for field, value in data.items():
+            setattr(dive, field, value)
+
+        occurrence.move_dive(dive, old_location, old_start_time)
+        db.session.commit()
+        return dive_response(dive)
+    except StaleDataError:
+        # Another request committed a new version after we read this one
+        db.session.rollback()
+        return precondition_failed(db.session.get(Dive, dive_id)) or \
+            (jsonify({"error": "Dive was changed by another request"}), 412)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Error updating dive %s: %s", dive_id, e, exc_info=True)
+        return jsonify({"error": str(e)}), 500
+
+# PATCH /api/dives/<dive_id> - Change only the supplied fields of a dive record
+@dives_bp.route('/<int:dive_id>', methods=['PATCH'])
+@login_required
+@validated(DIVE_PATCH_SCHEMA, partial=True)
+def patch_dive(dive_id, data):
+    dive = check_dive_ownership(dive_id)
+    failed = precondition_failed(dive)
+    if failed is not None:
+        return failed
 
+    changes = {field: value for field, value in data.items() if value != getattr(dive, field)}
+
+    # Nothing to write: no commit, no new version
+    if not changes:
+        return dive_response(dive)
+
+    try:
+        old_location, old_start_time = dive.location, dive.start_time
+        for field, value in changes.items():
+            setattr(dive, field, value)
+
+        if 'location' in changes or 'start_time' in changes:
+            occurrence.move_dive(dive, old_location, old_start_time)
         db.session.commit()
-        return jsonify(dive_to_dict(dive)), 200
+        current_app.logger.info("Patched dive %s: %s", dive_id, ', '.join(sorted(changes)))
+        return dive_response(dive)
+    except StaleDataError:
+        # Another request committed a new version after we read this one
+        db.session.rollback()
+        return precondition_failed(db.session.get(Dive, dive_id)) or \
+            (jsonify({"error": "Dive was changed by another request"}), 412)
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error updating dive {dive_id}: {str(e)}", exc_info=True)
+        current_app.logger.error("Error patching dive %s: %s", dive_id, e, exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 # DELETE /api/dives/<dive_id> - Delete a dive record
 @dives_bp.route('/<int:dive_id>', methods=['DELETE'])
 @login_required
+@validated()
 def delete_dive(dive_id):
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            try:
-                validate_csrf(token)
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
-        
         dive = check_dive_ownership(dive_id)
         
         # Delete associated shares first
@@ -211,107 +427,115 @@ def delete_dive(dive_id):
         for share in shares:
             db.session.delete(share)
             
+        # Drop the dive's reference to its media blob
+        media_store.release(dive.media)
+            
+        # Uncount and delete the logged species
+        occurrence.remove_dive(dive)
+        for species in dive.species:
+            db.session.delete(species)
+            
         # Now delete the dive
         db.session.delete(dive)
         db.session.commit()
         return '', 204
     except Exception as e:
         db.session.rollback()
-        current_app.logger.error(f"Error deleting dive {dive_id}: {str(e)}", exc_info=True)
+        current_app.logger.error("Error deleting dive %s: %s", dive_id, e, exc_info=True)
         return jsonify({"error": str(e)}), 500
 
 # POST /api/dives/<dive_id>/upload - Upload media for a dive
 @dives_bp.route('/<int:dive_id>/upload', methods=['POST'])
 @login_required
+@limiter.limit('upload')
+@lifecycle.upload
+@validated()
 def upload_dive_media(dive_id):
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            try:
-                validate_csrf(token)
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
-                
         dive = check_dive_ownership(dive_id)
         
         if 'media' not in request.files:
-            current_app.logger.warning(f"No file part in upload request for dive {dive_id}")
+            current_app.logger.warning("No file part in upload request for dive %s", dive_id)
             return jsonify({"error": "No file part"}), 400
             
         file = request.files['media']
         
         if file.filename == '':
-            current_app.logger.warning(f"No selected file in upload request for dive {dive_id}")
+            current_app.logger.warning("No selected file in upload request for dive %s", dive_id)
             return jsonify({"error": "No selected file"}), 400
             
         if file and allowed_file(file.filename):
-            # Generate unique filename
-            filename = secure_filename(file.filename)
-            unique_filename = f"{uuid.uuid4().hex}_{filename}"
-            
-            # Ensure upload directory exists
-            upload_dir = os.path.join(current_app.static_folder, 'uploads', 'dives')
-            os.makedirs(upload_dir, exist_ok=True)
-            
             try:
-                # Save the file
-                file_path = os.path.join(upload_dir, unique_filename)
-                current_app.logger.info(f"Saving file to {file_path}")
-                file.save(file_path)
-                
-                # Update the dive record with the file path
-                relative_path = f'/static/uploads/dives/{unique_filename}'
+                # Store the file and point the dive at it, moving the reference
+                # away from any previous upload
+                relative_path = save_media_file(file)
+                media_store.replace(dive.media, relative_path)
                 dive.media = relative_path
                 db.session.commit()
+                media_store.queue_variants(relative_path)
                 
-                current_app.logger.info(f"File uploaded successfully for dive {dive_id}")
+                current_app.logger.info("File uploaded successfully for dive %s", dive_id)
                 return jsonify({
                     "message": "File uploaded successfully",
                     "media_url": relative_path
                 }), 201
+            except ValueError as e:
+                db.session.rollback()
+                return jsonify({"error": str(e)}), 400
             except Exception as e:
-                current_app.logger.error(f"Error saving file for dive {dive_id}: {str(e)}", exc_info=True)
+                db.session.rollback()
+                current_app.logger.error("Error saving file for dive %s: %s", dive_id, e, exc_info=True)
                 return jsonify({"error": f"Error saving file: {str(e)}"}), 500
         
-        current_app.logger.warning(f"Invalid file type for dive {dive_id}")
+        current_app.logger.warning("Invalid file type for dive %s", dive_id)
         return jsonify({"error": "Invalid file type"}), 400
     except Exception as e:
-        current_app.logger.error(f"Unhandled exception in upload_dive_media: {str(e)}", exc_info=True)
+        current_app.logger.error("Unhandled exception in upload_dive_media: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
+# PUT /api/dives/<dive_id>/media - Stream a raw image body (no multipart buffering)
+# The file type comes from ?filename= or the Content-Type header.
+@dives_bp.route('/<int:dive_id>/media', methods=['PUT'])
+@login_required
+@limiter.limit('upload')
+@lifecycle.upload
+@validated()
+def stream_dive_media(dive_id):
+    dive = check_dive_ownership(dive_id)
+    content_type = request.mimetype or ''
+    filename = request.args.get('filename') or f"upload.{content_type.rsplit('/', 1)[-1]}"
+    
+    try:
+        blob = media_store.save(request.stream, filename, content_type)
+        relative_path = media_store.url(blob)
+        media_store.replace(dive.media, relative_path)
+        dive.media = relative_path
+        db.session.commit()
+        media_store.queue_variants(relative_path)
+        return jsonify({
+            "message": "File uploaded successfully",
+            "media_url": relative_path
+        }), 201
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error("Error streaming media for dive %s: %s", dive_id, e, exc_info=True)
+        return jsonify({"error": f"Error saving file: {str(e)}"}), 500
+
 # POST /api/dives/<dive_id>/upload-csv - Upload CSV profile for a dive
 @dives_bp.route('/<int:dive_id>/upload-csv', methods=['POST'])
 @login_required
+@limiter.limit('upload')
+@lifecycle.upload
+@validated()
 def upload_dive_csv(dive_id):
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            csrf_token_form = request.form.get('csrf_token')
-            current_app.logger.debug(f"CSRF token from header: {token}")
-            current_app.logger.debug(f"CSRF token from form: {csrf_token_form}")
-            
-            try:
-                # Try header token first, then form token
-                if token:
-                    validate_csrf(token)
-                elif csrf_token_form:
-                    validate_csrf(csrf_token_form)
-                else:
-                    raise CSRFError("The CSRF token is missing.")
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
-        
         dive = check_dive_ownership(dive_id)
         
-        # Debug info
-        current_app.logger.info(f"Upload-CSV request for dive {dive_id}")
-        current_app.logger.info(f"Request content type: {request.content_type}")
-        current_app.logger.info(f"Files in request: {list(request.files.keys())}")
-        current_app.logger.info(f"Form data in request: {list(request.form.keys())}")
+        current_app.logger.debug("Upload-CSV request for dive %s: content type %s, files %s, form fields %s",
+                                 dive_id, request.content_type, list(request.files), list(request.form))
         
         # Handle case when no file is in the request
         if 'profile_csv' not in request.files:
@@ -319,78 +543,26 @@ def upload_dive_csv(dive_id):
             return jsonify({"error": "No CSV file provided"}), 400
             
         file = request.files['profile_csv']
-        current_app.logger.info(f"Received file: {file.filename}, mimetype: {file.mimetype}")
+        current_app.logger.debug("Received file %s (%s)", file.filename, file.mimetype)
         
-        # Handle empty filename
-        if file.filename == '' or not file.filename:
-            current_app.logger.warning("Empty filename")
-            return jsonify({"error": "No file selected"}), 400
-            
-        # Check file extension
-        if not file.filename.lower().endswith('.csv'):
-            current_app.logger.warning(f"Invalid file extension: {file.filename}")
-            return jsonify({"error": "File must have .csv extension"}), 400
-            
         try:
-            # Save file content to memory first
-            file_content = file.read()
-            
-            # Check if file is empty
-            if len(file_content) == 0:
-                current_app.logger.warning("Empty file")
-                return jsonify({"error": "CSV file is empty"}), 400
-                
-            # Try to decode as UTF-8
-            try:
-                csv_content = file_content.decode('utf-8')
-            except UnicodeDecodeError:
-                current_app.logger.warning("Failed to decode as UTF-8, trying with Latin-1")
-                try:
-                    csv_content = file_content.decode('latin-1')
-                except:
-                    current_app.logger.error("Failed to decode file as text")
-                    return jsonify({"error": "Could not read file as text"}), 400
-            
-            current_app.logger.info(f"CSV content length: {len(csv_content)} bytes")
+            csv_content = read_profile_csv(file)
             
-            # Check if content is empty after stripping whitespace
-            if len(csv_content.strip()) == 0:
-                current_app.logger.warning("CSV content is empty")
-                return jsonify({"error": "CSV file contains no data"}), 400
-            
-            # Basic validation of CSV format
-            lines = csv_content.strip().split('\n')
-            current_app.logger.info(f"CSV has {len(lines)} lines")
-            
-            if len(lines) < 2:  # At least a header and one data row
-                current_app.logger.warning("CSV has too few lines")
-                return jsonify({"error": "CSV must have a header row and at least one data row"}), 400
-                
-            # Check if file has comma-separated values
-            if ',' not in lines[0]:
-                current_app.logger.warning("CSV header has no commas")
-                return jsonify({"error": "CSV must contain comma-separated values"}), 400
-                
-            # Check if it has columns for time and depth
-            header_row = lines[0].lower()
-            if not any(word in header_row for word in ['time', 'minute', 'min']) or \
-            not any(word in header_row for word in ['depth', 'profundidad', 'tiefe']):
-                current_app.logger.warning("CSV missing required columns")
-                return jsonify({"error": "CSV must have columns for time and depth"}), 400
-                
             # All checks passed, store CSV data
             dive.profile_csv_data = csv_content
             db.session.commit()
             
-            current_app.logger.info(f"CSV data successfully saved for dive {dive_id}")
+            current_app.logger.info("Saved CSV profile for dive %s (%d bytes)", dive_id, len(csv_content))
             return jsonify({
                 "message": "CSV data uploaded successfully"
             }), 201
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         except Exception as e:
-            current_app.logger.error(f"Error processing CSV: {str(e)}", exc_info=True)
+            current_app.logger.error("Error processing CSV: %s", e, exc_info=True)
             return jsonify({"error": f"Error processing CSV file: {str(e)}"}), 400
     except Exception as e:
-        current_app.logger.error(f"Unhandled exception in upload_dive_csv: {str(e)}", exc_info=True)
+        current_app.logger.error("Unhandled exception in upload_dive_csv: %s", e, exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
 # Helper: Get sample CSV data
@@ -1 +1,13 @@
-# Error handling routes 
\ No newline at end of file
+# Error handling routes
+from flask import current_app, jsonify, request
+from flask_wtf.csrf import CSRFError
+from app.errors import bp
+
+
+# Answer CSRF failures on the JSON API with JSON instead of an HTML page
+@bp.app_errorhandler(CSRFError)
+def handle_csrf_error(e):
+    current_app.logger.warning("CSRF token validation failed: %s", e.description)
+    if request.path.startswith('/api/'):
+        return jsonify({"error": "Invalid or missing CSRF token"}), 400
+    return e
@@ -0,0 +1,94 @@
+# Conditional GET support for the JSON read APIs
+#
+# Views decorated with `conditional` compute a cheap version stamp (a couple of
+# aggregate columns or a single row's `updated_at`) before doing any real work.
+# The stamp is hashed into an ETag so a matching `If-None-Match` can be answered
+# with 304 without loading or serializing the payload.
+import hashlib
+from functools import wraps
+from flask import g, request, make_response, current_app
+from flask_login import current_user
+from sqlalchemy import func
+from app import db
+
+# Clients must revalidate user data on every read; the 304 keeps that cheap
+PRIVATE_CACHE_CONTROL = 'private, no-cache'
+# Shared catalogue data (sites, reviews, warnings) may be reused briefly
+PUBLIC_CACHE_CONTROL = 'public, max-age=60, must-revalidate'
+
+
+# Hash arbitrary version parts into an opaque ETag value
+def compute_etag(*parts):
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:32]
+
+
+# Cheap version stamp for a set of rows: (row count, max id, max updated_at)
+def collection_stamp(model, *criteria):
+    query = db.session.query(
+        func.count(model.id),
+        func.max(model.id),
+        func.max(model.updated_at)
+    )
+    if criteria:
+        query = query.filter(*criteria)
+    return tuple(query.one())
+
+
+# Version stamp for a single row, or None if it does not exist
+def row_stamp(model, row_id):
+    row = db.session.query(model.updated_at).filter(model.id == row_id).first()
+    if row is None:
+        return None
+    return (row_id, row[0])
+
+
+def _apply_validators(response, etag, cache_control, per_user):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    if per_user:
+        response.vary.add('Cookie')
+    return response
+
+
+def conditional(stamp_func, cache_control=PRIVATE_CACHE_CONTROL, per_user=False, etag_func=None):
+    """Answer If-None-Match from a version stamp before running the view.
+
+    `stamp_func` receives the view's keyword arguments and returns a hashable
+    tuple, or None to skip conditional handling (e.g. missing or forbidden
+    rows, which the view itself reports). `etag_func`, if given, turns the
+    stamp into the ETag instead of hashing it, for resources whose ETag other
+    handlers must reproduce (e.g. to check If-Match).
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config.get('ETAGS_ENABLED', True):
+                return f(*args, **kwargs)
+
+            stamp = stamp_func(**kwargs)
+            if stamp is None:
+                return f(*args, **kwargs)
+
+            if etag_func is not None:
+                etag = etag_func(stamp)
+            else:
+                parts = [request.endpoint, stamp, sorted(request.args.items(multi=True))]
+                if per_user:
+                    parts.append(current_user.get_id() if current_user.is_authenticated else None)
+                etag = compute_etag(*parts)
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                return _apply_validators(response, etag, cache_control, per_user)
+
+            # Lets the response cache key the payload by the version it goes out as
+            g.response_etag = etag
+            try:
+                response = make_response(f(*args, **kwargs))
+            finally:
+                g.pop('response_etag', None)
+            if response.status_code == 200:
+                _apply_validators(response, etag, cache_control, per_user)
+            return response
+        return decorated_function
+    return decorator
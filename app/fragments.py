@@ -0,0 +1,132 @@
+# Template fragment cache
+#
+# `{% cache 'name', part, ... %}...{% endcache %}` stores the rendered body
+# under (template, name, locale, parts). Callers put the object's version in
+# the parts, so an edited dive renders a fresh fragment and its old one ages
+# out of the LRU. Dives also carry a generation counter that is bumped when a
+# transaction touching them commits, for changes that leave updated_at alone.
+import hashlib
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from flask import current_app, g, has_app_context
+from app.caching import CacheMetrics, invalidate_on_commit, make_backend
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja extension providing the `{% cache %}` block tag."""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        parts = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            parts.append(parser.parse_expression())
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        # Templates built from strings have no name; identify them by their body
+        template_name = parser.name or 'string:' + hashlib.sha1(repr(body).encode('utf-8')).hexdigest()[:12]
+        args = [nodes.Const(template_name), nodes.List(parts)]
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, template_name, parts, caller):
+        if not has_app_context() or 'fragment_cache' not in current_app.extensions:
+            return caller()
+        return FragmentCache().get_or_render(template_name, parts, caller)
+
+
+class FragmentCache:
+    """Flask extension holding rendered template fragments."""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('FRAGMENT_CACHE_BACKEND', 'lru')
+        app.config.setdefault('FRAGMENT_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('FRAGMENT_CACHE_MAX_ENTRIES', 10000)
+        app.config.setdefault('FRAGMENT_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        app.config.setdefault('FRAGMENT_CACHE_DEFAULT_LOCALE', 'en')
+
+        app.extensions['fragment_cache'] = {
+            'backend': make_backend(
+                app.config['FRAGMENT_CACHE_BACKEND'],
+                app.config['FRAGMENT_CACHE_REDIS_URL'],
+                max_entries=app.config['FRAGMENT_CACHE_MAX_ENTRIES'],
+                max_bytes=app.config['FRAGMENT_CACHE_MAX_BYTES'],
+                prefix='divelogger:fragments'
+            ),
+            'metrics': CacheMetrics()
+        }
+
+        app.jinja_env.add_extension(FragmentCacheExtension)
+        app.add_template_global(self.dive_version, 'dive_version')
+
+        from app import db
+        invalidate_on_commit(db.session, 'fragment_cache', _edited_dive_ids, _bump_dives)
+
+    @property
+    def _state(self):
+        return current_app.extensions['fragment_cache']
+
+    @property
+    def backend(self):
+        return self._state['backend']
+
+    def _count(self, name):
+        self._state['metrics'].count(name)
+
+    def locale(self):
+        return g.get('locale') or current_app.config['FRAGMENT_CACHE_DEFAULT_LOCALE']
+
+    def key(self, template_name, parts):
+        suffix = ':'.join(str(part) for part in parts)
+        return f"fragment:{template_name}:{self.locale()}:{suffix}"
+
+    def get_or_render(self, template_name, parts, render):
+        key = self.key(template_name, parts)
+        html = self.backend.get(key)
+        if html is not None:
+            self._count('hits')
+            return Markup(html)
+
+        self._count('misses')
+        html = render()
+        self.backend.set(key, str(html))
+        return Markup(html)
+
+    def dive_generation(self, dive_id):
+        return self.backend.get_counter(f"ver:dive:{dive_id}")
+
+    def bump_dive(self, dive_id):
+        return self.backend.incr(f"ver:dive:{dive_id}")
+
+    def dive_version(self, dive):
+        """Cache-key part identifying the current state of a dive."""
+        stamp = dive.updated_at.isoformat() if dive.updated_at else ''
+        return f"{dive.id}@{stamp}g{self.dive_generation(dive.id)}"
+
+    def metrics(self):
+        return self._state['metrics'].report(self.backend)
+
+
+# ---------------------------------------------------------------------------
+# Invalidation: dives edited or deleted in a transaction get their generation
+# bumped once it commits, so every fragment keyed on them is skipped.
+# ---------------------------------------------------------------------------
+
+def _edited_dive_ids(session):
+    from app.models import Dive
+
+    return {
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Dive) and obj.id is not None
+    }
+
+
+def _bump_dives(dive_ids):
+    fragments = FragmentCache()
+    for dive_id in dive_ids:
+        fragments.bump_dive(dive_id)
@@ -0,0 +1,22 @@
+from flask import jsonify, current_app
+from sqlalchemy import text
+from app import db, lifecycle
+from app.health import health_bp
+
+# Liveness: the process is up and serving requests
+@health_bp.route('/healthz', methods=['GET'])
+def healthz():
+    return jsonify({"status": "ok"}), 200
+
+# Readiness: this worker should receive traffic
+# Fails while draining for shutdown or when the primary database is unreachable.
+@health_bp.route('/readyz', methods=['GET'])
+def readyz():
+    if lifecycle.is_draining():
+        return jsonify({"status": "draining", "uploads_in_flight": lifecycle.uploads_in_flight()}), 503
+    try:
+        db.session.execute(text('SELECT 1'))
+    except Exception as e:
+        current_app.logger.warning("Readiness check failed: %s", e)
+        return jsonify({"status": "unavailable", "error": "Database is unreachable"}), 503
+    return jsonify({"status": "ready"}), 200
@@ -0,0 +1,69 @@
+# Worker lifecycle: draining before shutdown
+#
+# When the server asks a worker to stop (gunicorn sends SIGTERM, see
+# gunicorn.conf.py) the worker starts draining: /readyz answers 503 so the
+# load balancer stops routing to it, uploads already streaming are allowed to
+# finish, and new uploads are turned away with Retry-After so the client
+# retries on a worker that is staying up.
+import time
+import threading
+from functools import wraps
+from flask import current_app, jsonify
+
+
+class Lifecycle:
+    """Flask extension tracking draining state and in-flight uploads."""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['lifecycle'] = {
+            'draining': threading.Event(),
+            'uploads': 0,
+            'condition': threading.Condition()
+        }
+
+    def _state(self, app=None):
+        return (app or current_app).extensions['lifecycle']
+
+    def begin_drain(self, app=None):
+        self._state(app)['draining'].set()
+
+    def is_draining(self, app=None):
+        return self._state(app)['draining'].is_set()
+
+    def uploads_in_flight(self, app=None):
+        state = self._state(app)
+        with state['condition']:
+            return state['uploads']
+
+    def wait_for_uploads(self, timeout, app=None):
+        """Block until no upload is running or `timeout` passes; return how many remain."""
+        state = self._state(app)
+        deadline = time.monotonic() + timeout
+        with state['condition']:
+            while state['uploads'] and time.monotonic() < deadline:
+                state['condition'].wait(deadline - time.monotonic())
+            return state['uploads']
+
+    def upload(self, f):
+        """Decorator counting a view as an in-flight upload, refused while draining."""
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            state = self._state()
+            with state['condition']:
+                if state['draining'].is_set():
+                    response = jsonify({"error": "Server is restarting, please retry the upload"})
+                    response.headers['Retry-After'] = '1'
+                    return response, 503
+                state['uploads'] += 1
+            try:
+                return f(*args, **kwargs)
+            finally:
+                with state['condition']:
+                    state['uploads'] -= 1
+                    state['condition'].notify_all()
+        return decorated_function
@@ -0,0 +1,232 @@
+# Structured, asynchronous logging
+#
+# Everything logged under the `app` logger (current_app.logger and the module
+# loggers in app.*) goes through one pipeline. The request thread only builds
+# the record, stamps it with the request id, method and path, and puts it on a
+# bounded queue; a QueueListener thread turns it into one JSON object per line
+# and does the write. If the queue is full the record is dropped and counted
+# rather than making the request wait.
+#
+# The request id comes from an incoming X-Request-ID header or is generated,
+# and is echoed on the response so client, proxy and server logs line up.
+# DEBUG lines are sampled per request with LOG_DEBUG_SAMPLE_RATE: a sampled
+# request keeps all of its debug lines, the others keep none.
+import os
+import re
+import sys
+import copy
+import json
+import uuid
+import zlib
+import queue
+import random
+import atexit
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from flask import current_app, g, has_request_context, request
+from flask.logging import default_handler
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+
+# Attributes every record has; anything else was passed with extra={...}
+RECORD_ATTRIBUTES = frozenset(vars(logging.makeLogRecord({}))) | {
+    'message', 'asctime', 'request_id', 'method', 'path'
+}
+
+# Incoming request ids are echoed into logs and headers, so keep them tame
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with request fields and extra={...} values."""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key in ('request_id', 'method', 'path'):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str)
+
+
+def is_sampled(request_id, rate):
+    """Whether DEBUG lines are kept; decided once per request id."""
+    if rate >= 1:
+        return True
+    if rate <= 0:
+        return False
+    if request_id is None:
+        return random.random() < rate
+    return zlib.crc32(request_id.encode()) % 10000 < rate * 10000
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request and sample DEBUG lines."""
+
+    def __init__(self, debug_sample_rate=1.0):
+        super().__init__()
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+        elif not hasattr(record, 'request_id'):
+            record.request_id = None
+        if record.levelno <= logging.DEBUG:
+            return is_sampled(record.request_id, self.debug_sample_rate)
+        return True
+
+
+class AsyncQueueHandler(QueueHandler):
+    """QueueHandler that never blocks: records are dropped when the queue is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Fix the message now, since the arguments may change once the call
+        # returns, but leave JSON encoding and the write to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Flask extension sending the app's logs through a queue to a writer thread."""
+
+    def __init__(self, app=None):
+        self.app = app
+        self.logger = None
+        self.handler = None
+        self.listener = None
+        self._hooks_installed = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOG_LEVEL', None)
+        app.config.setdefault('LOG_FORMAT', 'json')
+        app.config.setdefault('LOG_FILE', None)
+        app.config.setdefault('LOG_FILE_MAX_BYTES', 10 * 1024 * 1024)
+        app.config.setdefault('LOG_FILE_BACKUPS', 5)
+        app.config.setdefault('LOG_ASYNC', True)
+        app.config.setdefault('LOG_QUEUE_SIZE', 10000)
+        app.config.setdefault('LOG_DEBUG_SAMPLE_RATE', 1.0)
+        app.config.setdefault('LOG_REQUEST_ID_HEADER', 'X-Request-ID')
+
+        app.extensions['logs'] = self
+        app.before_request(self._assign_request_id)
+        app.after_request(self._echo_request_id)
+        self.configure(app)
+
+    def configure(self, app):
+        """Install the pipeline on app.logger, replacing any earlier one.
+
+        Every app object shares the `app` logger, so a later create_app()
+        (tests build one per case) takes over from the previous pipeline.
+        """
+        self.stop()
+        logger = app.logger
+        logger.removeHandler(default_handler)
+        logger.setLevel(app.config['LOG_LEVEL'] or ('DEBUG' if app.debug else 'INFO'))
+
+        if app.config['LOG_FILE']:
+            target = RotatingFileHandler(app.config['LOG_FILE'], maxBytes=app.config['LOG_FILE_MAX_BYTES'],
+                                         backupCount=app.config['LOG_FILE_BACKUPS'])
+        else:
+            target = logging.StreamHandler(sys.stderr)
+        if app.config['LOG_FORMAT'] == 'json':
+            target.setFormatter(JsonFormatter())
+        else:
+            target.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        if app.config['LOG_ASYNC']:
+            handler = AsyncQueueHandler(queue.Queue(app.config['LOG_QUEUE_SIZE']))
+            self.listener = QueueListener(handler.queue, target, respect_handler_level=True)
+            self.listener.start()
+        else:
+            handler = target
+        # Request fields must be read on the request thread, before queueing
+        handler.addFilter(RequestContextFilter(app.config['LOG_DEBUG_SAMPLE_RATE']))
+        logger.addHandler(handler)
+        self.logger = logger
+        self.handler = handler
+
+        if not self._hooks_installed:
+            atexit.register(self.stop)
+            os.register_at_fork(after_in_child=self._restart_listener)
+            self._hooks_installed = True
+
+    def stop(self):
+        """Write out queued records and detach the pipeline."""
+        if self.handler is None:
+            return
+        self.logger.removeHandler(self.handler)
+        if self.listener is not None:
+            self.listener.stop()
+            for target in self.listener.handlers:
+                target.close()
+            self.listener = None
+        else:
+            self.handler.close()
+        self.handler = None
+
+    def _restart_listener(self):
+        # Threads do not survive fork (gunicorn forks workers from a preloaded
+        # app), so each child needs its own queue and listener
+        if self.listener is None:
+            return
+        log_queue = queue.Queue(self.handler.queue.maxsize)
+        self.handler.queue = log_queue
+        self.handler.dropped = 0
+        self.listener = QueueListener(log_queue, *self.listener.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stats(self):
+        if self.listener is None:
+            return {'async': False}
+        return {
+            'async': True,
+            'queued': self.handler.queue.qsize(),
+            'dropped': self.handler.dropped
+        }
+
+    def _assign_request_id(self):
+        incoming = request.headers.get(self._header(), '')
+        g.request_id = incoming if REQUEST_ID_PATTERN.fullmatch(incoming) else uuid.uuid4().hex
+
+    def _echo_request_id(self, response):
+        if 'request_id' in g:
+            response.headers[self._header()] = g.request_id
+        return response
+
+    def _header(self):
+        return current_app.config['LOG_REQUEST_ID_HEADER']
@@ -5,7 +5,10 @@ from app.models import Dive, User, Share
 from flask_login import current_user, login_required
 from sqlalchemy import func
 from datetime import datetime
-from app import db
+from app import db, cache, media_store
+from app.services import logbook
+from app.services import stats as stats_service
+from app.etag import collection_stamp, compute_etag
 import re
 
 @bp.route('/')
@@ -33,290 +36,58 @@ def my_logs():
     if request.args.get('success') == 'dive_created':
         success_message = "Dive log created successfully!"
     
-    # Start with base query for current user's dives
-    query = Dive.query.filter_by(user_id=user_id)
-    
-    # Handle filters from query parameters
-    if request.args:
-        # Date filters
-        if request.args.get('date_from'):
-            try:
-                date_from = datetime.strptime(request.args.get('date_from'), '%Y-%m-%d')
-                query = query.filter(Dive.start_time >= date_from)
-            except ValueError:
-                pass
-                
-        if request.args.get('date_to'):
-            try:
-                date_to = datetime.strptime(request.args.get('date_to'), '%Y-%m-%d')
-                # Add one day to include the entire day
-                date_to = date_to.replace(hour=23, minute=59, second=59)
-                query = query.filter(Dive.start_time <= date_to)
-            except ValueError:
-                pass
-        
-        # Location filter
-        if request.args.get('location'):
-            query = query.filter(Dive.location == request.args.get('location'))
-        
-        # Depth filters
-        if request.args.get('min_depth'):
-            try:
-                min_depth = float(request.args.get('min_depth'))
-                query = query.filter(Dive.max_depth >= min_depth)
-            except ValueError:
-                pass
-                
-        if request.args.get('max_depth'):
-            try:
-                max_depth = float(request.args.get('max_depth'))
-                query = query.filter(Dive.max_depth <= max_depth)
-            except ValueError:
-                pass
-    
-    # Order by date (newest first)
-    dives = query.order_by(Dive.start_time.desc()).all()
-    
-    # Calculate diving statistics
-    stats = {}
-    
-    # Get all dives for stats calculation
-    all_dives = Dive.query.filter_by(user_id=user_id).all()
-    
-    if all_dives:
-        max_depth_dive = max(all_dives, key=lambda dive: dive.max_depth)
-        stats['total_dives'] = len(all_dives)
-        stats['max_depth'] = max_depth_dive.max_depth
-        
-        # Calculate total dive time and longest dive
-        longest_dive = None
-        total_dive_minutes = 0
-        
-        for dive in all_dives:
-            if dive.start_time and dive.end_time:
-                duration_minutes = (dive.end_time - dive.start_time).total_seconds() / 60
-                total_dive_minutes += duration_minutes
-                
-                if longest_dive is None or duration_minutes > longest_dive[1]:
-                    longest_dive = (dive, duration_minutes)
-        
-        if longest_dive:
-            stats['longest_dive'] = round(longest_dive[1])
-        else:
-            stats['longest_dive'] = 0
-            
-        stats['total_dive_time'] = round(total_dive_minutes / 60, 1)  # Convert to hours
-    else:
-        stats = {
-            'total_dives': 0,
-            'max_depth': 0,
-            'longest_dive': 0,
-            'total_dive_time': 0
-        }
-    
-    # Get unique dive locations for filter dropdown
-    locations = db.session.query(Dive.location).filter_by(user_id=user_id).distinct().all()
-    locations = [location[0] for location in locations]
+    # Render only the first page; my_logs.js fetches the rest from my_logs_page
+    filters = logbook.filter_params(request.args)
+    try:
+        dives, next_cursor = logbook.dive_page(
+            user_id, filters,
+            cursor=request.args.get('cursor'),
+            limit=current_app.config['MY_LOGS_PAGE_SIZE']
+        )
+    except ValueError:
+        abort(400)
+    
+    # Header stats and the location filter come from the per-user cache, which
+    # is invalidated on dive writes, so only this page's dives are loaded. The
+    # dive stamp keys the entries too, so a worker that missed another worker's
+    # version bump recomputes instead of rendering old totals
+    stamp = compute_etag(collection_stamp(Dive, Dive.user_id == user_id))
+    stats = cache.cached_for_user(user_id, 'summary', lambda: stats_service.summary(user_id), stamp)
+    locations = cache.cached_for_user(user_id, 'filter-locations', lambda: logbook.locations(user_id), stamp)
+    
+    # Look up the card-sized image renditions for the whole grid at once
+    media_store.prefetch_variants([dive.media for dive in dives])
     
     return render_template('my_logs.html', title='My Dive Logs', dives=dives, 
-                          locations=locations, success_message=success_message)
+                          locations=locations, success_message=success_message,
+                          filters=filters, next_cursor=next_cursor, stats=stats)
+
+# Next page of My Logs cards as an HTML fragment for infinite scroll
+@bp.route('/my-logs/page')
+@login_required
+def my_logs_page():
+    filters = logbook.filter_params(request.args)
+    try:
+        dives, next_cursor = logbook.dive_page(
+            current_user.id, filters,
+            cursor=request.args.get('cursor'),
+            limit=logbook.page_size(request.args.get('limit', current_app.config['MY_LOGS_PAGE_SIZE']))
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    media_store.prefetch_variants([dive.media for dive in dives])
+    return jsonify({
+        'html': render_template('components/log_cards.html', dives=dives),
+        'count': len(dives),
+        'next_cursor': next_cursor
+    })
 
 @bp.route('/diving-stats')
 @login_required
 def diving_stats():
-    # Use the current authenticated user's ID
-    user_id = current_user.id
-    
-    # Get all dives for this user ordered by date
-    all_dives = Dive.query.filter_by(user_id=user_id).order_by(Dive.start_time.asc()).all()
-    
-    # Calculate diving statistics
-    stats = {}
-    
-    if all_dives:
-        max_depth_dive = max(all_dives, key=lambda dive: dive.max_depth)
-        stats['total_dives'] = len(all_dives)
-        stats['max_depth'] = max_depth_dive.max_depth
-        
-        # Calculate total dive time and longest dive
-        longest_dive = None
-        total_dive_minutes = 0
-        
-        for dive in all_dives:
-            if dive.start_time and dive.end_time:
-                duration_minutes = (dive.end_time - dive.start_time).total_seconds() / 60
-                total_dive_minutes += duration_minutes
-                
-                if longest_dive is None or duration_minutes > longest_dive[1]:
-                    longest_dive = (dive, duration_minutes)
-        
-        if longest_dive:
-            stats['longest_dive'] = round(longest_dive[1])
-        else:
-            stats['longest_dive'] = 0
-            
-        stats['total_dive_time'] = round(total_dive_minutes / 60, 1)  # Convert to hours
-    else:
-        stats = {
-            'total_dives': 0,
-            'max_depth': 0,
-            'longest_dive': 0,
-            'total_dive_time': 0
-        }
-        
-    # Prepare data for charts
-    dive_data = {
-        'dates': [],
-        'depths': [],
-        'durations': [],
-        'locations': [],
-        'dives_per_location': [],
-        'months': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
-        'dives_per_month': [0] * 12,
-        'coordinates': [],  # For heatmap
-        'location_names': [],  # Names for markers
-        'dives_count': [],  # Count of dives per location for markers
-        'species_names': [],  # For species pie chart
-        'species_counts': [],  # Count of each species
-        'top_species': []  # Top species with details
-    }
-    
-    if all_dives:
-        # Process data for time-series charts
-        for dive in all_dives:
-            # Format date for chart
-            if dive.start_time:
-                formatted_date = dive.start_time.strftime('%d %b %Y')
-                dive_data['dates'].append(formatted_date)
-                dive_data['depths'].append(dive.max_depth)
-                
-                # Calculate duration
-                if dive.end_time:
-                    duration = (dive.end_time - dive.start_time).total_seconds() / 60
-                    dive_data['durations'].append(round(duration))
-                else:
-                    dive_data['durations'].append(0)
-                
-                # Count dives per month
-                month_idx = dive.start_time.month - 1  # 0-based index
-                dive_data['dives_per_month'][month_idx] += 1
-        
-        # Process data for location chart and map
-        location_counts = {}
-        location_coordinates = {}  # Store coordinates for each location
-        
-        for dive in all_dives:
-            if dive.location:
-                # Extract coordinates from location string if available
-                # Common format: "Location Name (lat, lng)"
-                coords_match = re.search(r'\((-?\d+\.?\d*),\s*(-?\d+\.?\d*)\)', dive.location)
-                
-                if coords_match:
-                    try:
-                        lat = float(coords_match.group(1))
-                        lng = float(coords_match.group(2))
-                        
-                        # Extract the location name (everything before the coordinates)
-                        location_name = dive.location.split('(')[0].strip()
-                        
-                        # Count dives per location
-                        if location_name in location_counts:
-                            location_counts[location_name] += 1
-                        else:
-                            location_counts[location_name] = 1
-                            location_coordinates[location_name] = (lat, lng)
-                    except ValueError:
-                        # If conversion fails, just use the full location name
-                        if dive.location in location_counts:
-                            location_counts[dive.location] += 1
-                        else:
-                            location_counts[dive.location] = 1
-                else:
-                    # No coordinates in string, just use the full location
-                    if dive.location in location_counts:
-                        location_counts[dive.location] += 1
-                    else:
-                        location_counts[dive.location] = 1
-        
-        # Sort locations by number of dives (descending)
-        sorted_locations = sorted(location_counts.items(), key=lambda x: x[1], reverse=True)
-        
-        # Take top 8 locations max to avoid crowding the chart
-        for loc, count in sorted_locations[:8]:
-            dive_data['locations'].append(loc)
-            dive_data['dives_per_location'].append(count)
-        
-        # Prepare data for the map
-        for loc, coords in location_coordinates.items():
-            dive_data['coordinates'].append([coords[0], coords[1]])
-            dive_data['location_names'].append(loc)
-            dive_data['dives_count'].append(location_counts[loc])
-            
-        # NEW: Collect species data from all dives
-        from app.models import DiveSpecies
-        species_counts = {}
-        
-        # Query all species related to the user's dives
-        dive_ids = [dive.id for dive in all_dives]
-        all_species = DiveSpecies.query.filter(DiveSpecies.dive_id.in_(dive_ids)).all()
-        
-        for species in all_species:
-            # Use the common name as key if available, otherwise scientific name
-            species_name = species.common_name if species.common_name else species.scientific_name
-            
-            if species_name in species_counts:
-                species_counts[species_name]['count'] += 1
-                species_counts[species_name]['instances'].append(species)
-            else:
-                species_counts[species_name] = {
-                    'count': 1,
-                    'scientific_name': species.scientific_name,
-                    'taxon_id': species.taxon_id,
-                    'instances': [species]
-                }
-        
-        # Sort species by observation count (descending)
-        sorted_species = sorted(species_counts.items(), key=lambda x: x[1]['count'], reverse=True)
-        
-        # Prepare data for the species pie chart
-        for name, data in sorted_species:
-            dive_data['species_names'].append(name)
-            dive_data['species_counts'].append(data['count'])
-            
-        # NEW: Get top 3 species with images from iNaturalist API
-        import requests
-        
-        top_species = []
-        for name, data in sorted_species[:3]:  # Top 3 species
-            species_detail = {
-                'common_name': name,
-                'scientific_name': data['scientific_name'],
-                'count': data['count'],
-                'image_url': None
-            }
-            
-            # Get image URL from iNaturalist API
-            try:
-                # Use taxon ID to get details from API
-                taxon_id = data['taxon_id']
-                api_url = f"https://api.inaturalist.org/v1/taxa/{taxon_id}"
-                response = requests.get(api_url, timeout=5)
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if 'results' in result and len(result['results']) > 0:
-                        taxon = result['results'][0]
-                        # Try to get default photo
-                        if taxon.get('default_photo') and taxon['default_photo'].get('medium_url'):
-                            species_detail['image_url'] = taxon['default_photo']['medium_url']
-            except Exception as e:
-                current_app.logger.error(f"Error fetching image for species {name}: {str(e)}")
-                
-            top_species.append(species_detail)
-            
-        dive_data['top_species'] = top_species
-    
-    return render_template('stats.html', title='Diving Statistics', stats=stats, dive_data=dive_data)
+    # Render the page shell only; stats.js loads each chart from /api/users/<id>/...
+    return render_template('stats.html', title='Diving Statistics', user_id=current_user.id)
 
 @bp.route('/dive/<int:dive_id>')
 def dive_details(dive_id):
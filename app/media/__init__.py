@@ -0,0 +1,274 @@
+# Content-addressed media storage
+#
+# Uploads are streamed to a temporary file in fixed-size chunks while being
+# hashed with SHA-256, then stored once under their digest. MediaBlob rows
+# count how many dives reference each blob; blobs that drop to zero
+# references are removed by `flask media-gc` after a grace period.
+# Resized renditions are produced in a background pool (see images.py).
+import os
+import re
+import time
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app, g
+from app.database import insert_on_conflict
+from app.media.backends import LocalFSBackend, S3Backend, make_backend
+from app.media import images
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+DIGEST_PATTERN = re.compile(r'([0-9a-f]{64})')
+
+
+def blob_key(digest, ext):
+    return f"{digest[:2]}/{digest}.{ext}"
+
+
+def file_extension(filename):
+    if not filename or '.' not in filename:
+        return None
+    ext = filename.rsplit('.', 1)[1].lower()
+    return 'jpg' if ext == 'jpeg' else ext
+
+
+def file_digest(path, chunk_size):
+    """SHA-256 and size of the file at `path`, read in chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as stored:
+        while True:
+            chunk = stored.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest, size
+
+
+class MediaStore:
+    """Flask extension for deduplicated, reference-counted media blobs."""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MEDIA_BACKEND', 'local')
+        app.config.setdefault('MEDIA_CHUNK_SIZE', 64 * 1024)
+        app.config.setdefault('MEDIA_GC_GRACE_SECONDS', 3600)
+        app.config.setdefault('MEDIA_VARIANTS_ASYNC', True)
+        app.config.setdefault('MEDIA_VARIANT_WORKERS', 2)
+        app.extensions['media_store'] = {
+            'backend': make_backend(app.config['MEDIA_BACKEND'], app.config, app.static_folder),
+            'executor': None
+        }
+        app.add_template_filter(self.variant_url, 'media_variant')
+
+    @property
+    def backend(self):
+        return current_app.extensions['media_store']['backend']
+
+    def save(self, stream, filename, content_type=None):
+        """Store an upload and return its MediaBlob (refcount unchanged).
+
+        The blob row is inserted in the current transaction but not committed; callers
+        retain() it and commit together with the row that references it.
+        """
+        from app import db
+        from app.models import MediaBlob
+
+        ext = file_extension(filename)
+        if ext not in ALLOWED_EXTENSIONS:
+            raise ValueError("Invalid file type")
+
+        backend = self.backend
+        chunk_size = current_app.config['MEDIA_CHUNK_SIZE']
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=backend.temp_dir())
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+                    size += len(chunk)
+            if size == 0:
+                raise ValueError("Uploaded file is empty")
+
+            # Originals are public; drop EXIF/GPS before the content is addressed
+            if images.available() and images.strip_metadata(temp_path):
+                digest, size = file_digest(temp_path, chunk_size)
+
+            sha256 = digest.hexdigest()
+            # The row stays locked until the caller commits, so discard() and
+            # collect_garbage() cannot unlink the file while we reference it
+            blob = MediaBlob.query.filter_by(sha256=sha256).with_for_update().first()
+            if blob is None:
+                # A concurrent upload of the same file may insert the row
+                # between our lookup and our insert; then we use theirs
+                insert_on_conflict(MediaBlob, {
+                    'sha256': sha256,
+                    'key': blob_key(sha256, ext),
+                    'size': size,
+                    'content_type': content_type,
+                    'refcount': 0
+                }, ['sha256'])
+                blob = MediaBlob.query.filter_by(sha256=sha256).with_for_update().one()
+            if not backend.exists(blob.key):
+                backend.put(blob.key, temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return blob
+
+    def url(self, blob):
+        return self.backend.url(blob.key)
+
+    def blob_for_url(self, url):
+        from app.models import MediaBlob
+
+        match = DIGEST_PATTERN.search(url or '')
+        if match is None:
+            return None  # legacy upload or external URL
+        return MediaBlob.query.filter_by(sha256=match.group(1)).first()
+
+    def _adjust(self, url, delta):
+        from app.models import MediaBlob
+
+        blob = self.blob_for_url(url)
+        if blob is None:
+            return
+        # Let the database do the arithmetic so concurrent requests don't lose counts
+        MediaBlob.query.filter_by(id=blob.id).update(
+            {MediaBlob.refcount: MediaBlob.refcount + delta, MediaBlob.updated_at: datetime.utcnow()},
+            synchronize_session='fetch'
+        )
+
+    def retain(self, url):
+        self._adjust(url, 1)
+
+    def release(self, url):
+        self._adjust(url, -1)
+
+    def replace(self, old_url, new_url):
+        """Move one reference from old_url to new_url (either may be None)."""
+        if old_url == new_url:
+            return
+        self.release(old_url)
+        self.retain(new_url)
+
+    def discard(self, url):
+        """Delete a stored file whose blob row was rolled back.
+
+        The refcount check and the unlink happen under the blob's row lock.
+        The row is inserted first if it is missing, so an upload of the same
+        file still waiting to commit makes this wait on the unique key instead
+        of losing its file. Commits the session to release the lock.
+        """
+        from app import db
+        from app.models import MediaBlob
+
+        match = DIGEST_PATTERN.search(url or '')
+        if match is None:
+            return
+        sha256 = match.group(1)
+        key = blob_key(sha256, file_extension(url))
+        insert_on_conflict(MediaBlob, {'sha256': sha256, 'key': key, 'size': 0, 'refcount': 0}, ['sha256'])
+        blob = MediaBlob.query.filter_by(sha256=sha256).with_for_update().one()
+        # Renditions are left for collect_garbage, which removes them with the blob
+        if blob.refcount <= 0 and blob.variants.count() == 0:
+            self.backend.delete(blob.key)
+            db.session.delete(blob)
+        db.session.commit()
+
+    def _executor(self):
+        state = current_app.extensions['media_store']
+        if state['executor'] is None:
+            state['executor'] = ThreadPoolExecutor(
+                max_workers=current_app.config['MEDIA_VARIANT_WORKERS'],
+                thread_name_prefix='media-variants'
+            )
+        return state['executor']
+
+    def queue_variants(self, url):
+        """Generate renditions for a committed upload in the background."""
+        if not images.available():
+            return
+        blob = self.blob_for_url(url)
+        if blob is None:
+            return
+        app = current_app._get_current_object()
+        if app.config['MEDIA_VARIANTS_ASYNC']:
+            self._executor().submit(images.generate_variants, app, blob.id)
+        else:
+            images.generate_variants(app, blob.id)
+
+    def prefetch_variants(self, urls):
+        """Load the renditions for many URLs with one query (e.g. a card grid)."""
+        from app import db
+        from app.models import MediaBlob, MediaVariant
+
+        cached = g.setdefault('media_variants', {})
+        digests = {match.group(1) for match in map(DIGEST_PATTERN.search, filter(None, urls)) if match}
+        digests -= set(cached)
+        if not digests:
+            return
+        for digest in digests:
+            cached[digest] = {}
+        rows = db.session.query(MediaBlob.sha256, MediaVariant.name, MediaVariant.format, MediaVariant.key) \
+            .join(MediaVariant, MediaVariant.blob_id == MediaBlob.id) \
+            .filter(MediaBlob.sha256.in_(digests))
+        for digest, name, fmt, key in rows:
+            cached[digest][(name, fmt)] = key
+
+    def variant_url(self, url, name='card', fmt='jpeg'):
+        """URL of the requested rendition, or the original if there is none."""
+        match = DIGEST_PATTERN.search(url or '')
+        if match is None:
+            return url
+        self.prefetch_variants([url])
+        key = g.media_variants[match.group(1)].get((name, fmt))
+        return self.backend.url(key) if key else url
+
+    def collect_garbage(self, grace_seconds=None):
+        """Delete unreferenced blobs and files with no blob row.
+
+        Only objects untouched for `grace_seconds` are removed, so uploads
+        that are still waiting for their transaction to commit survive.
+        """
+        from app import db
+        from app.models import MediaBlob, MediaVariant
+
+        if grace_seconds is None:
+            grace_seconds = current_app.config['MEDIA_GC_GRACE_SECONDS']
+        backend = self.backend
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+
+        blobs = 0
+        # Locked rows are re-checked once a concurrent upload or retain commits,
+        # so a blob that gained a reference meanwhile is skipped
+        unreferenced = MediaBlob.query.filter(MediaBlob.refcount <= 0, MediaBlob.updated_at < cutoff) \
+            .with_for_update()
+        for blob in unreferenced:
+            for variant in blob.variants:
+                backend.delete(variant.key)
+            backend.delete(blob.key)
+            db.session.delete(blob)
+            blobs += 1
+        db.session.commit()
+
+        known = {key for key, in db.session.query(MediaBlob.key)}
+        known.update(key for key, in db.session.query(MediaVariant.key))
+        file_cutoff = time.time() - grace_seconds
+        orphans = 0
+        for key, modified in list(backend.keys()):
+            if key not in known and modified < file_cutoff:
+                backend.delete(key)
+                orphans += 1
+
+        return {'blobs': blobs, 'orphans': orphans}
@@ -0,0 +1,119 @@
+# Blob storage backends for the media store
+#
+# A backend stores immutable blobs under a key ("ab/abcdef...123.jpg") and
+# knows the public URL for each one. Blobs are written once from a finished
+# temporary file, so backends never see partial uploads.
+import io
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LocalFSBackend:
+    """Blobs on the local filesystem, served as static files."""
+
+    def __init__(self, root, url_prefix):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip('/')
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def temp_dir(self):
+        path = os.path.join(self.root, 'tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def put(self, key, temp_path):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Same filesystem as temp_dir(), so this is an atomic rename
+        os.replace(temp_path, path)
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def open(self, key):
+        return open(self._path(key), 'rb')
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def keys(self):
+        """Yield (key, last modified timestamp) for every stored blob."""
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = [d for d in dirnames if d != 'tmp']
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                key = os.path.relpath(path, self.root).replace(os.sep, '/')
+                yield key, os.path.getmtime(path)
+
+    def url(self, key):
+        return f"{self.url_prefix}/{key}"
+
+
+class S3Backend:
+    """Blobs in an S3-compatible bucket (requires `boto3`).
+
+    Point MEDIA_S3_ENDPOINT_URL at a local stand-in such as MinIO for
+    development; leave it unset for AWS.
+    """
+
+    def __init__(self, bucket, endpoint_url=None, public_url=None, temp_root=None):
+        import boto3
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.bucket = bucket
+        base = public_url or f"{(endpoint_url or 'https://s3.amazonaws.com').rstrip('/')}/{bucket}"
+        self.public_url = base.rstrip('/')
+        self.temp_root = temp_root
+
+    def temp_dir(self):
+        os.makedirs(self.temp_root, exist_ok=True)
+        return self.temp_root
+
+    def put(self, key, temp_path):
+        self.client.upload_file(temp_path, self.bucket, key)
+        os.remove(temp_path)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except self.client.exceptions.ClientError:
+            return False
+
+    def open(self, key):
+        body = self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+        return io.BytesIO(body.read())
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def keys(self):
+        """Yield (key, last modified timestamp) for every stored blob."""
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket):
+            for item in page.get('Contents', []):
+                yield item['Key'], item['LastModified'].timestamp()
+
+    def url(self, key):
+        return f"{self.public_url}/{key}"
+
+
+def make_backend(kind, config, static_folder):
+    root = config.get('MEDIA_ROOT') or os.path.join(static_folder, 'uploads', 'media')
+    if kind == 's3':
+        try:
+            return S3Backend(
+                config['MEDIA_S3_BUCKET'],
+                endpoint_url=config.get('MEDIA_S3_ENDPOINT_URL'),
+                public_url=config.get('MEDIA_S3_PUBLIC_URL'),
+                temp_root=os.path.join(root, 'tmp')
+            )
+        except ImportError:
+            logger.warning("boto3 is not installed, falling back to local media storage")
+    return LocalFSBackend(root, config.get('MEDIA_URL_PREFIX', '/static/uploads/media'))
@@ -0,0 +1,137 @@
+# Image derivatives for stored media
+#
+# Uploaded JPEG and PNG originals are re-encoded from their pixels before they
+# are hashed and stored, so EXIF and XMP (GPS position, camera serials) are
+# never written to the public media URL. Each upload then gets thumb/card/full
+# renditions in WebP and JPEG, rendered from pixels as well. Requires Pillow;
+# without it the originals are stored and served unchanged.
+import io
+import os
+import logging
+import tempfile
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - exercised only without Pillow
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each rendition
+VARIANT_SIZES = {
+    'thumb': 160,
+    'card': 480,
+    'full': 1600,
+}
+VARIANT_FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Formats whose stored originals are re-encoded without metadata. GIF has no
+# EXIF block, and re-encoding would drop its animation.
+STRIPPED_FORMATS = {
+    'JPEG': {'quality': 92, 'optimize': True},
+    'PNG': {'optimize': True},
+}
+
+
+
+def available():
+    return Image is not None
+
+
+def variant_key(digest, name, fmt):
+    ext = 'jpg' if fmt == 'jpeg' else fmt
+    return f"variants/{digest[:2]}/{digest}-{name}.{ext}"
+
+
+def strip_metadata(path):
+    """Re-encode the image at `path` in place from its pixels alone.
+
+    Returns False, leaving the file untouched, for formats not in
+    STRIPPED_FORMATS and for files Pillow cannot read.
+    """
+    try:
+        with Image.open(path) as original:
+            pil_format = original.format
+            if pil_format not in STRIPPED_FORMATS:
+                return False
+            icc_profile = original.info.get('icc_profile')
+            # Bake the EXIF orientation into the pixels before it is dropped
+            image = ImageOps.exif_transpose(original)
+            if image.mode == 'P':
+                image = image.convert('RGBA')
+            # A fresh image carries no info dict, so nothing else is written back
+            clean = Image.frombytes(image.mode, image.size, image.tobytes())
+    except (OSError, ValueError, SyntaxError) as e:
+        logger.info("Storing %s unchanged, it could not be decoded: %s", path, e)
+        return False
+
+    options = dict(STRIPPED_FORMATS[pil_format])
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            clean.save(temp_file, pil_format, **options)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return True
+
+
+def render_variants(source, temp_dir):
+    """Yield (name, fmt, width, height, temp_path) for every rendition of `source`."""
+    with Image.open(source) as original:
+        # Apply the EXIF orientation before it is discarded
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ('RGB', 'L'):
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            rgba = image.convert('RGBA')
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            image = background
+        elif image.mode == 'L':
+            image = image.convert('RGB')
+
+        for name, size in VARIANT_SIZES.items():
+            rendition = image.copy()
+            # Never upscale: small originals keep their size
+            rendition.thumbnail((size, size), Image.LANCZOS)
+            for fmt, (pil_format, options) in VARIANT_FORMATS.items():
+                fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+                with os.fdopen(fd, 'wb') as temp_file:
+                    rendition.save(temp_file, pil_format, **options)
+                yield name, fmt, rendition.width, rendition.height, temp_path
+
+
+def generate_variants(app, blob_id):
+    """Create and record all renditions for a blob (runs in a worker thread)."""
+    from app import db, media_store
+    from app.models import MediaBlob, MediaVariant
+
+    with app.app_context():
+        try:
+            blob = db.session.get(MediaBlob, blob_id)
+            if blob is None or blob.variants.count():
+                return
+            backend = media_store.backend
+            with backend.open(blob.key) as stored:
+                source = io.BytesIO(stored.read())
+
+            for name, fmt, width, height, temp_path in render_variants(source, backend.temp_dir()):
+                key = variant_key(blob.sha256, name, fmt)
+                size = os.path.getsize(temp_path)
+                backend.put(key, temp_path)
+                db.session.add(MediaVariant(
+                    blob_id=blob.id, name=name, format=fmt, key=key,
+                    width=width, height=height, size=size
+                ))
+            db.session.commit()
+            logger.info("Generated image variants for blob %s", blob.sha256)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning("Could not generate variants for blob %s: %s", blob_id, e)
+        finally:
+            db.session.remove()
@@ -1,12 +1,11 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
-from app import db, login_manager
+from app import db, login_manager, user_cache, passwords
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.load(int(user_id))
 
 
 class User(db.Model, UserMixin):
@@ -32,10 +31,10 @@ class User(db.Model, UserMixin):
     shark_warnings = db.relationship('SharkWarning', backref='reporter', lazy='dynamic')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = passwords.hash_password(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.verify(self.password_hash, password)
     
     def __repr__(self):
         return f"<User {self.username}>"
@@ -43,9 +42,13 @@ class User(db.Model, UserMixin):
 
 class Dive(db.Model):
     __tablename__ = 'dives'
+    __table_args__ = (
+        # Serves My Logs pages: newest first per user, continued by keyset cursor
+        db.Index('ix_dives_user_start_time', 'user_id', 'start_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     dive_number = db.Column(db.Integer)
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
@@ -59,8 +62,13 @@ class Dive(db.Model):
     media = db.Column(db.String(255))
     location_thumbnail = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     profile_csv_data = db.Column(db.Text)  # Store actual CSV data instead of a file path
 
+    # Optimistic concurrency: every UPDATE checks and bumps `version`
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    __mapper_args__ = {'version_id_col': version}
+
     # Equipment fields
     suit_type = db.Column(db.String(20))        # None, Shorty, Wetsuit, Semi-Dry, Drysuit
     suit_thickness = db.Column(db.Float)        # in mm, 0.0–10.0
@@ -94,6 +102,8 @@ class Dive(db.Model):
             'media': self.media,
             'location_thumbnail': self.location_thumbnail,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'version': self.version,
             'suit_type': self.suit_type,
             'suit_thickness': self.suit_thickness,
             'weight': self.weight,
@@ -108,15 +118,19 @@ class Dive(db.Model):
 
 class DiveSpecies(db.Model):
     __tablename__ = 'dive_species'
+    __table_args__ = (
+        db.UniqueConstraint('dive_id', 'taxon_id', name='uq_dive_species_dive_taxon'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    dive_id = db.Column(db.Integer, db.ForeignKey('dives.id'), nullable=False)
-    taxon_id = db.Column(db.Integer, nullable=False)  # iNaturalist taxon ID
+    dive_id = db.Column(db.Integer, db.ForeignKey('dives.id'), nullable=False, index=True)
+    taxon_id = db.Column(db.Integer, nullable=False, index=True)  # iNaturalist taxon ID
     scientific_name = db.Column(db.String(255), nullable=False)
     common_name = db.Column(db.String(255))
     rank = db.Column(db.String(50))
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f"<DiveSpecies {self.common_name or self.scientific_name} in Dive {self.dive_id}>"
@@ -134,8 +148,85 @@ class DiveSpecies(db.Model):
         }
 
 
+class SpeciesOccurrence(db.Model):
+    """Sightings per (location cell, month, taxon) across all users.
+
+    Maintained incrementally by app.services.occurrence; month 0 holds the
+    all-year total for the cell.
+    """
+    __tablename__ = 'species_occurrence'
+    __table_args__ = (
+        db.UniqueConstraint('cell', 'month', 'taxon_id', name='uq_species_occurrence_cell_month_taxon'),
+        db.Index('ix_species_occurrence_lookup', 'cell', 'month', 'count'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    cell = db.Column(db.String(255), nullable=False)    # normalised dive location name
+    month = db.Column(db.Integer, nullable=False)        # 1-12, 0 = all months
+    taxon_id = db.Column(db.Integer, nullable=False)
+    scientific_name = db.Column(db.String(255), nullable=False)
+    common_name = db.Column(db.String(255))
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SpeciesOccurrence {self.taxon_id} at {self.cell} month {self.month}: {self.count}>"
+
+    def to_dict(self):
+        return {
+            'taxon_id': self.taxon_id,
+            'scientific_name': self.scientific_name,
+            'common_name': self.common_name,
+            'count': self.count
+        }
+
+
+class MediaBlob(db.Model):
+    """A stored media file, addressed by the SHA-256 of its content."""
+    __tablename__ = 'media_blobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    key = db.Column(db.String(255), nullable=False)     # backend storage key
+    size = db.Column(db.Integer, nullable=False)
+    content_type = db.Column(db.String(100))
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relationships
+    variants = db.relationship('MediaVariant', backref='blob', lazy='dynamic',
+                               cascade='all, delete-orphan')
+
+    def __repr__(self):
+        return f"<MediaBlob {self.sha256[:12]} refs={self.refcount}>"
+
+
+class MediaVariant(db.Model):
+    """A resized, metadata-free rendition of a MediaBlob image."""
+    __tablename__ = 'media_variants'
+    __table_args__ = (
+        db.UniqueConstraint('blob_id', 'name', 'format', name='uq_media_variants_blob_name_format'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    blob_id = db.Column(db.Integer, db.ForeignKey('media_blobs.id'), nullable=False, index=True)
+    name = db.Column(db.String(20), nullable=False)      # thumb, card, full
+    format = db.Column(db.String(10), nullable=False)    # webp, jpeg
+    key = db.Column(db.String(255), nullable=False)
+    width = db.Column(db.Integer)
+    height = db.Column(db.Integer)
+    size = db.Column(db.Integer)
+
+    def __repr__(self):
+        return f"<MediaVariant {self.name}.{self.format} of blob {self.blob_id}>"
+
+
 class Site(db.Model):
     __tablename__ = 'sites'
+    __table_args__ = (
+        # Bounding-box lookups for the home map catalogue
+        db.Index('ix_sites_lat_lng', 'lat', 'lng'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -150,6 +241,7 @@ class Site(db.Model):
     best_season = db.Column(db.String(100))
     thumbnail_url = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     reviews = db.relationship('Review', backref='site', lazy='dynamic')
@@ -172,7 +264,8 @@ class Site(db.Model):
             'difficulty': self.difficulty,
             'best_season': self.best_season,
             'thumbnail_url': self.thumbnail_url,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 
@@ -185,6 +278,7 @@ class Review(db.Model):
     rating = db.Column(db.Integer, nullable=False)
     comment = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f"<Review {self.id} by User {self.user_id} for Site {self.site_id}>"
@@ -196,7 +290,8 @@ class Review(db.Model):
             'user_id': self.user_id,
             'rating': self.rating,
             'comment': self.comment,
-            'created_at': self.created_at.isoformat() if self.created_at else None
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
 class Share(db.Model):
@@ -0,0 +1,110 @@
+# Password hashing policy
+#
+# PASSWORD_HASH_METHOD picks the Werkzeug algorithm and work factor, e.g.
+# 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1'. Stored hashes remember the
+# method they were made with, so after the policy changes a user's hash is
+# upgraded the next time they log in with the right password. Verifying is
+# deliberately slow, so logins run it, and any rehash, on a small fixed pool of
+# threads; when PASSWORD_VERIFY_MAX_PENDING checks are already queued, or a
+# check takes longer than PASSWORD_VERIFY_TIMEOUT, logins are turned away
+# instead of piling up behind them.
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from flask import current_app, has_app_context
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_METHOD = f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+# Used when TESTING is on and no method is configured; far too cheap for real accounts
+TESTING_METHOD = 'pbkdf2:sha256:1000'
+
+
+class PasswordVerifyBusy(Exception):
+    """Raised when too many password checks are already waiting."""
+
+
+def canonical_method(method):
+    """Spell out Werkzeug's defaults so methods compare like stored hash prefixes."""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt':
+        n, r, p = (args + ['32768', '8', '1'][len(args):])[:3]
+        return f'scrypt:{int(n)}:{int(r)}:{int(p)}'
+    return method
+
+
+class PasswordHasher:
+    """Flask extension applying the configured password hashing policy."""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', None)
+        app.config.setdefault('PASSWORD_VERIFY_WORKERS', 4)
+        app.config.setdefault('PASSWORD_VERIFY_MAX_PENDING', 32)
+        app.config.setdefault('PASSWORD_VERIFY_TIMEOUT', 10)
+
+        method = app.config['PASSWORD_HASH_METHOD'] or (TESTING_METHOD if app.testing else DEFAULT_METHOD)
+        workers = app.config['PASSWORD_VERIFY_WORKERS']
+        app.extensions['passwords'] = {
+            'method': canonical_method(method),
+            'executor': ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-verify'),
+            'slots': threading.BoundedSemaphore(workers + app.config['PASSWORD_VERIFY_MAX_PENDING'])
+        }
+
+    @property
+    def method(self):
+        if has_app_context() and 'passwords' in current_app.extensions:
+            return current_app.extensions['passwords']['method']
+        return DEFAULT_METHOD
+
+    def hash_password(self, password, method=None):
+        return generate_password_hash(password, method=method or self.method)
+
+    def needs_rehash(self, password_hash):
+        """True when the hash was made with a method other than the current policy."""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def _run(self, func, *args):
+        """Run a hashing call on the verify pool.
+
+        Raises PasswordVerifyBusy when the pool is full, or when the call has
+        not finished within PASSWORD_VERIFY_TIMEOUT; it keeps its slot until
+        it does, so a stalled pool stays full and turns logins away.
+        """
+        if not has_app_context() or 'passwords' not in current_app.extensions:
+            return func(*args)
+
+        state = current_app.extensions['passwords']
+        slots = state['slots']
+        if not slots.acquire(blocking=False):
+            raise PasswordVerifyBusy()
+
+        def task():
+            try:
+                return func(*args)
+            finally:
+                slots.release()
+
+        try:
+            future = state['executor'].submit(task)
+        except BaseException:
+            slots.release()
+            raise
+        try:
+            return future.result(timeout=current_app.config['PASSWORD_VERIFY_TIMEOUT'])
+        except FuturesTimeoutError:
+            raise PasswordVerifyBusy()
+
+    def verify(self, password_hash, password):
+        """Check a password on the verify pool, raising PasswordVerifyBusy when it is full or slow."""
+        return self._run(check_password_hash, password_hash, password)
+
+    def rehash(self, password):
+        """Hash a password under the current policy on the verify pool, like verify."""
+        return self._run(generate_password_hash, password, self.method)
@@ -0,0 +1,176 @@
+# Token-bucket rate limiting for expensive endpoints
+#
+# Each policy in RATELIMIT_POLICIES is a rate such as '10/minute': a bucket
+# holds up to 10 tokens and refills at 10 per minute, so short bursts pass
+# while a sustained flood is held to the rate. Buckets are keyed by client IP
+# or, on login-required routes, by user. Requests finding their bucket empty
+# get a 429 with Retry-After, before the body is parsed or any work is done:
+# limits are checked in a before_request hook registered ahead of CSRFProtect,
+# whose own hook reads the form (for uploads, the whole multipart body).
+import math
+import time
+import logging
+import threading
+from collections import OrderedDict
+from flask import current_app, jsonify, request
+from flask_login import current_user
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_rate(rate):
+    """Return (capacity, tokens per second) for a rate like '10/minute'."""
+    count, _, period = rate.partition('/')
+    seconds = PERIODS.get(period.strip().rstrip('s'))
+    if seconds is None or not count.strip().isdigit() or int(count) < 1:
+        raise ValueError(f"Invalid rate limit {rate!r}")
+    return int(count), int(count) / seconds
+
+
+class MemoryBackend:
+    """Buckets in a per-process dict; the least recently used are dropped first."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._mutex = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        """Take `cost` tokens; return (allowed, tokens left, seconds until allowed)."""
+        now = time.monotonic()
+        with self._mutex:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0 if allowed else (cost - tokens) / rate
+        return allowed, tokens, retry_after
+
+    def reset(self):
+        with self._mutex:
+            self._buckets.clear()
+
+
+# Refill and take atomically on the server, using its clock so that all
+# workers agree on elapsed time
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + (now - updated_at) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens)}
+"""
+
+
+class RedisBackend:
+    """Buckets shared by all workers on a local Redis-compatible server (requires `redis`)."""
+
+    def __init__(self, url, prefix='divelogger:ratelimit'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._take = self.client.register_script(TAKE_SCRIPT)
+
+    def take(self, key, capacity, rate, cost=1):
+        allowed, tokens = self._take(keys=[f"{self.prefix}:{key}"], args=[capacity, rate, cost])
+        tokens = float(tokens)
+        retry_after = 0 if allowed else (cost - tokens) / rate
+        return bool(allowed), tokens, retry_after
+
+    def reset(self):
+        for key in self.client.scan_iter(f"{self.prefix}:*"):
+            self.client.delete(key)
+
+
+class RateLimiter:
+    """Flask extension applying named token-bucket policies to views."""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_BACKEND', 'memory')
+        app.config.setdefault('RATELIMIT_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('RATELIMIT_POLICIES', {})
+
+        backend = None
+        if app.config['RATELIMIT_BACKEND'] == 'redis':
+            try:
+                backend = RedisBackend(app.config['RATELIMIT_REDIS_URL'])
+            except ImportError:
+                logger.warning("redis package is not installed, falling back to in-memory rate limits")
+        app.extensions['ratelimit'] = {
+            'backend': backend or MemoryBackend(),
+            # Parse every policy now so a typo fails at startup, not on a request
+            'policies': {name: parse_rate(rate) for name, rate in app.config['RATELIMIT_POLICIES'].items()},
+            'rejected': 0,
+            'rejected_lock': threading.Lock()
+        }
+        # Call init_app before CSRFProtect.init_app so this hook runs first
+        app.before_request(self.check_request)
+
+    @property
+    def _state(self):
+        return current_app.extensions['ratelimit']
+
+    @property
+    def backend(self):
+        return self._state['backend']
+
+    def client_key(self, key):
+        if key == 'user' and current_user.is_authenticated:
+            return f"user:{current_user.id}"
+        return f"ip:{request.remote_addr or 'unknown'}"
+
+    def limit(self, policy, key='user'):
+        """Decorator limiting a view by policy name, keyed by 'ip' or 'user'.
+
+        'user' falls back to the IP for anonymous requests. The decorator only
+        records the policy on the view; check_request applies it.
+        """
+        def decorator(f):
+            f.rate_limits = getattr(f, 'rate_limits', ()) + ((policy, key),)
+            return f
+        return decorator
+
+    def check_request(self):
+        """before_request hook: 429 if any of the matched view's buckets is empty."""
+        if not current_app.config['RATELIMIT_ENABLED']:
+            return None
+        view = current_app.view_functions.get(request.endpoint)
+        state = self._state
+        for policy, key in getattr(view, 'rate_limits', ()):
+            if policy not in state['policies']:
+                continue
+            capacity, rate = state['policies'][policy]
+            bucket = f"{policy}:{self.client_key(key)}"
+            allowed, _, retry_after = self.backend.take(bucket, capacity, rate)
+            if not allowed:
+                with state['rejected_lock']:
+                    state['rejected'] += 1
+                current_app.logger.warning("Rate limit '%s' exceeded for %s", policy, bucket)
+                response = jsonify({"error": "Too many requests, please slow down"})
+                response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+                return response, 429
+        return None
@@ -0,0 +1 @@
+# Query and aggregation helpers shared by the HTML and JSON routes
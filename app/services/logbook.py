@@ -0,0 +1,104 @@
+# Paginated, filtered listing of a user's dives for My Logs
+#
+# Pages run newest first on (start_time, id) and continue from a cursor that
+# holds the last row's sort key. Each page is an index range scan on
+# ix_dives_user_start_time, so later pages cost the same as the first one
+# instead of skipping over an ever growing OFFSET.
+import base64
+from datetime import datetime
+from sqlalchemy import and_, or_
+from app import db
+from app.models import Dive
+
+FILTER_ARGS = ('date_from', 'date_to', 'location', 'min_depth', 'max_depth')
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def filter_params(args):
+    """The non-empty filter values from a request's query string."""
+    return {name: args.get(name) for name in FILTER_ARGS if args.get(name)}
+
+
+def locations(user_id):
+    """Distinct dive locations for the location filter, alphabetically."""
+    rows = db.session.query(Dive.location).filter(Dive.user_id == user_id) \
+        .distinct().order_by(Dive.location)
+    return [location for location, in rows]
+
+
+def apply_filters(query, params):
+    """Restrict a Dive query by My Logs filters; malformed values are ignored."""
+    if params.get('date_from'):
+        try:
+            query = query.filter(Dive.start_time >= datetime.strptime(params['date_from'], '%Y-%m-%d'))
+        except ValueError:
+            pass
+
+    if params.get('date_to'):
+        try:
+            date_to = datetime.strptime(params['date_to'], '%Y-%m-%d')
+            # Include the entire day
+            query = query.filter(Dive.start_time <= date_to.replace(hour=23, minute=59, second=59))
+        except ValueError:
+            pass
+
+    if params.get('location'):
+        query = query.filter(Dive.location == params['location'])
+
+    if params.get('min_depth'):
+        try:
+            query = query.filter(Dive.max_depth >= float(params['min_depth']))
+        except ValueError:
+            pass
+
+    if params.get('max_depth'):
+        try:
+            query = query.filter(Dive.max_depth <= float(params['max_depth']))
+        except ValueError:
+            pass
+
+    return query
+
+
+def encode_cursor(dive):
+    raw = f"{dive.start_time.isoformat()}|{dive.id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (start_time, id) from a cursor, raising ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        start_time, dive_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(start_time), int(dive_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def page_size(value):
+    try:
+        return min(max(int(value), 1), MAX_PAGE_SIZE)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+
+
+def dive_page(user_id, params, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """One page of the user's filtered dives and the cursor for the next page.
+
+    The next cursor is None on the last page.
+    """
+    query = apply_filters(Dive.query.filter(Dive.user_id == user_id), params)
+    if cursor:
+        start_time, dive_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            Dive.start_time < start_time,
+            and_(Dive.start_time == start_time, Dive.id < dive_id)
+        ))
+
+    # One extra row tells us whether another page follows
+    dives = query.order_by(Dive.start_time.desc(), Dive.id.desc()).limit(limit + 1).all()
+    if len(dives) > limit:
+        dives = dives[:limit]
+        return dives, encode_cursor(dives[-1])
+    return dives, None
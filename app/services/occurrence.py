@@ -0,0 +1,133 @@
+# Cross-user species occurrence cube
+#
+# species_occurrence holds one counter per (location cell, month, taxon).
+# Writes adjust the affected counters in the same transaction as the sighting,
+# so "top species at this site in this month" is a single indexed range scan
+# instead of an aggregate over every dive.
+from sqlalchemy import extract, func
+from app import db
+from app.database import insert_on_conflict
+from app.models import Dive, DiveSpecies, SpeciesOccurrence
+from app.services.stats import parse_location
+
+ALL_MONTHS = 0
+MAX_LIMIT = 50
+
+
+def location_cell(location):
+    """Normalise a dive location ("Name (lat, lng)") to its cube cell key."""
+    if not location:
+        return None
+    name, _, _ = parse_location(location)
+    return ' '.join(name.lower().split())[:255] or None
+
+
+def _bump(cell, month, taxon_id, scientific_name, common_name, delta):
+    # The cube is shared by every user, so counters are adjusted in SQL rather
+    # than read and written back: concurrent sightings must not lose counts or
+    # collide on the unique (cell, month, taxon) key when creating a row
+    key = {'cell': cell, 'month': month, 'taxon_id': taxon_id}
+    if delta > 0:
+        insert_on_conflict(
+            SpeciesOccurrence,
+            dict(key, scientific_name=scientific_name, common_name=common_name, count=delta),
+            ['cell', 'month', 'taxon_id'],
+            set_={
+                'count': SpeciesOccurrence.count + delta,
+                'common_name': func.coalesce(SpeciesOccurrence.common_name, common_name)
+            }
+        )
+        return
+
+    counter = SpeciesOccurrence.query.filter_by(**key)
+    counter.update({SpeciesOccurrence.count: SpeciesOccurrence.count + delta}, synchronize_session='fetch')
+    counter.filter(SpeciesOccurrence.count <= 0).delete(synchronize_session='fetch')
+
+
+def _apply(location, start_time, sightings, delta):
+    cell = location_cell(location)
+    if cell is None:
+        return
+    months = [ALL_MONTHS]
+    if start_time is not None:
+        months.append(start_time.month)
+    for species in sightings:
+        for month in months:
+            _bump(cell, month, species.taxon_id, species.scientific_name, species.common_name, delta)
+
+
+def add_sighting(dive, species):
+    """Count a newly logged DiveSpecies row."""
+    _apply(dive.location, dive.start_time, [species], 1)
+
+
+def remove_sighting(dive, species):
+    """Uncount a DiveSpecies row that is being deleted."""
+    _apply(dive.location, dive.start_time, [species], -1)
+
+
+def move_dive(dive, old_location, old_start_time):
+    """Re-file a dive's sightings after its location or date changed."""
+    old_month = old_start_time.month if old_start_time else None
+    new_month = dive.start_time.month if dive.start_time else None
+    if location_cell(old_location) == location_cell(dive.location) and old_month == new_month:
+        return
+    sightings = dive.species.all()
+    _apply(old_location, old_start_time, sightings, -1)
+    _apply(dive.location, dive.start_time, sightings, 1)
+
+
+def remove_dive(dive):
+    """Uncount every sighting on a dive that is being deleted."""
+    _apply(dive.location, dive.start_time, dive.species.all(), -1)
+
+
+def top_species(location, month=ALL_MONTHS, limit=10):
+    """Most observed taxa for a location cell and month (0 = any month)."""
+    cell = location_cell(location)
+    if cell is None:
+        return []
+    limit = min(max(limit or 10, 1), MAX_LIMIT)
+    rows = SpeciesOccurrence.query.filter_by(cell=cell, month=month) \
+        .order_by(SpeciesOccurrence.count.desc(), SpeciesOccurrence.taxon_id) \
+        .limit(limit)
+    return [row.to_dict() for row in rows]
+
+
+def rebuild():
+    """Recompute the whole cube from dive_species; returns the number of rows."""
+    month = extract('month', Dive.start_time)
+    grouped = db.session.query(
+        Dive.location,
+        month,
+        DiveSpecies.taxon_id,
+        func.max(DiveSpecies.scientific_name),
+        func.max(DiveSpecies.common_name),
+        func.count(DiveSpecies.id)
+    ).select_from(DiveSpecies).join(Dive, Dive.id == DiveSpecies.dive_id) \
+        .group_by(Dive.location, month, DiveSpecies.taxon_id)
+
+    # Several raw locations can share a cell, so merge in Python before writing
+    cube = {}
+    for location, month_number, taxon_id, scientific_name, common_name, count in grouped:
+        cell = location_cell(location)
+        if cell is None:
+            continue
+        for key_month in (ALL_MONTHS, int(month_number)):
+            key = (cell, key_month, taxon_id)
+            entry = cube.setdefault(key, {
+                'cell': cell,
+                'month': key_month,
+                'taxon_id': taxon_id,
+                'scientific_name': scientific_name,
+                'common_name': common_name,
+                'count': 0
+            })
+            entry['count'] += count
+            entry['common_name'] = entry['common_name'] or common_name
+
+    SpeciesOccurrence.query.delete()
+    if cube:
+        db.session.bulk_insert_mappings(SpeciesOccurrence, list(cube.values()))
+    db.session.commit()
+    return len(cube)
@@ -0,0 +1,70 @@
+# Writes to a dive's species list
+#
+# Shared by the species batch API and composite dive creation so both keep
+# the (dive_id, taxon_id) uniqueness and the occurrence cube in step.
+from app import db
+from app.models import DiveSpecies
+from app.services import occurrence
+
+
+def parse_batch(items, remove=None):
+    """Validate a batch payload into ({taxon_id: item}, {taxon_id, ...}).
+
+    Later entries for the same taxon win. Raises ValueError with a message
+    suitable for a 400 response.
+    """
+    remove = remove or []
+    if not isinstance(items, list) or not isinstance(remove, list):
+        raise ValueError("species and remove must be lists")
+
+    wanted = {}
+    try:
+        for item in items:
+            wanted[int(item['taxon_id'])] = item
+        remove_ids = {int(taxon_id) for taxon_id in remove}
+    except KeyError as e:
+        raise ValueError(f"Missing required field: {e.args[0]}")
+    except (TypeError, ValueError):
+        raise ValueError("taxon_id must be an integer")
+    return wanted, remove_ids
+
+
+def apply_batch(dive, wanted, remove_ids=(), replace=False):
+    """Insert, update and delete species on `dive` without committing.
+
+    Returns the dive's resulting species rows ordered by id. Raises
+    ValueError if a new taxon has no scientific name.
+    """
+    existing = {}
+    if dive.id is not None:
+        existing = {s.taxon_id: s for s in DiveSpecies.query.filter_by(dive_id=dive.id)}
+
+    remove_ids = set(remove_ids)
+    if replace:
+        remove_ids |= set(existing) - set(wanted)
+
+    for taxon_id in remove_ids - set(wanted):
+        species = existing.pop(taxon_id, None)
+        if species is not None:
+            occurrence.remove_sighting(dive, species)
+            db.session.delete(species)
+
+    for taxon_id, item in wanted.items():
+        species = existing.get(taxon_id)
+        new_sighting = species is None
+        if new_sighting:
+            if not item.get('scientific_name'):
+                raise ValueError("Missing required field: scientific_name")
+            species = DiveSpecies(dive=dive, taxon_id=taxon_id)
+            db.session.add(species)
+            existing[taxon_id] = species
+
+        species.scientific_name = item.get('scientific_name') or species.scientific_name
+        for field in ('common_name', 'rank', 'notes'):
+            if field in item:
+                setattr(species, field, item[field])
+        if new_sighting:
+            occurrence.add_sighting(dive, species)
+
+    db.session.flush()
+    return sorted(existing.values(), key=lambda s: s.id)
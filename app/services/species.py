@@ -0,0 +1,146 @@
+# Species aggregation for a user's logbook
+#
+# Every query joins dive_species to dives on the user and groups by taxon in
+# SQL, so memory use depends on the page size rather than the logbook size.
+from sqlalchemy import func, extract
+from app import db
+from app.models import Dive, DiveSpecies
+
+MAX_PER_PAGE = 100
+
+
+def _user_sightings(user_id, *columns):
+    return db.session.query(*columns).select_from(DiveSpecies).join(
+        Dive, Dive.id == DiveSpecies.dive_id
+    ).filter(Dive.user_id == user_id)
+
+
+def _page_bounds(page, per_page):
+    page = max(page or 1, 1)
+    per_page = min(max(per_page or 20, 1), MAX_PER_PAGE)
+    return page, per_page
+
+
+def _paginated(items, total, page, per_page):
+    return {
+        'items': items,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page
+    }
+
+
+def count_taxa(user_id):
+    """Number of distinct taxa the user has logged."""
+    return _user_sightings(user_id, func.count(func.distinct(DiveSpecies.taxon_id))).scalar() or 0
+
+
+def leaderboard(user_id, limit=None, offset=0):
+    """Sightings per taxon, most observed first."""
+    sightings = func.count(DiveSpecies.id)
+    query = _user_sightings(
+        user_id,
+        DiveSpecies.taxon_id,
+        func.max(DiveSpecies.common_name),
+        func.max(DiveSpecies.scientific_name),
+        sightings
+    ).group_by(DiveSpecies.taxon_id).order_by(sightings.desc(), DiveSpecies.taxon_id)
+    if limit:
+        query = query.limit(limit).offset(offset)
+
+    return [
+        {
+            'taxon_id': taxon_id,
+            'common_name': common_name or scientific_name,
+            'scientific_name': scientific_name,
+            'count': count
+        }
+        for taxon_id, common_name, scientific_name, count in query
+    ]
+
+
+def life_list(user_id, page=1, per_page=20, sort='first_seen'):
+    """Every taxon the user has seen with first/last sighting dates."""
+    page, per_page = _page_bounds(page, per_page)
+    sightings = func.count(DiveSpecies.id)
+    first_seen = func.min(Dive.start_time)
+    last_seen = func.max(Dive.start_time)
+
+    query = _user_sightings(
+        user_id,
+        DiveSpecies.taxon_id,
+        func.max(DiveSpecies.common_name),
+        func.max(DiveSpecies.scientific_name),
+        func.max(DiveSpecies.rank),
+        sightings,
+        func.count(func.distinct(Dive.location)),
+        first_seen,
+        last_seen
+    ).group_by(DiveSpecies.taxon_id)
+
+    if sort == 'count':
+        query = query.order_by(sightings.desc(), DiveSpecies.taxon_id)
+    elif sort == 'name':
+        query = query.order_by(func.max(DiveSpecies.scientific_name), DiveSpecies.taxon_id)
+    else:
+        query = query.order_by(first_seen, DiveSpecies.taxon_id)
+
+    items = [
+        {
+            'taxon_id': taxon_id,
+            'common_name': common_name,
+            'scientific_name': scientific_name,
+            'rank': rank,
+            'sightings': count,
+            'locations': location_count,
+            'first_seen': first.isoformat() if first else None,
+            'last_seen': last.isoformat() if last else None
+        }
+        for taxon_id, common_name, scientific_name, rank, count, location_count, first, last
+        in query.limit(per_page).offset((page - 1) * per_page)
+    ]
+    return _paginated(items, count_taxa(user_id), page, per_page)
+
+
+def sightings_by_site(user_id, taxon_id=None, page=1, per_page=20):
+    """Sighting counts per (taxon, dive location)."""
+    page, per_page = _page_bounds(page, per_page)
+    sightings = func.count(DiveSpecies.id)
+    query = _user_sightings(
+        user_id,
+        DiveSpecies.taxon_id,
+        func.max(DiveSpecies.scientific_name),
+        Dive.location,
+        sightings
+    )
+    if taxon_id is not None:
+        query = query.filter(DiveSpecies.taxon_id == taxon_id)
+    query = query.group_by(DiveSpecies.taxon_id, Dive.location)
+
+    total = query.order_by(None).count()
+    rows = query.order_by(sightings.desc(), DiveSpecies.taxon_id, Dive.location) \
+        .limit(per_page).offset((page - 1) * per_page)
+    items = [
+        {
+            'taxon_id': row_taxon_id,
+            'scientific_name': scientific_name,
+            'location': location,
+            'sightings': count
+        }
+        for row_taxon_id, scientific_name, location, count in rows
+    ]
+    return _paginated(items, total, page, per_page)
+
+
+def sightings_by_month(user_id, taxon_id=None):
+    """Sighting counts per calendar month (1-12), optionally for one taxon."""
+    month = extract('month', Dive.start_time)
+    query = _user_sightings(user_id, month, func.count(DiveSpecies.id))
+    if taxon_id is not None:
+        query = query.filter(DiveSpecies.taxon_id == taxon_id)
+
+    counts = [0] * 12
+    for month_number, count in query.group_by(month):
+        counts[int(month_number) - 1] = count
+    return {'taxon_id': taxon_id, 'months': list(range(1, 13)), 'sightings': counts}
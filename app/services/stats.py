@@ -0,0 +1,168 @@
+# Dataset builders for the diving statistics page
+#
+# Each function returns one JSON-ready chart dataset for a user. Aggregation
+# happens in SQL; Python only formats the (small) grouped result.
+import re
+from flask import current_app
+from sqlalchemy import func, extract
+from app import db
+from app.models import Dive
+from app.services import species as species_service
+
+MONTH_LABELS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Common format for locations with GPS: "Location Name (lat, lng)"
+COORDINATES_PATTERN = re.compile(r'\((-?\d+\.?\d*),\s*(-?\d+\.?\d*)\)')
+
+
+def parse_location(location):
+    """Split "Name (lat, lng)" into (name, lat, lng); lat/lng are None if absent."""
+    coords_match = COORDINATES_PATTERN.search(location)
+    if coords_match:
+        try:
+            lat = float(coords_match.group(1))
+            lng = float(coords_match.group(2))
+            return location.split('(')[0].strip(), lat, lng
+        except ValueError:
+            pass
+    return location, None, None
+
+
+def duration_minutes(start, end):
+    """SQL expression for the minutes between two datetime columns.
+
+    None for dialects without a known expression; callers then load the
+    start and end times and subtract them in Python.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return (func.julianday(end) - func.julianday(start)) * 1440.0
+    if dialect == 'postgresql':
+        return extract('epoch', end - start) / 60.0
+    if dialect in ('mysql', 'mariadb'):
+        return func.timestampdiff(db.text('SECOND'), start, end) / 60.0
+    return None
+
+
+def _minutes_between(start, end):
+    if start is None or end is None:
+        return None
+    return (end - start).total_seconds() / 60.0
+
+
+def summary(user_id):
+    """Header cards: total dives, max depth, longest dive and total hours."""
+    duration = duration_minutes(Dive.start_time, Dive.end_time)
+    if duration is not None:
+        total, max_depth, longest, total_minutes = db.session.query(
+            func.count(Dive.id),
+            func.max(Dive.max_depth),
+            func.max(duration),
+            func.sum(duration)
+        ).filter(Dive.user_id == user_id).one()
+    else:
+        total, max_depth = db.session.query(
+            func.count(Dive.id),
+            func.max(Dive.max_depth)
+        ).filter(Dive.user_id == user_id).one()
+        rows = db.session.query(Dive.start_time, Dive.end_time).filter(Dive.user_id == user_id)
+        durations = [minutes for minutes in (_minutes_between(*row) for row in rows) if minutes is not None]
+        longest = max(durations, default=None)
+        total_minutes = sum(durations)
+
+    return {
+        'total_dives': total,
+        'max_depth': round(float(max_depth or 0), 1),
+        'longest_dive': round(longest or 0),
+        'total_dive_time': round((total_minutes or 0) / 60, 1)  # hours
+    }
+
+
+def timeline(user_id):
+    """Per-dive depth and duration series ordered by date."""
+    duration = duration_minutes(Dive.start_time, Dive.end_time)
+    in_python = duration is None
+    rows = db.session.query(
+        Dive.start_time,
+        Dive.max_depth,
+        Dive.end_time if in_python else duration
+    ).filter(Dive.user_id == user_id).order_by(Dive.start_time.asc())
+
+    data = {'dates': [], 'depths': [], 'durations': []}
+    for start_time, depth, value in rows:
+        minutes = _minutes_between(start_time, value) if in_python else value
+        data['dates'].append(start_time.strftime('%d %b %Y'))
+        data['depths'].append(float(depth))
+        data['durations'].append(round(minutes or 0))
+    return data
+
+
+def monthly(user_id):
+    """Number of dives in each calendar month across all years."""
+    month = extract('month', Dive.start_time)
+    rows = db.session.query(month, func.count(Dive.id)).filter(
+        Dive.user_id == user_id
+    ).group_by(month)
+
+    counts = [0] * 12
+    for month_number, count in rows:
+        counts[int(month_number) - 1] = count
+    return {'months': MONTH_LABELS, 'dives_per_month': counts}
+
+
+def locations(user_id, limit=8):
+    """Top locations for the chart and every geotagged location for the map."""
+    rows = db.session.query(Dive.location, func.count(Dive.id)).filter(
+        Dive.user_id == user_id
+    ).group_by(Dive.location)
+
+    # Merge raw strings that share a name once coordinates are stripped
+    location_counts = {}
+    location_coordinates = {}
+    for location, count in rows:
+        if not location:
+            continue
+        name, lat, lng = parse_location(location)
+        location_counts[name] = location_counts.get(name, 0) + count
+        if lat is not None and name not in location_coordinates:
+            location_coordinates[name] = (lat, lng)
+
+    sorted_locations = sorted(location_counts.items(), key=lambda item: item[1], reverse=True)[:limit]
+    return {
+        'locations': [name for name, _ in sorted_locations],
+        'dives_per_location': [count for _, count in sorted_locations],
+        'coordinates': [[lat, lng] for lat, lng in location_coordinates.values()],
+        'location_names': list(location_coordinates.keys()),
+        'dives_count': [location_counts[name] for name in location_coordinates]
+    }
+
+
+def species_chart(user_id):
+    """Labels and counts for the species pie chart."""
+    species = species_service.leaderboard(user_id)
+    return {
+        'species_names': [item['common_name'] for item in species],
+        'species_counts': [item['count'] for item in species]
+    }
+
+
+def taxon_photo_url(taxon_id):
+    """Medium photo URL for a taxon from iNaturalist, or None."""
+    import requests  # deferred: slow to import and rarely needed
+    try:
+        response = requests.get(f"https://api.inaturalist.org/v1/taxa/{taxon_id}", timeout=5)
+        if response.status_code == 200:
+            results = response.json().get('results') or []
+            if results and (results[0].get('default_photo') or {}).get('medium_url'):
+                return results[0]['default_photo']['medium_url']
+    except Exception as e:
+        current_app.logger.error("Error fetching image for taxon %s: %s", taxon_id, e)
+    return None
+
+
+def top_species(user_id, limit=3):
+    """Most observed species with an image for each."""
+    top = species_service.leaderboard(user_id, limit=limit)
+    for item in top:
+        item['image_url'] = taxon_photo_url(item['taxon_id'])
+    return {'top_species': top}
@@ -1,26 +1,30 @@
-from flask import Blueprint, request, jsonify, current_app, render_template, redirect, url_for, flash
+from flask import Blueprint, jsonify, current_app, render_template, redirect, url_for, flash
 from app.models import Dive, Share, User
-from app import db
-from flask_wtf.csrf import validate_csrf, CSRFError
+from app import db, media_store
 from datetime import datetime, timedelta
 import secrets
 from app.shared import shared_bp
 from flask_login import current_user, login_required
+from app.validation import Field, Schema, integer, string, validated
+
+SHARE_LINK_SCHEMA = Schema({
+    'expiration_days': Field(integer(minimum=1)),  # null means the link never expires
+})
+
+SHARE_VISIBILITY_SCHEMA = Schema({
+    'visibility': Field(string(choices=('public', 'private', 'user_specific')), nullable=False),
+})
+
+SHARE_WITH_USER_SCHEMA = Schema({
+    'username': Field(string(255), required=True),  # a username or an email address
+})
 
 # Create a share link for a dive
 @shared_bp.route('/dives/<int:dive_id>/share', methods=['POST'])
 @login_required
-def create_share_link(dive_id):
+@validated(SHARE_LINK_SCHEMA)
+def create_share_link(dive_id, data):
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            try:
-                validate_csrf(token)
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
-                
         dive = Dive.query.get_or_404(dive_id)
         
         # Ensure dive belongs to current user
@@ -30,7 +34,6 @@ def create_share_link(dive_id):
         token = secrets.token_urlsafe(32)
         
         # Get expiration setting from request
-        data = request.get_json()
         expiration_days = data.get('expiration_days') if data else 7
         
         # Calculate expiration time (None if never expires)
@@ -60,7 +63,7 @@ def create_share_link(dive_id):
             "created_at": share.created_at.isoformat()
         }), 201
     except Exception as e:
-        current_app.logger.error(f"Error creating share link: {str(e)}", exc_info=True)
+        current_app.logger.error("Error creating share link: %s", e, exc_info=True)
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
@@ -88,26 +91,17 @@ def get_shared_dive(token):
                               shared_by=owner_name,
                               shared_by_username=owner.username)
     except Exception as e:
-        current_app.logger.error(f"Error accessing shared dive: {str(e)}", exc_info=True)
+        current_app.logger.error("Error accessing shared dive: %s", e, exc_info=True)
         flash("An error occurred while retrieving the shared dive.", "danger")
         return redirect(url_for('main.index'))
 
 
 # Update share visibility for a dive
 @shared_bp.route('/dives/<int:dive_id>/visibility', methods=['PUT'])
-def update_dive_visibility(dive_id):
+@validated(SHARE_VISIBILITY_SCHEMA, partial=True)
+def update_dive_visibility(dive_id, data):
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            try:
-                validate_csrf(token)
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
-                
         dive = Dive.query.get_or_404(dive_id)
-        data = request.get_json()
 
         share = Share.query.filter_by(dive_id=dive.id).first()
         if share:
@@ -117,32 +111,23 @@ def update_dive_visibility(dive_id):
 
         return jsonify({'error': 'No share record found.'}), 404
     except Exception as e:
-        current_app.logger.error(f"Error updating dive visibility: {str(e)}", exc_info=True)
+        current_app.logger.error("Error updating dive visibility: %s", e, exc_info=True)
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 # Share a dive with a specific user
 @shared_bp.route('/dives/<int:dive_id>/share-with-user', methods=['POST'])
 @login_required
-def share_with_user(dive_id):
+@validated(SHARE_WITH_USER_SCHEMA)
+def share_with_user(dive_id, data):
     try:
-        # Check CSRF token
-        if current_app.config.get("WTF_CSRF_ENABLED", True):
-            token = request.headers.get("X-CSRFToken")
-            try:
-                validate_csrf(token)
-            except CSRFError as e:
-                current_app.logger.warning(f"CSRF token validation failed: {str(e)}")
-                return jsonify({"error": "Invalid or missing CSRF token"}), 400
-                
         dive = Dive.query.get_or_404(dive_id)
         
         # Ensure dive belongs to current user
         if dive.user_id != current_user.id:
             return jsonify({"error": "You can only share your own dives"}), 403
             
-        data = request.get_json()
-        recipient = data.get('username')
+        recipient = data['username'].strip()
         
         if not recipient:
             return jsonify({"error": "Username or email is required"}), 400
@@ -153,14 +138,14 @@ def share_with_user(dive_id):
         # Find user to share with
         if is_email:
             shared_with_user = User.query.filter_by(email=recipient).first()
-            current_app.logger.info(f"Searching for user by email: {recipient}, found: {shared_with_user is not None}")
+            current_app.logger.info("Searching for user by email: %s, found: %s", recipient, shared_with_user is not None)
         else:
             shared_with_user = User.query.filter_by(username=recipient).first()
-            current_app.logger.info(f"Searching for user by username: {recipient}, found: {shared_with_user is not None}")
+            current_app.logger.info("Searching for user by username: %s, found: %s", recipient, shared_with_user is not None)
         
         if not shared_with_user:
             # Return a specific 404 response for user not found
-            current_app.logger.warning(f"User not found: {recipient}")
+            current_app.logger.warning("User not found: %s", recipient)
             return jsonify({"error": f"User with {'email' if is_email else 'username'} {recipient} not found"}), 404
             
         # Check if already shared with this user
@@ -199,7 +184,7 @@ def share_with_user(dive_id):
             "created_at": share.created_at.isoformat()
         }), 201
     except Exception as e:
-        current_app.logger.error(f"Error sharing dive with user: {str(e)}", exc_info=True)
+        current_app.logger.error("Error sharing dive with user: %s", e, exc_info=True)
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
@@ -231,9 +216,10 @@ def dives_shared_with_me():
                     'token': share.token
                 })
         
+        media_store.prefetch_variants([shared['dive'].media for shared in shared_dives])
         return render_template('shared_with_me.html', shared_dives=shared_dives)
     except Exception as e:
-        current_app.logger.error(f"Error getting shared dives: {str(e)}", exc_info=True)
+        current_app.logger.error("Error getting shared dives: %s", e, exc_info=True)
         flash("An error occurred while retrieving shared dives.", "danger")
         return redirect(url_for('main.index'))
 
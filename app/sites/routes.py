@@ -1,11 +1,71 @@
 # routes.py for Dive Sites
-from flask import request, jsonify
+from flask import request, jsonify, current_app
+from sqlalchemy import or_
 from app.models import Site, Review
 from app import db
 from app.sites import sites_bp
+from app.etag import conditional, collection_stamp, row_stamp, PUBLIC_CACHE_CONTROL
+
+# Version stamps for the site catalogue and per-site reviews
+def sites_stamp():
+    return ('sites',) + collection_stamp(Site)
+
+def site_stamp(site_id):
+    stamp = row_stamp(Site, site_id)
+    return ('site',) + stamp if stamp else None
+
+def reviews_stamp(site_id):
+    return ('reviews', site_id) + collection_stamp(Review, Review.site_id == site_id)
+
+# Fields of each packed catalogue row, in order
+CATALOGUE_FIELDS = ['id', 'name', 'lat', 'lng', 'difficulty']
+
+# Helper: Parse ?bbox=min_lng,min_lat,max_lng,max_lat
+# Raises ValueError with a user-facing message if the box is not usable.
+def parse_bbox(value):
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError("bbox must be min_lng,min_lat,max_lng,max_lat")
+    if not (-90 <= min_lat <= max_lat <= 90) or not (-180 <= min_lng <= 180 and -180 <= max_lng <= 180):
+        raise ValueError("bbox is outside the valid coordinate range")
+    return min_lng, min_lat, max_lng, max_lat
+
+# GET the site catalogue for map markers, optionally within a bounding box
+# Rows are packed as arrays in CATALOGUE_FIELDS order to keep the payload small;
+# popups load the rest from /api/sites/<id>.
+@sites_bp.route('/catalogue', methods=['GET'])
+@conditional(sites_stamp, cache_control=PUBLIC_CACHE_CONTROL)
+def get_site_catalogue():
+    query = db.session.query(Site.id, Site.name, Site.lat, Site.lng, Site.difficulty) \
+        .filter(Site.lat.isnot(None), Site.lng.isnot(None))
+
+    if request.args.get('bbox'):
+        try:
+            min_lng, min_lat, max_lng, max_lat = parse_bbox(request.args['bbox'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        query = query.filter(Site.lat.between(min_lat, max_lat))
+        if min_lng <= max_lng:
+            query = query.filter(Site.lng.between(min_lng, max_lng))
+        else:
+            # The box crosses the antimeridian
+            query = query.filter(or_(Site.lng >= min_lng, Site.lng <= max_lng))
+
+    limit = current_app.config['SITE_CATALOGUE_MAX_SITES']
+    rows = query.order_by(Site.id).limit(limit + 1).all()
+    return jsonify({
+        'fields': CATALOGUE_FIELDS,
+        'sites': [
+            [site_id, name, round(lat, 5), round(lng, 5), difficulty]
+            for site_id, name, lat, lng, difficulty in rows[:limit]
+        ],
+        'truncated': len(rows) > limit
+    }), 200
 
 # GET all dive sites
 @sites_bp.route('/', methods=['GET'])
+@conditional(sites_stamp, cache_control=PUBLIC_CACHE_CONTROL)
 def get_sites():
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 20, type=int)
@@ -41,6 +101,7 @@ def create_site():
 
 # GET one specific dive site
 @sites_bp.route('/<int:site_id>', methods=['GET'])
+@conditional(site_stamp, cache_control=PUBLIC_CACHE_CONTROL)
 def get_site(site_id):
     site = Site.query.get_or_404(site_id)
     return jsonify(site.to_dict()), 200
@@ -76,6 +137,7 @@ def delete_site(site_id):
 
 # GET reviews for a dive site
 @sites_bp.route('/<int:site_id>/reviews', methods=['GET'])
+@conditional(reviews_stamp, cache_control=PUBLIC_CACHE_CONTROL)
 def get_reviews(site_id):
     page = request.args.get('page', 1, type=int)
     limit = request.args.get('limit', 20, type=int)
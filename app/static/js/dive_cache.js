@@ -0,0 +1,124 @@
+/**
+ * Client-side cache of dive records
+ *
+ * Dives are keyed by id and versioned by their `updated_at`. Pages put the
+ * version they rendered in `data-version`, so a cached record is reused as
+ * long as it matches and only stale or missing dives are fetched, many at a
+ * time through GET /api/dives/?ids=. Records are kept in sessionStorage so
+ * they survive the reload that follows an edit.
+ */
+const DiveCache = (function() {
+    const STORAGE_KEY = 'diveCache:v2';
+    const MAX_ENTRIES = 200;
+    const MAX_BATCH = 100;
+
+    const entries = new Map();
+    const pending = new Map();
+
+    // Restore entries saved by an earlier page in this tab
+    try {
+        const saved = JSON.parse(sessionStorage.getItem(STORAGE_KEY) || '[]');
+        saved.forEach(dive => entries.set(String(dive.id), dive));
+    } catch (e) {
+        console.warn('Ignoring unreadable dive cache:', e);
+    }
+
+    function persist() {
+        // Keep the most recently stored dives
+        while (entries.size > MAX_ENTRIES) {
+            entries.delete(entries.keys().next().value);
+        }
+        try {
+            sessionStorage.setItem(STORAGE_KEY, JSON.stringify(Array.from(entries.values())));
+        } catch (e) {
+            // Storage full or disabled; the in-memory copy still works
+        }
+    }
+
+    function isFresh(dive, version) {
+        return dive !== undefined && (!version || dive.updated_at === version);
+    }
+
+    // Store a dive returned by the API (e.g. the response to an update)
+    function put(dive) {
+        const key = String(dive.id);
+        entries.delete(key);
+        entries.set(key, dive);
+        persist();
+        return dive;
+    }
+
+    function invalidate(id) {
+        if (entries.delete(String(id))) {
+            persist();
+        }
+    }
+
+    async function fetchBatch(ids) {
+        const response = await fetch(`/api/dives/?ids=${ids.join(',')}`, { credentials: 'same-origin' });
+        if (!response.ok) {
+            let message = `HTTP error ${response.status}`;
+            try {
+                message = (await response.json()).error || message;
+            } catch (e) {
+                // Not JSON; keep the status message
+            }
+            throw new Error(message);
+        }
+        const dives = await response.json();
+        dives.forEach(dive => entries.set(String(dive.id), dive));
+        persist();
+    }
+
+    /**
+     * Resolve to a map of id -> dive for `ids`. `versions` optionally maps an
+     * id to the `updated_at` the caller expects; mismatching entries are refetched.
+     */
+    async function getMany(ids, versions = {}) {
+        const keys = ids.map(String);
+        const stale = keys.filter(key => !isFresh(entries.get(key), versions[key]) && !pending.has(key));
+
+        for (let i = 0; i < stale.length; i += MAX_BATCH) {
+            const batch = stale.slice(i, i + MAX_BATCH);
+            const request = fetchBatch(batch).finally(() => batch.forEach(key => pending.delete(key)));
+            batch.forEach(key => pending.set(key, request));
+        }
+        await Promise.all(keys.filter(key => pending.has(key)).map(key => pending.get(key)));
+
+        const result = {};
+        keys.forEach(key => {
+            if (entries.has(key)) result[key] = entries.get(key);
+        });
+        return result;
+    }
+
+    async function get(id, version) {
+        const key = String(id);
+        const dives = await getMany([key], version ? { [key]: version } : {});
+        if (!dives[key]) {
+            throw new Error('Failed to load dive data');
+        }
+        return dives[key];
+    }
+
+    // Warm the cache for every element carrying data-dive-id / data-version
+    function prefetch(elements) {
+        const versions = {};
+        elements.forEach(element => {
+            if (element.dataset.diveId) versions[element.dataset.diveId] = element.dataset.version;
+        });
+        const ids = Object.keys(versions);
+        if (ids.length === 0) return Promise.resolve({});
+        return getMany(ids, versions).catch(error => {
+            console.warn('Dive prefetch failed:', error);
+            return {};
+        });
+    }
+
+    // Value for If-Match when updating a dive (matches the server's ETag)
+    function etag(dive) {
+        return `"dive-${dive.id}-v${dive.version}"`;
+    }
+
+    return { get, getMany, put, invalidate, prefetch, etag };
+})();
@@ -63,17 +63,15 @@ function loadDiveData() {
     formEl.style.display = 'none';
     errorEl.style.display = 'none';
     
-    // Get the dive ID from the URL or a data attribute
-    const diveId = document.querySelector('.dive-details-container').dataset.diveId;
+    // Get the dive ID and the version this page was rendered from
+    const container = document.querySelector('.dive-details-container');
+    const diveId = container.dataset.diveId;
     
-    fetch('/api/dives/' + diveId)
-        .then(function(response) {
-            if (!response.ok) throw new Error('Failed to load dive data');
-            return response.json();
-        })
+    DiveCache.get(diveId, container.dataset.version)
         .then(function(dive) {
             // Fill form with data
             formEl.querySelector('#edit-dive-id').value = dive.id;
+            formEl.dataset.etag = DiveCache.etag(dive);
             formEl.querySelector('#edit-location').value = dive.location || '';
             
             if (dive.start_time) {
@@ -123,20 +121,27 @@ function saveDiveData() {
     // Get CSRF token
     const token = document.querySelector('meta[name="csrf-token"]').getAttribute('content');
     
+    // Send only the changes, and only if nobody else saved this dive meanwhile
     fetch('/api/dives/' + diveId, {
-        method: 'PUT',
+        method: 'PATCH',
         headers: {
             'Content-Type': 'application/json',
-            'X-CSRFToken': token
+            'X-CSRFToken': token,
+            'If-Match': formEl.dataset.etag
         },
         body: JSON.stringify(formData)
     })
     .then(function(response) {
+        if (response.status === 412) {
+            DiveCache.invalidate(diveId);
+            throw new Error('This dive was changed in another window. Reload the page to edit the latest version.');
+        }
         if (!response.ok) throw new Error('Failed to update dive');
         return response.json();
     })
-    .then(function() {
+    .then(function(dive) {
         // Success
+        DiveCache.put(dive);
         document.getElementById('edit-modal').style.display = 'none';
         window.location.reload();
     })
@@ -408,6 +413,7 @@ async function deleteDive() {
         }
         
         // Redirect to my logs page
+        DiveCache.invalidate(diveId);
         window.location.href = '/my-logs';
     } catch (error) {
         console.error('Error deleting dive:', error);
@@ -10,11 +10,12 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 /**
- * Initialize all dive profile charts on the page
+ * Initialize all dive profile charts on the page, or within `root`
+ * (e.g. cards appended by infinite scroll)
  */
-function initializeAllDiveProfileCharts() {
+function initializeAllDiveProfileCharts(root = document) {
     // Find all dive profile chart canvases
-    const chartCanvases = document.querySelectorAll('canvas[id^="dive-profile-chart-"]');
+    const chartCanvases = root.querySelectorAll('canvas[id^="dive-profile-chart-"]');
     console.log('Found chart canvases:', chartCanvases.length);
     
     // Initialize each chart
@@ -19,146 +19,6 @@ document.addEventListener('DOMContentLoaded', function() {
         maxZoom: 19
     }).addTo(map);
 
-    // Sample dive site locations
-    const diveSites = [
-        {
-            name: "Great Barrier Reef - Cod Hole",
-            location: [-16.6818, 145.9919],
-            description: "Famous for its friendly potato cod, offering amazing underwater encounters.",
-            difficulty: "Intermediate",
-            visibility: "15-30m",
-            depthRange: "5-25m"
-        },
-        {
-            name: "Blue Hole - Belize",
-            location: [17.3162, -87.5351],
-            description: "Perfect circular limestone sinkhole with crystal clear water.",
-            difficulty: "Advanced",
-            visibility: "30m+",
-            depthRange: "10-40m"
-        },
-        {
-            name: "Silfra Fissure - Iceland",
-            location: [64.2558, -21.1168],
-            description: "Dive between two continental plates with incredible visibility.",
-            difficulty: "Intermediate",
-            visibility: "100m+",
-            depthRange: "5-18m"
-        },
-        {
-            name: "SS Yongala - Australia",
-            location: [-19.3056, 147.6234],
-            description: "Historic shipwreck with abundant marine life.",
-            difficulty: "Advanced",
-            visibility: "10-30m",
-            depthRange: "14-28m"
-        },
-        {
-            name: "Manta Ray Night Dive - Kona, Hawaii",
-            location: [19.5429, -156.0378],
-            description: "Evening dive with majestic manta rays feeding on plankton.",
-            difficulty: "Beginner to Intermediate",
-            visibility: "15-25m",
-            depthRange: "10-15m"
-        },
-        {
-            name: "Barracuda Point - Sipadan, Malaysia",
-            location: [4.1155, 118.6290],
-            description: "Famous for its swirling tornado of barracudas and strong currents.",
-            difficulty: "Intermediate to Advanced",
-            visibility: "20-30m",
-            depthRange: "10-40m"
-        },
-        {
-            name: "Richelieu Rock - Thailand",
-            location: [9.3625, 98.0215],
-            description: "Horseshoe-shaped reef known for whale shark sightings.",
-            difficulty: "Intermediate",
-            visibility: "10-30m",
-            depthRange: "5-35m"
-        },
-        {
-            name: "Thistlegorm Wreck - Red Sea, Egypt",
-            location: [27.8139, 33.9220],
-            description: "WWII cargo ship with fascinating cargo including motorcycles and trucks.",
-            difficulty: "Intermediate",
-            visibility: "15-30m",
-            depthRange: "15-30m"
-        },
-        {
-            name: "Cenote Dos Ojos - Mexico",
-            location: [20.3308, -87.3856],
-            description: "Stunning cave system with crystal clear freshwater.",
-            difficulty: "Intermediate to Advanced",
-            visibility: "30-40m",
-            depthRange: "5-10m"
-        },
-        {
-            name: "Poor Knights Islands - New Zealand",
-            location: [-35.4458, 174.7369],
-            description: "Volcanic islands with diverse marine life and underwater arches.",
-            difficulty: "Beginner to Advanced",
-            visibility: "15-30m",
-            depthRange: "5-40m"
-        },
-        {
-            name: "Ningaloo Reef - WA",
-            location: [-22.6936, 113.6732],
-            description: "UNESCO World Heritage site known for whale shark encounters and pristine coral.",
-            difficulty: "Beginner to Advanced",
-            visibility: "10-30m",
-            depthRange: "5-20m"
-        },
-        {
-            name: "Rottnest Island - Perth, WA",
-            location: [-32.0067, 115.5160],
-            description: "Multiple dive sites with limestone reefs, caves and abundant fish life.",
-            difficulty: "Beginner to Intermediate",
-            visibility: "10-25m",
-            depthRange: "8-18m"
-        },
-        {
-            name: "Andaman Islands - India",
-            location: [12.0, 92.9],
-            description: "Remote archipelago with untouched reefs, WWII wrecks and diverse marine life.",
-            difficulty: "Beginner to Advanced",
-            visibility: "10-30m",
-            depthRange: "5-40m"
-        },
-        {
-            name: "Netrani Island - Karnataka, India",
-            location: [14.0167, 74.3333],
-            description: "Heart-shaped island with coral gardens and occasional whale shark sightings.",
-            difficulty: "Beginner to Intermediate",
-            visibility: "10-25m",
-            depthRange: "8-20m"
-        },
-        {
-            name: "Lakshadweep Islands - India",
-            location: [10.5667, 72.6417],
-            description: "Pristine coral atolls with crystal clear waters and abundant marine life.",
-            difficulty: "Beginner to Intermediate",
-            visibility: "15-30m",
-            depthRange: "5-25m"
-        },
-        {
-            name: "Maaya Thila - North Ari Atoll, Maldives",
-            location: [4.0167, 72.8333],
-            description: "Famous pinnacle with white tip reef sharks, stingrays and colorful soft corals.",
-            difficulty: "Intermediate to Advanced",
-            visibility: "15-30m",
-            depthRange: "6-30m"
-        },
-        {
-            name: "Fish Head - Ari Atoll, Maldives",
-            location: [3.9333, 72.9167],
-            description: "Marine protected area with grey reef sharks, napoleons and large pelagics.",
-            difficulty: "Intermediate",
-            visibility: "20-30m",
-            depthRange: "10-35m"
-        }
-    ];
-
     // Custom icon for dive sites
     const diveIcon = L.icon({
         iconUrl: '/static/images/dive-marker.png',
@@ -177,9 +37,13 @@ document.addEventListener('DOMContentLoaded', function() {
         shadowSize: [41, 41]
     });
 
-    // Add markers for each dive site
-    diveSites.forEach(site => {
-        const marker = L.marker(site.location, {
+    // Markers already on the map, by site id
+    const markers = new Map();
+    // Catalogue responses by bbox, so panning back costs nothing
+    const loadedBoxes = new Map();
+
+    function addSiteMarker(site) {
+        const marker = L.marker([site.lat, site.lng], {
             icon: diveIcon,
             alt: site.name
         }).addTo(map);
@@ -193,29 +57,91 @@ document.addEventListener('DOMContentLoaded', function() {
             className: 'dive-site-tooltip'
         });
 
-        // Create popup content
-        const popupContent = `
-            <div class="dive-site-popup">
-                <h3>${site.name}</h3>
-                <p>${site.description}</p>
-                <div class="dive-site-details">
-                    <div class="detail"><strong>Difficulty:</strong> ${site.difficulty}</div>
-                    <div class="detail"><strong>Visibility:</strong> ${site.visibility}</div>
-                    <div class="detail"><strong>Depth Range:</strong> ${site.depthRange}</div>
-                </div>
-                <a href="#" class="popup-link">View Dive Logs</a>
-            </div>
-        `;
-
-        // Bind popup to marker
-        marker.bindPopup(popupContent, {
+        // Details are fetched the first time the popup opens
+        marker.bindPopup(renderSitePopup(site), {
             maxWidth: 300,
             className: 'dive-site-popup'
         });
+        marker.once('popupopen', async function() {
+            try {
+                const response = await fetch(`/api/sites/${site.id}`);
+                if (!response.ok) throw new Error(`HTTP error ${response.status}`);
+                marker.setPopupContent(renderSitePopup(await response.json()));
+            } catch (error) {
+                console.error(`Error loading site ${site.id}:`, error);
+            }
+        });
 
         // Handle marker errors
         marker.on('error', function() {
             this.setIcon(defaultIcon);
         });
-    });
-}); 
\ No newline at end of file
+
+        markers.set(site.id, marker);
+    }
+
+    // Load the catalogue for the visible area, widened to whole 10° cells so
+    // small pans reuse the same (HTTP-cacheable) request
+    async function loadVisibleSites() {
+        const bounds = map.getBounds();
+        const cell = 10;
+        const south = Math.max(-90, Math.floor(bounds.getSouth() / cell) * cell);
+        const north = Math.min(90, Math.ceil(bounds.getNorth() / cell) * cell);
+        let west = Math.floor(bounds.getWest() / cell) * cell;
+        let east = Math.ceil(bounds.getEast() / cell) * cell;
+        if (east - west >= 360) {
+            west = -180;
+            east = 180;
+        } else {
+            // Wrap into -180..180; west > east means the box crosses the antimeridian
+            west = ((west % 360) + 540) % 360 - 180;
+            east = ((east % 360) + 540) % 360 - 180;
+            if (east === -180) east = 180;
+        }
+
+        const bbox = [west, south, east, north].join(',');
+        if (loadedBoxes.has(bbox)) return;
+        loadedBoxes.set(bbox, true);
+
+        try {
+            const response = await fetch(`/api/sites/catalogue?bbox=${bbox}`);
+            if (!response.ok) throw new Error(`HTTP error ${response.status}`);
+            const catalogue = await response.json();
+
+            catalogue.sites.forEach(row => {
+                const site = {};
+                catalogue.fields.forEach((field, index) => { site[field] = row[index]; });
+                if (!markers.has(site.id)) addSiteMarker(site);
+            });
+        } catch (error) {
+            loadedBoxes.delete(bbox);
+            console.error('Error loading dive sites:', error);
+        }
+    }
+
+    map.on('moveend', loadVisibleSites);
+    loadVisibleSites();
+});
+
+// Popup body for a catalogue row or a full /api/sites/<id> record
+function renderSitePopup(site) {
+    const escape = value => String(value).replace(/[&<>"']/g, char => ({
+        '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'
+    })[char]);
+    const detail = (label, value) => value === undefined || value === null || value === ''
+        ? ''
+        : `<div class="detail"><strong>${label}:</strong> ${escape(value)}</div>`;
+
+    return `
+        <div class="dive-site-popup">
+            <h3>${escape(site.name)}</h3>
+            ${site.description ? `<p>${escape(site.description)}</p>` : ''}
+            <div class="dive-site-details">
+                ${detail('Difficulty', site.difficulty)}
+                ${detail('Visibility', site.avg_visibility)}
+                ${detail('Average Depth', site.avg_depth !== undefined && site.avg_depth !== null ? `${site.avg_depth}m` : null)}
+            </div>
+            <a href="#" class="popup-link">View Dive Logs</a>
+        </div>
+    `;
+}
@@ -18,21 +18,26 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Setup event listeners
     setupEventListeners();
+    setupInfiniteScroll();
     
     // Setup modals
     setupModals();
+
+    // Load this page's dives in one request once the page is idle
+    const idle = window.requestIdleCallback || (callback => setTimeout(callback, 200));
+    idle(() => DiveCache.prefetch(document.querySelectorAll('.log-card')));
 });
 
 // Helper function for API requests
-async function apiRequest(url, method = 'GET', data = null) {
+async function apiRequest(url, method = 'GET', data = null, headers = {}) {
     // Get CSRF token
     const token = document.querySelector('meta[name="csrf-token"]').getAttribute('content');
     
     const options = {
         method: method,
-        headers: {
+        headers: Object.assign({
             'X-CSRFToken': token
-        }
+        }, headers)
     };
     
     if (data) {
@@ -69,6 +74,10 @@ async function apiRequest(url, method = 'GET', data = null) {
     }
 }
 
+// Map and marker icon shared with cards loaded by infinite scroll
+let diveMap = null;
+let diveMarkerIcon = null;
+
 function initMap() {
     // Check if map container exists
     const mapContainer = document.getElementById('my-dive-map');
@@ -100,7 +109,7 @@ function initMap() {
     }
 
     // Create default icon
-    const defaultIcon = L.icon({
+    diveMarkerIcon = L.icon({
         iconUrl: 'https://unpkg.com/leaflet@1.7.1/dist/images/marker-icon.png',
         iconSize: [25, 41],
         iconAnchor: [12, 41],
@@ -108,17 +117,42 @@ function initMap() {
         shadowUrl: 'https://unpkg.com/leaflet@1.7.1/dist/images/marker-shadow.png',
         shadowSize: [41, 41]
     });
+    diveMap = map;
+
+    // Fit the map to show all dive sites on the first page with some padding
+    const bounds = addDiveMarkers(document.querySelectorAll('.log-card'));
+    if (bounds.isValid()) {
+        map.fitBounds(bounds, {
+            padding: [50, 50],
+            maxZoom: 10
+        });
+    }
 
-    // Create a bounds object to fit all dive sites
+    // Inside initMap(), after map is created and before markers created
+    // Add a single click listener to the map container for popup links
+    map.getContainer().addEventListener('click', function(e) {
+        const link = e.target.closest('.popup-link');
+        if (!link) return;
+        const href = link.getAttribute('href');
+        if (href && href.startsWith('#dive-')) {
+            e.preventDefault();
+            const diveId = href.substring(1); // remove '#'
+            highlightDiveLog(diveId);
+            history.pushState(null, null, href);
+        }
+    });
+}
+
+// Add a marker for each card with coordinates; returns the bounds they cover
+function addDiveMarkers(cards) {
     const bounds = L.latLngBounds();
-    let hasValidMarkers = false;
-    
+    if (!diveMap) return bounds;
+
     // Store coordinates to normalize them
     const coordinates = [];
 
     // First pass - collect all coordinates and normalize longitudes
-    const logCards = document.querySelectorAll('.log-card');
-    logCards.forEach(card => {
+    cards.forEach(card => {
         const location = card.dataset.location;
         let lat = parseFloat(card.dataset.latitude);
         let lng = parseFloat(card.dataset.longitude);
@@ -150,13 +184,11 @@ function initMap() {
     if (coordinates.length > 0) {
         // Create markers after normalizing coordinates
         coordinates.forEach(({card, lat, lng, location}) => {
-            hasValidMarkers = true;
-            
             // Create marker
             const marker = L.marker([lat, lng], {
-                icon: defaultIcon,
+                icon: diveMarkerIcon,
                 alt: location
-            }).addTo(map);
+            }).addTo(diveMap);
             
             // No popup content, we only use marker click to jump to log
             marker.on('click', function() {
@@ -169,27 +201,7 @@ function initMap() {
         });
     }
 
-    // Fit the map to show all dive sites with some padding
-    if (hasValidMarkers && bounds.isValid()) {
-        map.fitBounds(bounds, {
-            padding: [50, 50],
-            maxZoom: 10
-        });
-    }
-
-    // Inside initMap(), after map is created and before markers created
-    // Add a single click listener to the map container for popup links
-    map.getContainer().addEventListener('click', function(e) {
-        const link = e.target.closest('.popup-link');
-        if (!link) return;
-        const href = link.getAttribute('href');
-        if (href && href.startsWith('#dive-')) {
-            e.preventDefault();
-            const diveId = href.substring(1); // remove '#'
-            highlightDiveLog(diveId);
-            history.pushState(null, null, href);
-        }
-    });
+    return bounds;
 }
 
 function setupEventListeners() {
@@ -225,63 +237,92 @@ function setupEventListeners() {
         });
     }
     
-    // View details buttons
-    const viewDetailsButtons = document.querySelectorAll('.view-details');
-    viewDetailsButtons.forEach(button => {
-        button.addEventListener('click', function(e) {
-            e.preventDefault();
-            const diveId = this.dataset.id;
+    // Card buttons are delegated so cards appended by infinite scroll work too
+    const logsList = document.querySelector('.logs-list');
+    if (!logsList) return;
+    logsList.addEventListener('click', function(e) {
+        const button = e.target.closest('.view-details, .edit-dive, .delete-dive, .share-btn');
+        if (!button) return;
+        e.preventDefault();
+        const diveId = button.dataset.id;
+
+        if (button.classList.contains('view-details')) {
             // Redirect to dive details page
             window.location.href = `/dive/${diveId}`;
-        });
-    });
-    
-    // Edit buttons
-    const editButtons = document.querySelectorAll('.edit-dive');
-    editButtons.forEach(button => {
-        button.addEventListener('click', function(e) {
-            e.preventDefault();
-            const diveId = this.dataset.id;
+        } else if (button.classList.contains('edit-dive')) {
             // Open edit modal with dive data
             openEditModal(diveId);
-        });
-    });
-    
-    // Delete buttons
-    const deleteButtons = document.querySelectorAll('.delete-dive');
-    deleteButtons.forEach(button => {
-        button.addEventListener('click', function(e) {
-            e.preventDefault();
-            const diveId = this.dataset.id;
-            
-            // Store dive ID in delete modal
+        } else if (button.classList.contains('delete-dive')) {
+            // Store dive ID in delete modal and show the confirmation
             document.getElementById('delete-modal').dataset.diveId = diveId;
-            
-            // Show delete confirmation modal
             document.getElementById('delete-modal').style.display = 'block';
-        });
-    });
-    
-    // Share buttons
-    const shareButtons = document.querySelectorAll('.share-btn');
-    shareButtons.forEach(button => {
-        button.addEventListener('click', function(e) {
-            e.preventDefault();
-            const diveId = this.dataset.id;
-            const diveLocation = this.closest('.log-card').querySelector('h3').textContent;
-            
-            // Store dive ID in share modal
+        } else {
+            const diveLocation = button.closest('.log-card').querySelector('h3').textContent;
+
+            // Store dive ID in share modal and update its title
             document.getElementById('share-modal').dataset.diveId = diveId;
-            
-            // Update modal title
             document.querySelector('#share-modal .modal-header h3').textContent = `Share - ${diveLocation}`;
-            
-            // Show share modal
             document.getElementById('share-modal').style.display = 'block';
-        });
+        }
     });
 }
 
+// Load the next page of cards when the sentinel below the list scrolls into view
+function setupInfiniteScroll() {
+    const logsList = document.querySelector('.logs-list');
+    const sentinel = document.getElementById('logs-sentinel');
+    if (!logsList || !sentinel || !('IntersectionObserver' in window)) return;
+
+
+    let loading = false;
+    const loadMore = async () => {
+        const cursor = logsList.dataset.nextCursor;
+        if (loading || !cursor) return;
+
+        loading = true;
+        try {
+            const pageUrl = logsList.dataset.pageUrl;
+            const separator = pageUrl.includes('?') ? '&' : '?';
+            const page = await apiRequest(`${pageUrl}${separator}cursor=${encodeURIComponent(cursor)}`);
+
+            const template = document.createElement('template');
+            template.innerHTML = page.html;
+            const cards = Array.from(template.content.querySelectorAll('.log-card'));
+            logsList.appendChild(template.content);
+
+            addDiveMarkers(cards);
+            DiveCache.prefetch(cards);
+            if (typeof initializeAllDiveProfileCharts === 'function') {
+                cards.forEach(card => initializeAllDiveProfileCharts(card));
+            }
+
+            logsList.dataset.nextCursor = page.next_cursor || '';
+            if (!page.next_cursor) {
+                observer.disconnect();
+                sentinel.remove();
+            }
+        } catch (error) {
+            console.error('Error loading more dives:', error);
+        } finally {
+            loading = false;
+        }
+    };
+
+    const observer = new IntersectionObserver(entries => {
+        if (entries.some(entry => entry.isIntersecting)) loadMore();
+    }, { rootMargin: '600px 0px' });
+    observer.observe(sentinel);
+
+    // The link reloads the page at the next cursor when scripts are unavailable
+    const loadMoreLink = sentinel.querySelector('.load-more-btn');
+    if (loadMoreLink) {
+        loadMoreLink.addEventListener('click', function(e) {
+            e.preventDefault();
+            loadMore();
+        });
+    }
+}
+
 // Function to fetch dive data and open edit modal
 async function openEditModal(diveId) {
     try {
@@ -300,11 +341,13 @@ async function openEditModal(diveId) {
         editModal.style.display = 'block';
         
         try {
-            // Fetch dive data
-            const dive = await apiRequest(`/api/dives/${diveId}`);
+            // Reuse the cached dive unless the card shows a newer version
+            const card = document.querySelector(`.log-card[data-dive-id="${diveId}"]`);
+            const dive = await DiveCache.get(diveId, card ? card.dataset.version : undefined);
             
             // Populate form fields with dive data
             formEl.querySelector('#edit-dive-id').value = dive.id;
+            formEl.dataset.etag = DiveCache.etag(dive);
             formEl.querySelector('#edit-location').value = dive.location || '';
             
             // Format datetime-local inputs
@@ -575,6 +618,7 @@ function setupModals() {
             try {
                 // Use the centralized API request function with CSRF protection
                 await apiRequest(`/api/dives/${diveId}`, 'DELETE');
+                DiveCache.invalidate(diveId);
                 
                 // Remove the dive card from the page
                 const diveCard = document.querySelector(`.log-card[data-dive-id="${diveId}"]`);
@@ -640,8 +684,13 @@ function setupModals() {
                     notes: form.querySelector('#edit-notes').value
                 };
                 
-                // Send update request
-                await apiRequest(`/api/dives/${diveId}`, 'PUT', formData);
+                // Send only the changes, and only if nobody else saved this dive meanwhile
+                try {
+                    DiveCache.put(await apiRequest(`/api/dives/${diveId}`, 'PATCH', formData, { 'If-Match': form.dataset.etag }));
+                } catch (error) {
+                    DiveCache.invalidate(diveId);
+                    throw error;
+                }
                 
                 // Hide modal
                 editModal.style.display = 'none';
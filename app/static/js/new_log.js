@@ -339,77 +339,32 @@ async function handleFormSubmit(e) {
         diveData.location += ` (${lat}, ${lng})`;
     }
     
+    // Basic client-side validation
+    if (csvFile && !csvFile.name.toLowerCase().endsWith('.csv')) {
+        alert('Please select a CSV file (must have .csv extension)');
+        return;
+    }
+    
     console.log('Submitting dive data:', diveData);
     
     try {
-        // Step 1: Create dive using our centralized API request function
-        const result = await apiRequest('/api/dives/', 'POST', diveData);
-        console.log('Success - dive created:', result);
-        
-        const diveId = result.id;
+        // Dive, media, profile and species go in one request and one transaction
+        const fullFormData = new FormData();
+        fullFormData.append('dive', JSON.stringify(diveData));
+        fullFormData.append('species', JSON.stringify(selectedSpecies.map(species => ({
+            taxon_id: species.taxon_id,
+            scientific_name: species.scientific_name,
+            common_name: species.common_name,
+            rank: species.rank
+        }))));
+        if (photoFile) fullFormData.append('media', photoFile);
+        if (csvFile) fullFormData.append('profile_csv', csvFile);
         
-        // Step 2: Upload media file if one was selected
-        if (photoFile) {
-            const mediaFormData = new FormData();
-            mediaFormData.append('media', photoFile);
-            
-            // Use our centralized file upload function
-            const uploadResult = await uploadFile(`/api/dives/${diveId}/upload`, mediaFormData);
-            console.log('Media upload success:', uploadResult);
-        }
-        
-        // Step 3: Upload CSV file if one was selected
-        if (csvFile) {
-            console.log("Uploading CSV file:", csvFile.name, "size:", csvFile.size, "type:", csvFile.type);
-            
-            // Basic client-side validation
-            if (!csvFile.name.toLowerCase().endsWith('.csv')) {
-                console.warn('Not a CSV file');
-                alert('Please select a CSV file (must have .csv extension)');
-                window.location.href = '/my-logs?success=dive_created';
-                return;
-            }
-            
-            const csvFormData = new FormData();
-            csvFormData.append('profile_csv', csvFile);
-            
-            try {
-                console.log(`Sending CSV upload request to /api/dives/${diveId}/upload-csv`);
-                
-                // Use the centralized file upload function that handles CSRF tokens
-                const csvUploadResult = await uploadFile(`/api/dives/${diveId}/upload-csv`, csvFormData);
-                
-                console.log('CSV data upload success:', csvUploadResult);
-            } catch (error) {
-                console.error('CSV upload error:', error);
-                alert('The dive log was created, but there was an issue uploading the CSV file. You can try adding it later.');
-            }
-        }
+        const result = await uploadFile('/api/dives/full', fullFormData);
+        console.log('Success - dive created:', result);
         
-        // Step 4: Add selected species to the dive
-        if (selectedSpecies.length > 0) {
-            console.log('Adding species to dive:', selectedSpecies);
-            
-            try {
-                for (const species of selectedSpecies) {
-                    await apiRequest(`/api/species/dive/${diveId}/species`, 'POST', {
-                        taxon_id: species.taxon_id,
-                        scientific_name: species.scientific_name,
-                        common_name: species.common_name,
-                        rank: species.rank
-                    });
-                }
-                console.log('All species added successfully');
-                window.location.href = '/my-logs?success=dive_created_with_species';
-            } catch (error) {
-                console.error('Error adding species:', error);
-                alert('The dive log was created, but there was an issue adding some species. You can add them later.');
-                window.location.href = '/my-logs?success=dive_created';
-            }
-        } else {
-            // No species selected, just redirect to logs page
-            window.location.href = '/my-logs?success=dive_created';
-        }
+        const success = selectedSpecies.length > 0 ? 'dive_created_with_species' : 'dive_created';
+        window.location.href = `/my-logs?success=${success}`;
     } catch (error) {
         console.error('Error submitting form:', error);
         alert('Failed to save dive log: ' + error.message);
@@ -1,45 +1,65 @@
 document.addEventListener('DOMContentLoaded', function() {
-    console.log('Stats.js executing...');
-    
-    // Safely get dive data from element
+    const page = document.getElementById('stats-page');
+    if (!page) {
+        console.error('Stats page container not found');
+        return;
+    }
+
+    const userId = page.dataset.userId;
+    const baseUrl = `/api/users/${userId}`;
+
+    // Each dataset is fetched in parallel and rendered as soon as it arrives
+    loadDataset(`${baseUrl}/summary`, renderSummary);
+    loadDataset(`${baseUrl}/locations`, renderLocations);
+    loadDataset(`${baseUrl}/timeline`, renderTimeline);
+    loadDataset(`${baseUrl}/monthly`, renderMonthly);
+    loadDataset(`${baseUrl}/species-chart`, renderSpeciesChart);
+    loadDataset(`${baseUrl}/top-species`, renderTopSpecies);
+});
+
+// Fetch one dataset and hand it to its renderer
+async function loadDataset(url, render) {
     try {
-        const diveDataElement = document.getElementById('dive-data');
-        if (!diveDataElement) {
-            console.error('Dive data element not found');
-            return;
+        const response = await fetch(url, { credentials: 'same-origin' });
+        if (!response.ok) {
+            throw new Error(`HTTP error ${response.status}`);
         }
-        
-        const diveDataJson = diveDataElement.getAttribute('data-dive-json');
-        if (!diveDataJson) {
-            console.error('No dive data found in data-dive-json attribute');
-            return;
-        }
-        
-        // Try to parse the JSON
-        const diveData = JSON.parse(diveDataJson);
-        
-        // Initialize charts only if we have valid data
-        initializeCharts(diveData);
+        render(await response.json());
     } catch (error) {
-        console.error('Error initializing charts:', error);
+        console.error(`Error loading ${url}:`, error);
     }
-});
+}
+
+function renderSummary(summary) {
+    document.querySelectorAll('[data-stat]').forEach(element => {
+        const value = summary[element.dataset.stat];
+        element.textContent = `${value !== undefined ? value : 0}${element.dataset.unit || ''}`;
+    });
+}
 
-function initializeCharts(diveData) {
+function drawEmptyMessage(canvas, message) {
+    const ctx = canvas.getContext('2d');
+    ctx.font = '14px Arial';
+    ctx.fillStyle = '#666';
+    ctx.textAlign = 'center';
+    ctx.fillText(message, canvas.width / 2, canvas.height / 2);
+}
+
+function renderLocations(diveData) {
     // Initialize the map
     const mapContainer = document.getElementById('diveMapContainer');
     if (!mapContainer) {
         console.error('Map container element not found');
         return;
     }
-    
+
     const map = L.map('diveMapContainer').setView([20, 0], 2);
-    
+
     // Add the tile layer (OpenStreetMap)
     L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', {
         attribution: '&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
     }).addTo(map);
-    
+
     // Add heat map layer if we have coordinates
     if (diveData.coordinates && diveData.coordinates.length > 0) {
         // Format data for heatmap: [lat, lng, intensity]
@@ -48,7 +68,7 @@ function initializeCharts(diveData) {
             const intensity = diveData.dives_count && diveData.dives_count[index] ? diveData.dives_count[index] * 3 : 3;
             return [coord[0], coord[1], intensity];
         });
-        
+
         // Create and add the heatmap layer with much larger spots for demo
         L.heatLayer(heatPoints, {
             radius: 30,  // Much larger radius
@@ -58,12 +78,10 @@ function initializeCharts(diveData) {
             max: 10,  // Lower max value to make spots appear more intense
             gradient: {0.4: 'blue', 0.6: 'lime', 0.8: 'yellow', 1: 'red'}
         }).addTo(map);
-        
-        // If we have points, fit the map to show all points
-        if (diveData.coordinates.length > 0) {
-            const bounds = L.latLngBounds(diveData.coordinates);
-            map.fitBounds(bounds, { padding: [100, 100] });  // More padding
-        }
+
+        // Fit the map to show all points
+        const bounds = L.latLngBounds(diveData.coordinates);
+        map.fitBounds(bounds, { padding: [100, 100] });  // More padding
     } else {
         // Display a message if no coordinates are available
         const noDataDiv = document.createElement('div');
@@ -73,64 +91,152 @@ function initializeCharts(diveData) {
         noDataDiv.style.color = '#666';
         mapContainer.appendChild(noDataDiv);
     }
-    
-    // Species Pie Chart
-    if (diveData.species_names && diveData.species_names.length > 0) {
-        const speciesCanvas = document.getElementById('speciesChart');
-        if (!speciesCanvas) {
-            console.error('Species chart canvas not found');
-        } else {
-            const speciesCtx = speciesCanvas.getContext('2d');
-            new Chart(speciesCtx, {
-                type: 'pie',
-                data: {
-                    labels: diveData.species_names,
-                    datasets: [{
-                        data: diveData.species_counts,
-                        backgroundColor: [
-                            '#4a89dc', '#50c878', '#ff6b6b', '#ffd166', 
-                            '#8a2be2', '#20b2aa', '#ff7f50', '#6a5acd',
-                            '#9370db', '#3cb371', '#f08080', '#ffa07a',
-                            '#66cdaa', '#9932cc', '#e9967a', '#8fbc8f'
-                        ]
-                    }]
+
+    // Location Chart
+    const locationCanvas = document.getElementById('locationChart');
+    if (locationCanvas) {
+        const locationCtx = locationCanvas.getContext('2d');
+        new Chart(locationCtx, {
+            type: 'doughnut',
+            data: {
+                labels: diveData.locations,
+                datasets: [{
+                    data: diveData.dives_per_location,
+                    backgroundColor: [
+                        '#4a89dc', '#50c878', '#ff6b6b', '#ffd166',
+                        '#8a2be2', '#20b2aa', '#ff7f50', '#6a5acd'
+                    ]
+                }]
+            },
+            options: {
+                responsive: true,
+                plugins: {
+                    legend: {
+                        position: 'right',
+                    }
+                }
+            }
+        });
+    }
+}
+
+function renderSpeciesChart(diveData) {
+    const speciesCanvas = document.getElementById('speciesChart');
+    if (!speciesCanvas) {
+        console.error('Species chart canvas not found');
+        return;
+    }
+
+    if (!diveData.species_names || diveData.species_names.length === 0) {
+        drawEmptyMessage(speciesCanvas, 'No species data available');
+        return;
+    }
+
+    const speciesCtx = speciesCanvas.getContext('2d');
+    new Chart(speciesCtx, {
+        type: 'pie',
+        data: {
+            labels: diveData.species_names,
+            datasets: [{
+                data: diveData.species_counts,
+                backgroundColor: [
+                    '#4a89dc', '#50c878', '#ff6b6b', '#ffd166',
+                    '#8a2be2', '#20b2aa', '#ff7f50', '#6a5acd',
+                    '#9370db', '#3cb371', '#f08080', '#ffa07a',
+                    '#66cdaa', '#9932cc', '#e9967a', '#8fbc8f'
+                ]
+            }]
+        },
+        options: {
+            responsive: true,
+            plugins: {
+                legend: {
+                    position: 'right',
+                    labels: {
+                        boxWidth: 15,
+                        padding: 15
+                    }
                 },
-                options: {
-                    responsive: true,
-                    plugins: {
-                        legend: {
-                            position: 'right',
-                            labels: {
-                                boxWidth: 15,
-                                padding: 15
-                            }
-                        },
-                        tooltip: {
-                            callbacks: {
-                                label: function(context) {
-                                    const label = context.label || '';
-                                    const value = context.raw || 0;
-                                    const total = context.dataset.data.reduce((acc, val) => acc + val, 0);
-                                    const percentage = Math.round((value / total) * 100);
-                                    return `${label}: ${value} (${percentage}%)`;
-                                }
-                            }
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            const label = context.label || '';
+                            const value = context.raw || 0;
+                            const total = context.dataset.data.reduce((acc, val) => acc + val, 0);
+                            const percentage = Math.round((value / total) * 100);
+                            return `${label}: ${value} (${percentage}%)`;
                         }
                     }
                 }
-            });
-        }
-    } else {
-        const speciesCanvas = document.getElementById('speciesChart');
-        if (speciesCanvas) {
-            const ctx = speciesCanvas.getContext('2d');
-            ctx.font = '14px Arial';
-            ctx.fillStyle = '#666';
-            ctx.textAlign = 'center';
-            ctx.fillText('No species data available', speciesCanvas.width / 2, speciesCanvas.height / 2);
+            }
         }
+    });
+}
+
+function renderTopSpecies(data) {
+    const container = document.getElementById('top-species-container');
+    if (!container) return;
+
+    const topSpecies = data.top_species || [];
+    if (topSpecies.length === 0) {
+        container.innerHTML = `
+            <p style="text-align: center; color: #666; padding: 30px 0;">
+                No species data available. Add species to your dive logs to see statistics.
+            </p>`;
+        return;
     }
-    
+
+    const table = document.createElement('table');
+    table.className = 'species-table';
+    table.innerHTML = `
+        <thead>
+            <tr>
+                <th>Species</th>
+                <th>Image</th>
+                <th>Count</th>
+            </tr>
+        </thead>
+        <tbody></tbody>`;
+
+    const tbody = table.querySelector('tbody');
+    topSpecies.forEach(species => {
+        const row = document.createElement('tr');
+
+        const nameCell = document.createElement('td');
+        const commonName = document.createElement('div');
+        commonName.className = 'species-name';
+        commonName.textContent = species.common_name;
+        const scientificName = document.createElement('div');
+        scientificName.className = 'species-scientific';
+        scientificName.textContent = species.scientific_name;
+        nameCell.append(commonName, scientificName);
+
+        const imageCell = document.createElement('td');
+        if (species.image_url) {
+            const img = document.createElement('img');
+            img.src = species.image_url;
+            img.alt = species.common_name;
+            img.loading = 'lazy';
+            imageCell.appendChild(img);
+        } else {
+            imageCell.innerHTML = `
+                <div style="width: 60px; height: 60px; background-color: #f5f5f5; border-radius: 4px; display: flex; align-items: center; justify-content: center;">
+                    <span style="color: #999;">No image</span>
+                </div>`;
+        }
+
+        const countCell = document.createElement('td');
+        countCell.className = 'species-count';
+        countCell.textContent = species.count;
+
+        row.append(nameCell, imageCell, countCell);
+        tbody.appendChild(row);
+    });
+
+    container.replaceChildren(table);
+}
+
+function renderTimeline(diveData) {
     // Depth Chart
     const depthCanvas = document.getElementById('depthChart');
     if (depthCanvas) {
@@ -170,7 +276,7 @@ function initializeCharts(diveData) {
             }
         });
     }
-    
+
     // Duration Chart
     const durationCanvas = document.getElementById('durationChart');
     if (durationCanvas) {
@@ -209,34 +315,9 @@ function initializeCharts(diveData) {
             }
         });
     }
-    
-    // Location Chart
-    const locationCanvas = document.getElementById('locationChart');
-    if (locationCanvas) {
-        const locationCtx = locationCanvas.getContext('2d');
-        new Chart(locationCtx, {
-            type: 'doughnut',
-            data: {
-                labels: diveData.locations,
-                datasets: [{
-                    data: diveData.dives_per_location,
-                    backgroundColor: [
-                        '#4a89dc', '#50c878', '#ff6b6b', '#ffd166', 
-                        '#8a2be2', '#20b2aa', '#ff7f50', '#6a5acd'
-                    ]
-                }]
-            },
-            options: {
-                responsive: true,
-                plugins: {
-                    legend: {
-                        position: 'right',
-                    }
-                }
-            }
-        });
-    }
-    
+}
+
+function renderMonthly(diveData) {
     // Monthly Chart
     const monthlyCanvas = document.getElementById('monthlyChart');
     if (monthlyCanvas) {
@@ -267,4 +348,4 @@ function initializeCharts(diveData) {
             }
         });
     }
-} 
\ No newline at end of file
+}
@@ -0,0 +1,140 @@
+# Cache of the logged-in user for Flask-Login's user loader
+#
+# Nearly every request resolves `current_user`, which used to cost a SELECT on
+# users. The loader now keeps the user's columns (never the password hash)
+# under a per-user version and rebuilds a detached User from them, merged into
+# the session without a query. Commits that change or delete a user bump the
+# version, so profile edits, deactivation and password resets are seen on the
+# next request. Entries also expire after USER_CACHE_TTL seconds, which bounds
+# staleness across workers when the in-process LRU is used; point
+# USER_CACHE_BACKEND at 'redis' to share entries and versions between them.
+import json
+from datetime import date, datetime
+from sqlalchemy.orm import make_transient_to_detached
+from flask import current_app
+from app.caching import CacheMetrics, invalidate_on_commit, make_backend
+
+# Never stored; loaded from the database only when something reads it
+EXCLUDED_COLUMNS = ('password_hash',)
+
+
+class UserCache:
+    """Flask extension caching users for the login manager."""
+
+    def __init__(self, app=None):
+        self.app = app
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_BACKEND', 'lru')
+        app.config.setdefault('USER_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('USER_CACHE_TTL', 60)
+        app.config.setdefault('USER_CACHE_MAX_ENTRIES', 4096)
+        app.config.setdefault('USER_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+
+        app.extensions['user_cache'] = {
+            'backend': make_backend(
+                app.config['USER_CACHE_BACKEND'],
+                app.config['USER_CACHE_REDIS_URL'],
+                max_entries=app.config['USER_CACHE_MAX_ENTRIES'],
+                max_bytes=app.config['USER_CACHE_MAX_BYTES'],
+                prefix='divelogger:users'
+            ),
+            'metrics': CacheMetrics()
+        }
+
+        from app import db
+        invalidate_on_commit(db.session, 'user_cache', _edited_user_ids, _invalidate_users)
+
+    @property
+    def _state(self):
+        return current_app.extensions['user_cache']
+
+    @property
+    def backend(self):
+        return self._state['backend']
+
+    def _count(self, name):
+        self._state['metrics'].count(name)
+
+    def version(self, user_id):
+        return self.backend.get_counter(f"ver:user:{user_id}")
+
+    def invalidate(self, user_id):
+        return self.backend.incr(f"ver:user:{user_id}")
+
+    def key(self, user_id):
+        return f"user:{user_id}:v{self.version(user_id)}"
+
+    def load(self, user_id):
+        """Return the User with `user_id`, or None, querying only on a miss."""
+        from app import db
+        from app.models import User
+
+        # Already loaded in this session (e.g. a second lookup in one request)
+        user = db.session.identity_map.get(db.session.identity_key(User, user_id))
+        if user is not None:
+            return user
+
+        # Read the key before loading so a concurrent invalidation is not lost
+        key = self.key(user_id)
+        payload = self.backend.get(key)
+        if payload is not None:
+            self._count('hits')
+            return self._attach(User, json.loads(payload))
+
+        self._count('misses')
+        user = db.session.get(User, user_id)
+        if user is not None:
+            self.backend.set(key, json.dumps(self._dump(user)), ttl=current_app.config['USER_CACHE_TTL'])
+        return user
+
+    def _dump(self, user):
+        values = {}
+        for column in user.__table__.columns:
+            if column.key in EXCLUDED_COLUMNS:
+                continue
+            value = getattr(user, column.key)
+            values[column.key] = value.isoformat() if isinstance(value, (date, datetime)) else value
+        return values
+
+    def _attach(self, model, values):
+        from app import db
+
+        for column in model.__table__.columns:
+            value = values.get(column.key)
+            if value is None:
+                continue
+            if isinstance(column.type, db.DateTime):
+                values[column.key] = datetime.fromisoformat(value)
+            elif isinstance(column.type, db.Date):
+                values[column.key] = date.fromisoformat(value)
+
+        user = model(**values)
+        # Mark it as loaded from the database; the password hash stays unloaded
+        make_transient_to_detached(user)
+        return db.session.merge(user, load=False)
+
+    def metrics(self):
+        return self._state['metrics'].report(self.backend)
+
+
+# ---------------------------------------------------------------------------
+# Invalidation: users edited or deleted in a transaction get their version
+# bumped once it commits.
+# ---------------------------------------------------------------------------
+
+def _edited_user_ids(session):
+    from app.models import User
+
+    return {
+        obj.id for obj in list(session.dirty) + list(session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    }
+
+
+def _invalidate_users(user_ids):
+    users = UserCache()
+    for user_id in user_ids:
+        users.invalidate(user_id)
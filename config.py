@@ -7,11 +7,121 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Production server (gunicorn -c gunicorn.conf.py wsgi:app)
+    SERVER_BIND = os.environ.get('SERVER_BIND', '0.0.0.0:8000')
+    SERVER_WORKERS = int(os.environ.get('WEB_CONCURRENCY', 0))  # 0 means 2 x CPUs + 1
+    SERVER_WORKER_CLASS = os.environ.get('SERVER_WORKER_CLASS', 'gthread')  # 'gevent' needs gevent installed
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 4))  # per gthread worker
+    SERVER_MAX_REQUESTS = 1000  # recycle workers to bound memory growth
+    SERVER_MAX_REQUESTS_JITTER = 100
+    SERVER_TIMEOUT = 60
+    SERVER_GRACEFUL_TIMEOUT = 30  # seconds for in-flight requests and uploads to finish
+    SERVER_KEEPALIVE = 5
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))  # trusted proxies setting X-Forwarded-For
+
+    # Engine tuning (app/database.py). SQLite files run in WAL mode with the
+    # pragmas below; server databases use a pre-pinged, recycled pool.
+    SQLITE_TUNING = True
+    SQLITE_PRAGMAS = {}  # overrides, e.g. {'synchronous': 'full'}
+    # One pooled connection per request thread in each worker
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', SERVER_THREADS))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 2))
+    DB_POOL_TIMEOUT = 30  # seconds to wait for a free connection
+    DB_POOL_RECYCLE = 1800  # seconds; below typical server/proxy idle timeouts
+    DB_POOL_PRE_PING = True
+
+    # What create_app does about tables: 'create' (db.create_all, the default
+    # in debug), 'check' (refuse to start unless at the latest migration) or
+    # 'none' (the default otherwise; run `flask db upgrade` when deploying)
+    DB_SCHEMA_MODE = os.environ.get('DB_SCHEMA_MODE')
+    DB_MIGRATIONS_DIR = os.path.join(basedir, 'migrations')
+
+    # Read replicas: comma-separated URLs become binds replica1, replica2, ...
+    # GET requests on DB_REPLICA_ROUTES read from a replica within
+    # DB_REPLICA_MAX_LAG seconds; clients that just wrote read the primary for
+    # DB_REPLICA_STICKY_SECONDS.
+    SQLALCHEMY_BINDS = {
+        f'replica{index}': url
+        for index, url in enumerate(filter(None, os.environ.get('DB_REPLICA_URLS', '').split(',')), 1)
+    }
+    DB_REPLICA_MAX_LAG = 5
+    DB_REPLICA_LAG_CHECK_INTERVAL = 2
+    DB_REPLICA_STICKY_SECONDS = 10
     
     # File upload configuration
     UPLOAD_FOLDER = os.path.join(basedir, 'app/static/uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file upload size
 
+    # Statistics response cache ('lru', 'redis' or 'null')
+    STATS_CACHE_BACKEND = os.environ.get('STATS_CACHE_BACKEND', 'lru')
+    STATS_CACHE_REDIS_URL = os.environ.get('STATS_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    STATS_CACHE_MAX_ENTRIES = 2048
+    STATS_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    STATS_CACHE_TTL = 300  # seconds; bounds staleness across LRU workers for views without an ETag
+    STATS_CACHE_LOCK_TIMEOUT = 10
+
+    # Password hashing, e.g. 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1'. Hashes made
+    # with another method are upgraded at the user's next login. Unset uses
+    # Werkzeug's pbkdf2 default, or a cheap method when TESTING is on.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD')
+    PASSWORD_VERIFY_WORKERS = 4  # concurrent password checks
+    PASSWORD_VERIFY_MAX_PENDING = 32  # queued checks before logins get a 503
+
+    # Token-bucket rate limits ('memory' or 'redis'); '10/minute' allows bursts of
+    # 10 and refills at 10 per minute. Login, registration and password reset
+    # are keyed by client IP, searches and uploads by user.
+    RATELIMIT_ENABLED = True
+    RATELIMIT_BACKEND = os.environ.get('RATELIMIT_BACKEND', 'memory')
+    RATELIMIT_REDIS_URL = os.environ.get('RATELIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    RATELIMIT_POLICIES = {
+        'login': '10/minute',
+        'register': '10/hour',
+        'forgot-password': '5/hour',
+        'search': '60/minute',
+        'upload': '30/minute',
+    }
+
+    # Logged-in user cache for the login manager ('lru', 'redis' or 'null')
+    USER_CACHE_BACKEND = os.environ.get('USER_CACHE_BACKEND', 'lru')
+    USER_CACHE_REDIS_URL = os.environ.get('USER_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    USER_CACHE_TTL = 60  # seconds; bounds staleness across workers with the LRU backend
+
+    # Rendered dive card fragments ('lru', 'redis' or 'null')
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'lru')
+    FRAGMENT_CACHE_REDIS_URL = os.environ.get('FRAGMENT_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    # Logging (app/logs.py): records are queued and written by a background
+    # thread, as JSON lines ('json') or plain text ('text'), to stderr or LOG_FILE
+    LOG_LEVEL = os.environ.get('LOG_LEVEL')  # unset means DEBUG in debug, INFO otherwise
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+    LOG_FILE = os.environ.get('LOG_FILE')  # rotated at 10 MB, 5 backups kept
+    LOG_QUEUE_SIZE = 10000  # records beyond this are dropped, never waited for
+    LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1.0))  # share of requests keeping DEBUG lines
+
+    # Content-addressed media storage ('local' or 's3')
+    MEDIA_BACKEND = os.environ.get('MEDIA_BACKEND', 'local')
+    MEDIA_ROOT = os.environ.get('MEDIA_ROOT')  # defaults to app/static/uploads/media
+    MEDIA_URL_PREFIX = '/static/uploads/media'
+    MEDIA_S3_BUCKET = os.environ.get('MEDIA_S3_BUCKET', 'divelogger-media')
+    MEDIA_S3_ENDPOINT_URL = os.environ.get('MEDIA_S3_ENDPOINT_URL')  # e.g. a local MinIO
+    MEDIA_S3_PUBLIC_URL = os.environ.get('MEDIA_S3_PUBLIC_URL')
+    MEDIA_CHUNK_SIZE = 64 * 1024
+    MEDIA_GC_GRACE_SECONDS = 3600
+    MEDIA_VARIANTS_ASYNC = True  # render thumbnails in a background thread pool
+    MEDIA_VARIANT_WORKERS = 2
+
+    # Dives per My Logs page; further pages load as the user scrolls
+    MY_LOGS_PAGE_SIZE = 20
+
+    # Most sites returned by one /api/sites/catalogue request
+    SITE_CATALOGUE_MAX_SITES = 2000
+
+class DevelopmentConfig(Config):
+    # `python app.py`: the debug server builds any missing tables itself
+    DEBUG = True
+    DB_SCHEMA_MODE = os.environ.get('DB_SCHEMA_MODE') or 'create'
+
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
@@ -0,0 +1,54 @@
+# Gunicorn settings for production, tuned from config.py:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# The app is loaded once in the master and forked (preload_app), workers are
+# recycled after SERVER_MAX_REQUESTS requests, and on SIGTERM each worker
+# drains: /readyz starts failing and in-flight requests, including uploads,
+# get SERVER_GRACEFUL_TIMEOUT seconds to finish. `kill -HUP <master>` replaces
+# workers this way without dropping requests.
+import signal
+import multiprocessing
+from config import Config
+
+bind = Config.SERVER_BIND
+workers = Config.SERVER_WORKERS or multiprocessing.cpu_count() * 2 + 1
+worker_class = Config.SERVER_WORKER_CLASS
+threads = Config.SERVER_THREADS
+preload_app = True
+max_requests = Config.SERVER_MAX_REQUESTS
+max_requests_jitter = Config.SERVER_MAX_REQUESTS_JITTER
+timeout = Config.SERVER_TIMEOUT
+graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT
+keepalive = Config.SERVER_KEEPALIVE
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Never share database connections the master may have opened
+    from app import db
+    flask_app = server.app.wsgi()
+    with flask_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # Start draining as soon as the worker is told to stop, then let
+    # gunicorn's own handler finish in-flight requests
+    from app import lifecycle
+    flask_app = worker.wsgi
+    stop = signal.getsignal(signal.SIGTERM)
+
+    def drain(signum, frame):
+        lifecycle.begin_drain(flask_app)
+        stop(signum, frame)
+
+    signal.signal(signal.SIGTERM, drain)
+
+
+def worker_exit(server, worker):
+    from app import lifecycle
+    remaining = lifecycle.wait_for_uploads(graceful_timeout, app=worker.wsgi)
+    if remaining:
+        worker.log.warning("Worker exiting with %s uploads still in flight", remaining)
@@ -0,0 +1,42 @@
+"""Add media_variants for resized image renditions
+
+Revision ID: 0c6d2f8b9a14
+Revises: f3a9c1e6d270
+Create Date: 2025-05-25 09:18:36.417205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c6d2f8b9a14'
+down_revision = 'f3a9c1e6d270'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), which may already have built the table
+    if 'media_variants' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table('media_variants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('blob_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=20), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('width', sa.Integer(), nullable=True),
+    sa.Column('height', sa.Integer(), nullable=True),
+    sa.Column('size', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['blob_id'], ['media_blobs.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('blob_id', 'name', 'format', name='uq_media_variants_blob_name_format')
+    )
+    op.create_index('ix_media_variants_blob_id', 'media_variants', ['blob_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_media_variants_blob_id', table_name='media_variants')
+    op.drop_table('media_variants')
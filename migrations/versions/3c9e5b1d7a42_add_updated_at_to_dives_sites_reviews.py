@@ -0,0 +1,31 @@
+"""Add updated_at to dives, sites and reviews for ETag version stamps
+
+Revision ID: 3c9e5b1d7a42
+Revises: 14722babe515
+Create Date: 2025-05-20 10:12:41.503118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e5b1d7a42'
+down_revision = '14722babe515'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('dives', 'sites', 'reviews'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+        # Existing rows start out at their creation time
+        op.execute(f'UPDATE {table} SET updated_at = created_at')
+
+
+def downgrade():
+    for table in ('reviews', 'sites', 'dives'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,29 @@
+"""Add updated_at to dive_species for the species stats ETags
+
+Revision ID: 6e0b2d9f4c31
+Revises: d2f6a8c41b95
+Create Date: 2025-06-03 09:48:15.206734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e0b2d9f4c31'
+down_revision = 'd2f6a8c41b95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('dive_species', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Existing rows start out at their creation time
+    op.execute('UPDATE dive_species SET updated_at = created_at')
+
+
+def downgrade():
+    with op.batch_alter_table('dive_species', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,48 @@
+"""Index dives.user_id and dive_species for per-user aggregation
+
+Revision ID: 8d41f0c2b6e9
+Revises: 3c9e5b1d7a42
+Create Date: 2025-05-21 14:03:27.811542
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d41f0c2b6e9'
+down_revision = '3c9e5b1d7a42'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    # dive_species was only ever created by db.create_all(); add it for
+    # databases that were built from migrations alone
+    if 'dive_species' not in inspector.get_table_names():
+        op.create_table('dive_species',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('dive_id', sa.Integer(), nullable=False),
+        sa.Column('taxon_id', sa.Integer(), nullable=False),
+        sa.Column('scientific_name', sa.String(length=255), nullable=False),
+        sa.Column('common_name', sa.String(length=255), nullable=True),
+        sa.Column('rank', sa.String(length=50), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['dive_id'], ['dives.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+    # create_app() runs db.create_all(), which may already have built these
+    for table, column in (('dives', 'user_id'), ('dive_species', 'dive_id'), ('dive_species', 'taxon_id')):
+        name = f'ix_{table}_{column}'
+        if name not in {index['name'] for index in inspector.get_indexes(table)}:
+            op.create_index(name, table, [column], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_dive_species_taxon_id', table_name='dive_species')
+    op.drop_index('ix_dive_species_dive_id', table_name='dive_species')
+    op.drop_index('ix_dives_user_id', table_name='dives')
@@ -0,0 +1,27 @@
+"""Index dives by (user_id, start_time, id) for keyset pagination
+
+Revision ID: a4c8e2f61b37
+Revises: 0c6d2f8b9a14
+Create Date: 2025-05-26 10:42:51.208394
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4c8e2f61b37'
+down_revision = '0c6d2f8b9a14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), which may already have built the index
+    inspector = sa.inspect(op.get_bind())
+    if 'ix_dives_user_start_time' not in {index['name'] for index in inspector.get_indexes('dives')}:
+        op.create_index('ix_dives_user_start_time', 'dives', ['user_id', 'start_time', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_dives_user_start_time', table_name='dives')
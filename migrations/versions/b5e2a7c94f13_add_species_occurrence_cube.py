@@ -0,0 +1,37 @@
+"""Add species_occurrence cube
+
+Revision ID: b5e2a7c94f13
+Revises: 8d41f0c2b6e9
+Create Date: 2025-05-22 10:41:09.274318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e2a7c94f13'
+down_revision = '8d41f0c2b6e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('species_occurrence',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cell', sa.String(length=255), nullable=False),
+    sa.Column('month', sa.Integer(), nullable=False),
+    sa.Column('taxon_id', sa.Integer(), nullable=False),
+    sa.Column('scientific_name', sa.String(length=255), nullable=False),
+    sa.Column('common_name', sa.String(length=255), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cell', 'month', 'taxon_id', name='uq_species_occurrence_cell_month_taxon')
+    )
+    op.create_index('ix_species_occurrence_lookup', 'species_occurrence', ['cell', 'month', 'count'], unique=False)
+    # Run `flask rebuild-species-occurrence` afterwards to fill it from existing sightings
+
+
+def downgrade():
+    op.drop_index('ix_species_occurrence_lookup', table_name='species_occurrence')
+    op.drop_table('species_occurrence')
@@ -0,0 +1,26 @@
+"""Add dives.version for optimistic concurrency control
+
+Revision ID: c9d3b7a05e12
+Revises: a4c8e2f61b37
+Create Date: 2025-05-27 16:05:12.734920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9d3b7a05e12'
+down_revision = 'a4c8e2f61b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('dives', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('dives', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,24 @@
+"""Index sites by (lat, lng) for bounding-box catalogue queries
+
+Revision ID: d2f6a8c41b95
+Revises: c9d3b7a05e12
+Create Date: 2025-05-28 11:27:40.913562
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6a8c41b95'
+down_revision = 'c9d3b7a05e12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_sites_lat_lng', 'sites', ['lat', 'lng'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sites_lat_lng', table_name='sites')
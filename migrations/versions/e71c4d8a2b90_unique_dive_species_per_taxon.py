@@ -0,0 +1,37 @@
+"""Unique dive_species per (dive_id, taxon_id)
+
+Revision ID: e71c4d8a2b90
+Revises: b5e2a7c94f13
+Create Date: 2025-05-23 16:12:45.930127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71c4d8a2b90'
+down_revision = 'b5e2a7c94f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'uq_dive_species_dive_taxon' in {c['name'] for c in inspector.get_unique_constraints('dive_species')}:
+        return
+
+    # Keep the first row logged for each taxon on a dive. Afterwards run
+    # `flask rebuild-species-occurrence` so the occurrence counts match.
+    op.execute(
+        'DELETE FROM dive_species WHERE id NOT IN '
+        '(SELECT keep_id FROM (SELECT MIN(id) AS keep_id FROM dive_species GROUP BY dive_id, taxon_id) AS keep)'
+    )
+
+    with op.batch_alter_table('dive_species', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_dive_species_dive_taxon', ['dive_id', 'taxon_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('dive_species', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_dive_species_dive_taxon', type_='unique')
@@ -0,0 +1,39 @@
+"""Add media_blobs for content-addressed uploads
+
+Revision ID: f3a9c1e6d270
+Revises: e71c4d8a2b90
+Create Date: 2025-05-24 11:27:52.604183
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a9c1e6d270'
+down_revision = 'e71c4d8a2b90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_app() runs db.create_all(), which may already have built the table
+    if 'media_blobs' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table('media_blobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('content_type', sa.String(length=100), nullable=True),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sha256')
+    )
+
+
+def downgrade():
+    op.drop_table('media_blobs')
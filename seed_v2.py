@@ -25,12 +25,11 @@ import traceback
 from datetime import datetime, timedelta, date
 
 import requests
-from werkzeug.security import generate_password_hash
 
 # Make project importable when run directly
 sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 
-from app import create_app, db
+from app import create_app, db, passwords
 from app.models import (
     User,
     Dive,
@@ -270,6 +269,8 @@ DIVE_NOTES = [
 
 def seed():
     with app.app_context():
+        # create_app only creates tables in debug (DB_SCHEMA_MODE)
+        db.create_all()
         print("Wiping existing data…")
         wipe_data()
 
@@ -278,6 +279,9 @@ def seed():
         # -------------------------------------------------------------------
         user_objs = {}
         print("Creating users…")
+        # Seed with a cheap hash; each account is upgraded to the configured
+        # policy the first time it logs in
+        seed_method = "pbkdf2:sha256:1000"
         for username, firstname, lastname, email in USERS:
             # Assign a random avatar (1-4)
             avatar_number = random.randint(1, 4)
@@ -290,7 +294,7 @@ def seed():
                 email=email,
                 bio="Auto-generated demo user.",
                 dob=date(1990, 1, 1),
-                password_hash=generate_password_hash("Password123!"),
+                password_hash=passwords.hash_password("Password123!", method=seed_method),
                 registration_date=datetime.utcnow(),
                 status="active",
                 avatar=avatar_path,  # Set the avatar path
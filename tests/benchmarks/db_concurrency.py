@@ -0,0 +1,139 @@
+"""Mixed read/write throughput for each database engine profile.
+
+Runs a pool of threads against a dives-like table for a fixed time. Each
+operation is a read of a user's latest dives or, with probability
+--write-ratio, an insert committed on its own. Profiles:
+
+  sqlite-default  rollback journal, synchronous=FULL (SQLITE_TUNING = False)
+  sqlite-tuned    WAL and the pragmas from app/database.py
+  postgresql      pooled engine from app/database.py, if BENCH_POSTGRES_URL is set
+
+Usage:
+    python -m tests.benchmarks.db_concurrency [--threads 8] [--seconds 5] [--write-ratio 0.2]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app.database import engine_options, set_sqlite_pragmas, sqlite_pragmas  # noqa: E402
+from config import Config  # noqa: E402
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bench_dives (
+    id {id_column},
+    user_id INTEGER NOT NULL,
+    start_time TIMESTAMP NOT NULL,
+    max_depth FLOAT,
+    notes TEXT
+)
+"""
+USERS = 50
+
+
+def make_engine(uri, config):
+    engine = create_engine(uri, **engine_options(uri, config))
+    set_sqlite_pragmas(engine, sqlite_pragmas(uri, config))
+    return engine
+
+
+def prepare(engine):
+    id_column = 'SERIAL PRIMARY KEY' if engine.dialect.name == 'postgresql' else 'INTEGER PRIMARY KEY'
+    schema = SCHEMA.format(id_column=id_column)
+    with engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS bench_dives'))
+        conn.execute(text(schema))
+        conn.execute(text('CREATE INDEX ix_bench_dives_user ON bench_dives (user_id, start_time)'))
+        conn.execute(
+            text('INSERT INTO bench_dives (user_id, start_time, max_depth, notes) VALUES (:u, :t, :d, :n)'),
+            [{'u': i % USERS, 't': datetime.utcnow(), 'd': 18.0, 'n': 'seed'} for i in range(2000)]
+        )
+
+
+def worker(engine, deadline, write_ratio, results, lock):
+    ops = writes = errors = 0
+    latencies = []
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                with engine.begin() as conn:
+                    conn.execute(
+                        text('INSERT INTO bench_dives (user_id, start_time, max_depth, notes) '
+                             'VALUES (:u, :t, :d, :n)'),
+                        {'u': rng.randrange(USERS), 't': datetime.utcnow(), 'd': rng.uniform(5, 40), 'n': 'bench'}
+                    )
+                writes += 1
+            else:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text('SELECT id, start_time, max_depth FROM bench_dives '
+                             'WHERE user_id = :u ORDER BY start_time DESC LIMIT 20'),
+                        {'u': rng.randrange(USERS)}
+                    ).fetchall()
+            ops += 1
+            latencies.append(time.perf_counter() - started)
+        except Exception:
+            errors += 1
+    with lock:
+        results['ops'] += ops
+        results['writes'] += writes
+        results['errors'] += errors
+        results['latencies'].extend(latencies)
+
+
+def run_profile(name, uri, config, threads, seconds, write_ratio):
+    engine = make_engine(uri, config)
+    prepare(engine)
+    results = {'ops': 0, 'writes': 0, 'errors': 0, 'latencies': []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+    pool = [threading.Thread(target=worker, args=(engine, deadline, write_ratio, results, lock))
+            for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    engine.dispose()
+
+    latencies = sorted(results['latencies']) or [0.0]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{name:<16} {results['ops'] / seconds:>10.0f} {results['writes'] / seconds:>10.0f} "
+          f"{p95 * 1000:>10.2f} {results['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+
+    base = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+    print(f"{args.threads} threads, {args.seconds:g}s per profile, {args.write_ratio:.0%} writes\n")
+    print(f"{'profile':<16} {'ops/s':>10} {'writes/s':>10} {'p95 ms':>10} {'errors':>8}")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, tuning in (('sqlite-default', False), ('sqlite-tuned', True)):
+            uri = 'sqlite:///' + os.path.join(tmpdir, f'{name}.db')
+            run_profile(name, uri, dict(base, SQLITE_TUNING=tuning),
+                        args.threads, args.seconds, args.write_ratio)
+
+    postgres_url = os.environ.get('BENCH_POSTGRES_URL')
+    if postgres_url:
+        run_profile('postgresql', postgres_url, base, args.threads, args.seconds, args.write_ratio)
+    else:
+        print('postgresql       skipped (set BENCH_POSTGRES_URL to a scratch database)')
+
+
+if __name__ == '__main__':
+    main()
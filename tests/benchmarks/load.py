@@ -0,0 +1,141 @@
+"""Requests per second through gunicorn for different worker counts.
+
+Starts `gunicorn -c gunicorn.conf.py wsgi:app` against a migrated SQLite file
+seeded with sites, once per worker count, and drives it for a fixed time
+with keep-alive client threads. Prints throughput, p95 latency and errors,
+then stops the server with SIGTERM so each run also exercises the graceful
+shutdown path.
+
+Usage:
+    python -m tests.benchmarks.load [--workers 1 2 4] [--clients 16] [--seconds 10]
+                                    [--path /api/sites/?limit=20]
+
+A few errors per run are expected: a worker recycled after
+SERVER_MAX_REQUESTS closes the keep-alive connections it was holding. The
+client runs in one Python process; for more than a few workers use a
+dedicated load generator (wrk, hey) against the same server instead.
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import sqlite3
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+SITES = 500
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def prepare(env, db_path):
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app:create_app', 'db', 'upgrade'],
+                   cwd=ROOT, env=env, capture_output=True, check=True)
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            'INSERT INTO sites (name, lat, lng, country, difficulty) VALUES (?, ?, ?, ?, ?)',
+            [(f'Reef {i}', -30 + i * 0.1, 150 + i * 0.05, 'Australia', 'Intermediate') for i in range(SITES)]
+        )
+
+
+def wait_until_ready(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited during startup')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/readyz')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError('gunicorn did not become ready')
+
+
+def client(port, path, deadline, results, lock):
+    ok = errors = 0
+    latencies = []
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                ok += 1
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.close()
+    with lock:
+        results['ok'] += ok
+        results['errors'] += errors
+        results['latencies'].extend(latencies)
+
+
+def run(workers, env, args):
+    port = free_port()
+    env = dict(env, WEB_CONCURRENCY=str(workers), SERVER_BIND=f'127.0.0.1:{port}')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_ready(port, process)
+        results = {'ok': 0, 'errors': 0, 'latencies': []}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+        pool = [threading.Thread(target=client, args=(port, args.path, deadline, results, lock))
+                for _ in range(args.clients)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+
+    latencies = sorted(results['latencies']) or [0.0]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{workers:>8} {results['ok'] / args.seconds:>10.0f} {p95 * 1000:>10.2f} {results['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--path', default='/api/sites/?limit=20')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        db_path = os.path.join(tmpdir, 'load.db')
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + db_path)
+        env.pop('DB_SCHEMA_MODE', None)
+        env.pop('FLASK_DEBUG', None)
+        prepare(env, db_path)
+
+        print(f"GET {args.path}, {args.clients} keep-alive clients, {args.seconds:g}s per run\n")
+        print(f"{'workers':>8} {'req/s':>10} {'p95 ms':>10} {'errors':>8}")
+        for workers in args.workers:
+            run(workers, env, args)
+
+
+if __name__ == '__main__':
+    main()
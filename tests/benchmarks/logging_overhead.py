@@ -0,0 +1,81 @@
+"""Time spent on the request thread per log call, synchronous vs queued.
+
+Each profile builds the app with LOG_FILE in a temporary directory, then
+threads log INFO lines from inside a request context, as views do. The
+timing covers only the logging call, which is what a request waits for:
+
+  sync    LOG_ASYNC = False, the JSON line is encoded and written in the call
+  async   LOG_ASYNC = True, the call queues the record for the listener thread
+
+Usage:
+    python -m tests.benchmarks.logging_overhead [--threads 8] [--lines 5000]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from app import create_app, logs  # noqa: E402
+from config import Config  # noqa: E402
+
+
+class BenchConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+
+
+def worker(app, lines, results, lock):
+    timings = []
+    with app.test_request_context('/api/dives/1/upload-csv', method='POST'):
+        for i in range(lines):
+            started = time.perf_counter()
+            app.logger.info("Saved CSV profile for dive %s (%d bytes)", i, 2048, extra={'dive_id': i})
+            timings.append(time.perf_counter() - started)
+    with lock:
+        results.extend(timings)
+
+
+def run_profile(name, log_async, tmpdir, threads, lines):
+    config = type('Bench', (BenchConfig,), {
+        'LOG_ASYNC': log_async,
+        'LOG_FILE': os.path.join(tmpdir, f'{name}.log'),
+    })
+    app = create_app(config)
+    results = []
+    lock = threading.Lock()
+    pool = [threading.Thread(target=worker, args=(app, lines, results, lock)) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stats = logs.stats()
+    logs.stop()
+
+    results.sort()
+    p50 = results[len(results) // 2]
+    p99 = results[min(len(results) - 1, int(len(results) * 0.99))]
+    print(f"{name:<8} {p50 * 1e6:>10.1f} {p99 * 1e6:>10.1f} {len(results) / elapsed:>12.0f} "
+          f"{stats.get('dropped', 0):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--lines', type=int, default=5000, help='log calls per thread')
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.lines} INFO lines\n")
+    print(f"{'profile':<8} {'p50 us':>10} {'p99 us':>10} {'calls/s':>12} {'dropped':>8}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        run_profile('sync', False, tmpdir, args.threads, args.lines)
+        run_profile('async', True, tmpdir, args.threads, args.lines)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Application startup time for workers and tests.
+
+Measures, each in a fresh interpreter so nothing is already imported:
+
+  import      `import app` (module imports for every worker and test run)
+  worker      create_app() with the default config on a migrated SQLite file
+  create      the same with DB_SCHEMA_MODE = 'create' (the old startup)
+  test        create_app() with an in-memory TESTING config, as in setUp
+
+and, in one interpreter, the average create_app() time over repeated test
+setUps once imports are warm.
+
+Usage:
+    python -m tests.benchmarks.startup [--runs 5]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+
+SNIPPETS = {
+    'import': """
+import time
+started = time.perf_counter()
+import app
+print(time.perf_counter() - started)
+""",
+    'worker': """
+import time
+started = time.perf_counter()
+from app import create_app
+create_app()
+print(time.perf_counter() - started)
+""",
+    'create': """
+import os, time
+os.environ['DB_SCHEMA_MODE'] = 'create'
+started = time.perf_counter()
+from app import create_app
+create_app()
+print(time.perf_counter() - started)
+""",
+    'test': """
+import time
+started = time.perf_counter()
+from app import create_app
+from config import Config
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+create_app(TestConfig)
+print(time.perf_counter() - started)
+""",
+}
+
+WARM = """
+import time
+from app import create_app
+from config import Config
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+create_app(TestConfig)
+started = time.perf_counter()
+for _ in range({runs}):
+    create_app(TestConfig)
+print((time.perf_counter() - started) / {runs})
+"""
+
+
+def run(snippet, env):
+    output = subprocess.run([sys.executable, '-c', snippet], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(tmpdir, 'bench.db'))
+        env.pop('DB_SCHEMA_MODE', None)
+        env.pop('FLASK_DEBUG', None)
+        # Workers start against a migrated database
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'app:create_app', 'db', 'upgrade'],
+                       cwd=ROOT, env=env, capture_output=True, check=True)
+
+        print(f"{'phase':<10} {'median ms':>10} {'min ms':>10}   ({args.runs} cold runs each)")
+        for name, snippet in SNIPPETS.items():
+            timings = [run(snippet, env) for _ in range(args.runs)]
+            print(f"{name:<10} {statistics.median(timings) * 1000:>10.1f} {min(timings) * 1000:>10.1f}")
+
+        warm = run(WARM.format(runs=max(args.runs, 20)), env)
+        print(f"{'test warm':<10} {warm * 1000:>10.1f} {'':>10}   (create_app per test setUp)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import unittest
+from app import assets, create_app, db
+from app.assets import IMMUTABLE_CACHE_CONTROL, brotli
+from config import Config
+import gzip
+import os
+import re
+import shutil
+import tempfile
+from unittest import mock
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class AssetsTestCase(unittest.TestCase):
+    """Test case for fingerprinted, pre-compressed static assets."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.output_dir = tempfile.mkdtemp()
+        TestConfig.ASSETS_OUTPUT_DIR = self.output_dir
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        assets.build(self.app)
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.output_dir)
+        del TestConfig.ASSETS_OUTPUT_DIR
+
+    def bundle_url(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        match = re.search(r'/assets/css/base\.bundle\.[0-9a-f]{12}\.css', response.data.decode())
+        self.assertIsNotNone(match)
+        return match.group(0)
+
+    def test_pages_reference_fingerprinted_bundles(self):
+        """Test that base.html links the hashed bundle instead of the sources."""
+        response = self.client.get('/')
+        self.assertNotIn(b'/static/css/main.css', response.data)
+        self.assertRegex(response.data.decode(), r'/assets/js/base\.bundle\.[0-9a-f]{12}\.js')
+
+    def test_immutable_and_precompressed(self):
+        """Test cache headers and Accept-Encoding negotiation."""
+        url = self.bundle_url()
+
+        plain = self.client.get(url)
+        self.assertEqual(plain.headers['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertIsNone(plain.headers.get('Content-Encoding'))
+        self.assertIn(b'.container', plain.data)
+
+        gzipped = self.client.get(url, headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(gzipped.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzipped.data), plain.data)
+        self.assertIn('Accept-Encoding', gzipped.headers['Vary'])
+
+        if brotli is not None:
+            compressed = self.client.get(url, headers={'Accept-Encoding': 'gzip, br'})
+            self.assertEqual(compressed.headers['Content-Encoding'], 'br')
+            self.assertEqual(brotli.decompress(compressed.data), plain.data)
+
+    def test_unfingerprinted_paths_fall_back_to_static(self):
+        """Test relative url() targets and unknown files."""
+        with self.app.test_request_context():
+            self.assertEqual(self.app.jinja_env.globals['asset_url']('templates/sample_dive_profile.csv'),
+                             '/static/templates/sample_dive_profile.csv')
+        response = self.client.get('/assets/images/dive-marker.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers.get('Cache-Control'), IMMUTABLE_CACHE_CONTROL)
+
+    def test_startup_only_reads_the_manifest(self):
+        """Test that create_app loads a built manifest and never writes assets itself."""
+        manifest = self.app.extensions['assets']['manifest']
+        with mock.patch.object(assets, 'build') as build:
+            app = create_app(TestConfig)
+        build.assert_not_called()
+        self.assertEqual(app.extensions['assets']['manifest'], manifest)
+
+        empty_dir = tempfile.mkdtemp()
+        try:
+            app = create_app(type('EmptyAssets', (TestConfig,), {'ASSETS_OUTPUT_DIR': empty_dir}))
+            self.assertEqual(app.extensions['assets']['manifest'], {})
+            self.assertEqual(os.listdir(empty_dir), [])
+        finally:
+            shutil.rmtree(empty_dir)
+
+
+    def test_pages_work_without_a_manifest(self):
+        """Test that every asset a page references is served when nothing was built."""
+        empty_dir = tempfile.mkdtemp()
+        try:
+            app = create_app(type('EmptyAssets', (TestConfig,), {'ASSETS_OUTPUT_DIR': empty_dir}))
+            client = app.test_client()
+            page = client.get('/').data.decode()
+            urls = set(re.findall(r'(?:href|src)="(/(?:static|assets)/[^"]+)"', page))
+            self.assertIn('/assets/css/base.bundle.css', urls)
+            self.assertIn('/assets/js/base.bundle.js', urls)
+            for url in urls:
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200, url)
+                response.close()
+
+            bundle = client.get('/assets/js/base.bundle.js').data
+            with open(os.path.join(app.static_folder, 'js', 'csrf-handler.js'), 'rb') as f:
+                self.assertIn(f.read(), bundle)
+            self.assertEqual(os.listdir(empty_dir), [])
+        finally:
+            shutil.rmtree(empty_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+import unittest
+import threading
+import time
+from unittest import mock
+from app import create_app, db, cache
+from app.caching import LRUBackend, NullBackend, make_backend
+from app.models import Dive, DiveSpecies, User
+from config import Config
+from datetime import datetime
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class LRUBackendTestCase(unittest.TestCase):
+    """Test case for the in-process LRU backend."""
+
+    def test_evicts_least_recently_used_entry(self):
+        """Test that the entry limit evicts the oldest untouched key."""
+        backend = LRUBackend(max_entries=2)
+        backend.set('a', '1')
+        backend.set('b', '2')
+        backend.get('a')
+        backend.set('c', '3')
+
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), '1')
+        self.assertEqual(backend.evictions, 1)
+
+    def test_respects_byte_limit(self):
+        """Test that total payload size stays within max_bytes."""
+        backend = LRUBackend(max_entries=100, max_bytes=10)
+        backend.set('a', 'x' * 6)
+        backend.set('b', 'y' * 6)
+
+        self.assertIsNone(backend.get('a'))
+        self.assertLessEqual(backend.info()['bytes'], 10)
+
+    def test_expired_entries_are_misses(self):
+        """Test that entries past their TTL are not returned."""
+        backend = LRUBackend()
+        backend.set('a', '1', ttl=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(backend.get('a'))
+
+
+class MakeBackendTestCase(unittest.TestCase):
+    """Test case for building each cache's backend from its own settings."""
+
+    def test_limits_and_url_are_passed_explicitly(self):
+        """Test that the LRU limits and Redis URL come from the arguments."""
+        backend = make_backend('lru', None, max_entries=5, max_bytes=100)
+        self.assertEqual((backend.max_entries, backend.max_bytes), (5, 100))
+        self.assertIsInstance(make_backend('null', None), NullBackend)
+
+        with mock.patch('app.caching.RedisBackend') as redis_backend:
+            make_backend('redis', 'redis://cache:6379/3', prefix='divelogger:users')
+        redis_backend.assert_called_once_with('redis://cache:6379/3', prefix='divelogger:users')
+
+    def test_each_cache_uses_its_own_settings(self):
+        """Test that the user and fragment caches read their own Redis URL and limits."""
+        config = type('RedisConfig', (TestConfig,), {
+            'USER_CACHE_BACKEND': 'redis',
+            'USER_CACHE_REDIS_URL': 'redis://users:6379/1',
+            'FRAGMENT_CACHE_BACKEND': 'redis',
+            'FRAGMENT_CACHE_REDIS_URL': 'redis://fragments:6379/2',
+            'STATS_CACHE_MAX_ENTRIES': 7,
+        })
+        with mock.patch('app.caching.RedisBackend') as redis_backend:
+            app = create_app(config)
+        urls = {call.kwargs['prefix']: call.args[0] for call in redis_backend.call_args_list}
+        self.assertEqual(urls, {
+            'divelogger:users': 'redis://users:6379/1',
+            'divelogger:fragments': 'redis://fragments:6379/2',
+        })
+        self.assertEqual(app.extensions['response_cache']['backend'].max_entries, 7)
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    """Test case for per-user versioned caching."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.user = User(username='testuser', email='test@example.com', status='active')
+        self.user.set_password('Password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def logged_in_client(self):
+        client = self.app.test_client()
+        client.post('/api/auth/login', json={'email': 'test@example.com', 'password': 'Password123'})
+        return client
+
+    def add_dive(self):
+        dive = Dive(
+            user_id=self.user.id,
+            start_time=datetime(2025, 5, 10, 9, 0),
+            end_time=datetime(2025, 5, 10, 10, 0),
+            max_depth=18.0,
+            location='Blue Hole'
+        )
+        db.session.add(dive)
+        db.session.commit()
+        return dive
+
+    def test_dive_and_species_writes_bump_version(self):
+        """Test that committing dive or species changes bumps the owner's version."""
+        version = cache.user_version(self.user.id)
+        dive = self.add_dive()
+        self.assertGreater(cache.user_version(self.user.id), version)
+
+        version = cache.user_version(self.user.id)
+        db.session.add(DiveSpecies(dive_id=dive.id, taxon_id=1, scientific_name='Chelonia mydas'))
+        db.session.commit()
+        self.assertGreater(cache.user_version(self.user.id), version)
+
+    def test_rollback_does_not_bump_version(self):
+        """Test that abandoned writes leave cached entries valid."""
+        version = cache.user_version(self.user.id)
+        db.session.add(Dive(
+            user_id=self.user.id,
+            start_time=datetime(2025, 5, 10, 9, 0),
+            end_time=datetime(2025, 5, 10, 10, 0),
+            max_depth=18.0,
+            location='Blue Hole'
+        ))
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(cache.user_version(self.user.id), version)
+
+    def test_stats_are_served_from_cache_until_write(self):
+        """Test hit/miss accounting around a write."""
+        client = self.logged_in_client()
+        self.add_dive()
+
+        client.get(f'/api/users/{self.user.id}/stats')
+        client.get(f'/api/users/{self.user.id}/stats')
+        metrics = cache.metrics()
+        self.assertEqual(metrics['misses'], 1)
+        self.assertEqual(metrics['hits'], 1)
+
+        self.add_dive()
+        response = client.get(f'/api/users/{self.user.id}/stats')
+        self.assertEqual(response.get_json()['total_dives'], 2)
+        self.assertEqual(cache.metrics()['misses'], 2)
+
+    def test_write_in_another_worker_is_not_served_stale(self):
+        """Test that a payload cached before another worker's write is not sent under the new ETag."""
+        client = self.logged_in_client()
+        self.add_dive()
+        client.get(f'/api/users/{self.user.id}/stats')
+
+        # Another worker commits; this process's version counter never moves
+        with mock.patch('app.caching.ResponseCache.bump_user_version'):
+            self.add_dive()
+        response = client.get(f'/api/users/{self.user.id}/stats')
+        self.assertEqual(response.get_json()['total_dives'], 2)
+
+    def test_concurrent_misses_compute_once(self):
+        """Test that the stampede lock lets only one caller recompute."""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'value': 42}
+
+        results = []
+
+        def worker():
+            with self.app.app_context():
+                results.append(cache.get_or_set('stampede', compute))
+
+        threads = [threading.Thread(target=worker) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 42}] * 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import os
+import unittest
+import tempfile
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app.database import engine_options, schema_status, sqlite_pragmas
+from config import Config
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class DatabaseTuningTestCase(unittest.TestCase):
+    """Test case for engine options and SQLite pragmas."""
+
+    def setUp(self):
+        """Create a file-backed app so WAL can be switched on."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'tuned.db')
+
+    def tearDown(self):
+        """Clean up after each test."""
+        self.tmpdir.cleanup()
+
+    def make_app(self, **settings):
+        config = type('FileConfig', (TestConfig,), {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + self.db_path,
+            **settings
+        })
+        return create_app(config)
+
+    def pragma(self, app, name):
+        with app.app_context():
+            value = db.session.execute(text(f'PRAGMA {name}')).scalar()
+            db.session.remove()
+            db.engine.dispose()
+            return value
+
+    def test_sqlite_file_runs_in_wal_mode(self):
+        """Test that new connections get WAL, NORMAL sync and a busy timeout."""
+        app = self.make_app()
+        self.assertEqual(self.pragma(app, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(app, 'synchronous'), 1)
+        self.assertEqual(self.pragma(app, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(app, 'cache_size'), -64000)
+
+    def test_pragma_overrides_and_opt_out(self):
+        """Test that SQLITE_PRAGMAS overrides defaults and SQLITE_TUNING = False skips them."""
+        app = self.make_app(SQLITE_PRAGMAS={'synchronous': 'full'})
+        self.assertEqual(self.pragma(app, 'synchronous'), 2)
+
+        self.assertEqual(sqlite_pragmas('sqlite:///' + self.db_path, {'SQLITE_TUNING': False}), {})
+
+    def test_memory_database_keeps_its_journal(self):
+        """Test that in-memory databases are not switched to WAL."""
+        pragmas = sqlite_pragmas('sqlite:///:memory:', {})
+        self.assertNotIn('journal_mode', pragmas)
+        self.assertEqual(pragmas['synchronous'], 'normal')
+
+    def test_server_databases_get_pool_settings(self):
+        """Test that PostgreSQL URIs get pool sizing, pre-ping and recycle."""
+        options = engine_options('postgresql://diver@localhost/divelogger', {
+            'DB_POOL_SIZE': 5, 'DB_MAX_OVERFLOW': 2, 'DB_POOL_RECYCLE': 600
+        })
+        self.assertEqual(options['pool_size'], 5)
+        self.assertEqual(options['max_overflow'], 2)
+        self.assertEqual(options['pool_recycle'], 600)
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertEqual(engine_options('sqlite:///' + self.db_path, {}), {})
+
+    def test_explicit_engine_options_win(self):
+        """Test that SQLALCHEMY_ENGINE_OPTIONS in the config is kept."""
+        app = self.make_app(SQLALCHEMY_ENGINE_OPTIONS={'echo_pool': True})
+        self.assertEqual(app.config['SQLALCHEMY_ENGINE_OPTIONS'], {'echo_pool': True})
+        with app.app_context():
+            db.engine.dispose()
+
+    def test_schema_is_left_alone_by_default(self):
+        """Test that outside debug create_app neither creates tables nor loads Flask-Migrate."""
+        app = self.make_app()
+        self.assertNotIn('migrate', app.extensions)
+        with app.app_context():
+            self.assertEqual(inspect(db.engine).get_table_names(), [])
+            db.engine.dispose()
+
+    def test_create_mode_creates_tables(self):
+        """Test that DB_SCHEMA_MODE = 'create' keeps the old create_all behaviour."""
+        app = self.make_app(DB_SCHEMA_MODE='create')
+        with app.app_context():
+            self.assertIn('dives', inspect(db.engine).get_table_names())
+            db.engine.dispose()
+
+    def test_check_mode_refuses_an_unmigrated_database(self):
+        """Test that DB_SCHEMA_MODE = 'check' fails fast and reports what is missing."""
+        with self.assertRaises(RuntimeError):
+            self.make_app(DB_SCHEMA_MODE='check')
+
+        app = self.make_app(DB_SCHEMA_MODE='create')
+        status = schema_status(app, db)
+        self.assertEqual(status['missing_tables'], [])
+        self.assertEqual(status['current'], [])
+        self.assertEqual(len(status['heads']), 1)
+        with app.app_context():
+            db.engine.dispose()
+
+    def test_unknown_schema_mode_is_rejected(self):
+        """Test that a mistyped DB_SCHEMA_MODE fails at startup."""
+        with self.assertRaises(ValueError):
+            self.make_app(DB_SCHEMA_MODE='migrate')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,21 @@
 import unittest
-from app import create_app, db
-from app.models import Dive, User
+from app import create_app, db, media_store
+from app.media import LocalFSBackend
+from app.models import Dive, DiveSpecies, User
 from config import Config
+from sqlalchemy.orm.exc import StaleDataError
 from datetime import datetime, timezone
+from io import BytesIO
 import json
+import os
+import tempfile
 
 class TestConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
     SECRET_KEY = 'test-secret-key'
+    MEDIA_VARIANTS_ASYNC = False  # render thumbnails before the temp media root is removed
 
 class DiveTestCase(unittest.TestCase):
     def setUp(self):
@@ -129,5 +135,184 @@ class DiveTestCase(unittest.TestCase):
         deleted_dive = db.session.get(Dive, dive.id)
         self.assertIsNone(deleted_dive)
 
+    def add_dive(self, location, user=None):
+        dive = Dive(
+            user_id=(user or self.test_user).id,
+            start_time=datetime(2025, 5, 10, 9, 0),
+            end_time=datetime(2025, 5, 10, 10, 0),
+            max_depth=18.0,
+            location=location
+        )
+        db.session.add(dive)
+        db.session.commit()
+        return dive
+
+    def test_get_dives_by_ids(self):
+        first = self.add_dive('Blue Hole')
+        second = self.add_dive('Shark Reef')
+
+        response = self.client.get(f'/api/dives/?ids={second.id},{first.id},{second.id}')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([dive['id'] for dive in data], [second.id, first.id])
+        self.assertEqual(data[0]['location'], 'Shark Reef')
+
+        # Unchanged dives revalidate with 304
+        etag = response.headers['ETag']
+        response = self.client.get(
+            f'/api/dives/?ids={second.id},{first.id},{second.id}',
+            headers={'If-None-Match': etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_get_dives_by_ids_checks_ownership(self):
+        other = User(username='other', email='other@example.com', status='active')
+        other.set_password('Password123')
+        db.session.add(other)
+        db.session.commit()
+        mine = self.add_dive('Blue Hole')
+        theirs = self.add_dive('Secret Reef', user=other)
+
+        response = self.client.get(f'/api/dives/?ids={mine.id},{theirs.id}')
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(f'/api/dives/?ids={mine.id},9999')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.data)['missing'], [9999])
+
+    def test_get_dives_by_ids_rejects_bad_lists(self):
+        self.assertEqual(self.client.get('/api/dives/?ids=1,abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/dives/?ids=').status_code, 400)
+        too_many = ','.join(str(dive_id) for dive_id in range(1, 102))
+        self.assertEqual(self.client.get(f'/api/dives/?ids={too_many}').status_code, 400)
+
+    def patch_dive(self, dive_id, data, if_match=None):
+        headers = {'If-Match': if_match} if if_match else {}
+        return self.client.patch(
+            f'/api/dives/{dive_id}',
+            data=json.dumps(data),
+            content_type='application/json',
+            headers=headers
+        )
+
+    def test_patch_dive_changes_only_supplied_fields(self):
+        dive = self.add_dive('Shipwreck')
+        etag = self.client.get(f'/api/dives/{dive.id}').headers['ETag']
+        self.assertEqual(etag, f'"dive-{dive.id}-v1"')
+
+        response = self.patch_dive(dive.id, {'notes': 'Octopus'}, if_match=etag)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['notes'], 'Octopus')
+        self.assertEqual(data['location'], 'Shipwreck')
+        self.assertEqual(data['version'], 2)
+        self.assertEqual(response.headers['ETag'], f'"dive-{dive.id}-v2"')
+
+    def test_patch_dive_without_changes_does_not_commit(self):
+        dive = self.add_dive('Shipwreck')
+        updated_at = dive.updated_at
+
+        response = self.patch_dive(dive.id, {'location': 'Shipwreck', 'max_depth': 18.0})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['version'], 1)
+
+        db.session.expire_all()
+        dive = db.session.get(Dive, dive.id)
+        self.assertEqual(dive.version, 1)
+        self.assertEqual(dive.updated_at, updated_at)
+
+    def test_patch_dive_with_stale_if_match_fails(self):
+        dive = self.add_dive('Shipwreck')
+        stale = f'"dive-{dive.id}-v1"'
+        self.assertEqual(self.patch_dive(dive.id, {'notes': 'First tab'}, if_match=stale).status_code, 200)
+
+        response = self.patch_dive(dive.id, {'notes': 'Second tab'}, if_match=stale)
+        self.assertEqual(response.status_code, 412)
+        data = json.loads(response.data)
+        self.assertEqual(data['dive']['notes'], 'First tab')
+        self.assertEqual(response.headers['ETag'], f'"dive-{dive.id}-v2"')
+
+        # PUT honours the same precondition
+        response = self.client.put(
+            f'/api/dives/{dive.id}',
+            data=json.dumps({'notes': 'Second tab'}),
+            content_type='application/json',
+            headers={'If-Match': stale}
+        )
+        self.assertEqual(response.status_code, 412)
+        db.session.expire_all()
+        self.assertEqual(db.session.get(Dive, dive.id).notes, 'First tab')
+
+    def test_patch_dive_rejects_unknown_fields(self):
+        dive = self.add_dive('Shipwreck')
+        response = self.patch_dive(dive.id, {'version': 7})
+        self.assertEqual(response.status_code, 400)
+        response = self.patch_dive(dive.id, {'start_time': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_concurrent_update_is_detected(self):
+        dive = self.add_dive('Shipwreck')
+        # Another writer commits a new version behind this session's back
+        db.session.execute(db.text('UPDATE dives SET version = version + 1 WHERE id = :id'), {'id': dive.id})
+        dive.notes = 'Lost update'
+        with self.assertRaises(StaleDataError):
+            db.session.commit()
+        db.session.rollback()
+
+    def use_media_root(self, media_root):
+        self.app.extensions['media_store']['backend'] = LocalFSBackend(media_root, '/static/uploads/media')
+
+    def post_full_dive(self, species, csv_text, media=None):
+        data = {
+            'dive': json.dumps({
+                'start_time': '2025-05-10T09:00:00',
+                'end_time': '2025-05-10T10:00:00',
+                'max_depth': 18.0,
+                'location': 'Coral Garden'
+            }),
+            'species': json.dumps(species),
+            'profile_csv': (BytesIO(csv_text.encode('utf-8')), 'profile.csv')
+        }
+        if media:
+            data['media'] = (BytesIO(media), 'photo.jpg')
+        return self.client.post('/api/dives/full', data=data, content_type='multipart/form-data')
+
+    def test_create_full_dive(self):
+        with tempfile.TemporaryDirectory() as media_root:
+            self.use_media_root(media_root)
+            response = self.post_full_dive(
+                [{'taxon_id': 39681, 'scientific_name': 'Chelonia mydas'}],
+                'Time (min),Depth (m)\n0,0\n1,5\n',
+                media=b'fake image bytes'
+            )
+            self.assertEqual(response.status_code, 201)
+            data = json.loads(response.data)
+            self.assertEqual(data['species'][0]['taxon_id'], 39681)
+            key = data['media'][len('/static/uploads/media/'):]
+            self.assertTrue(os.path.exists(os.path.join(media_root, key)))
+
+        dive = db.session.get(Dive, data['id'])
+        self.assertIn('Depth (m)', dive.profile_csv_data)
+        self.assertEqual(dive.species.count(), 1)
+
+    def test_create_full_dive_is_atomic(self):
+        # An invalid profile is rejected before anything is written
+        response = self.post_full_dive([], 'not a profile')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Dive.query.count(), 0)
+
+        # A bad species entry rolls back the dive and removes the saved media
+        with tempfile.TemporaryDirectory() as media_root:
+            self.use_media_root(media_root)
+            response = self.post_full_dive(
+                [{'taxon_id': 39681}],
+                'Time (min),Depth (m)\n0,0\n1,5\n',
+                media=b'fake image bytes'
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(list(media_store.backend.keys()), [])
+        self.assertEqual(Dive.query.count(), 0)
+        self.assertEqual(DiveSpecies.query.count(), 0)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
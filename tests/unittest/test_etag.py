@@ -0,0 +1,130 @@
+import unittest
+from app import create_app, db
+from app.models import Dive, User, Site
+from config import Config
+from datetime import datetime
+import json
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class ETagTestCase(unittest.TestCase):
+    """Test case for conditional GET handling on the read APIs."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.test_user = User(
+            username='testuser',
+            email='test@example.com',
+            registration_date=datetime.utcnow(),
+            status='active'
+        )
+        self.test_user.set_password('Password123')
+        db.session.add(self.test_user)
+        db.session.commit()
+
+        self.dive = Dive(
+            user_id=self.test_user.id,
+            dive_number=1,
+            start_time=datetime(2025, 5, 10, 9, 0),
+            end_time=datetime(2025, 5, 10, 10, 0),
+            max_depth=18.0,
+            location='Blue Hole'
+        )
+        db.session.add(self.dive)
+        db.session.commit()
+
+        self.client.post(
+            '/api/auth/login',
+            data=json.dumps({
+                'email': 'test@example.com',
+                'password': 'Password123'
+            }),
+            content_type='application/json'
+        )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_dive_not_modified(self):
+        """Test that a matching If-None-Match returns 304 with no body."""
+        response = self.client.get(f'/api/dives/{self.dive.id}')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers.get('ETag')
+        self.assertIsNotNone(etag)
+        self.assertIn('no-cache', response.headers.get('Cache-Control'))
+
+        response = self.client.get(f'/api/dives/{self.dive.id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+    def test_dive_etag_changes_after_update(self):
+        """Test that updating a dive invalidates its ETag."""
+        etag = self.client.get(f'/api/dives/{self.dive.id}').headers.get('ETag')
+
+        self.client.put(
+            f'/api/dives/{self.dive.id}',
+            data=json.dumps({'location': 'Shark Reef'}),
+            content_type='application/json'
+        )
+
+        response = self.client.get(f'/api/dives/{self.dive.id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers.get('ETag'), etag)
+        self.assertEqual(json.loads(response.data)['location'], 'Shark Reef')
+
+    def test_stats_etag_changes_after_new_dive(self):
+        """Test that the per-user stats ETag follows the user's dives."""
+        url = f'/api/users/{self.test_user.id}/stats'
+        etag = self.client.get(url).headers.get('ETag')
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        db.session.add(Dive(
+            user_id=self.test_user.id,
+            start_time=datetime(2025, 5, 11, 9, 0),
+            end_time=datetime(2025, 5, 11, 9, 45),
+            max_depth=12.0,
+            location='Coral Garden'
+        ))
+        db.session.commit()
+
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['total_dives'], 2)
+
+    def test_sites_public_cache_control(self):
+        """Test that the site catalogue is publicly cacheable and varies by query."""
+        db.session.add(Site(name='Ningaloo Reef'))
+        db.session.commit()
+
+        response = self.client.get('/api/sites/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response.headers.get('Cache-Control'))
+
+        other = self.client.get('/api/sites/?search=Ning')
+        self.assertNotEqual(other.headers.get('ETag'), response.headers.get('ETag'))
+
+    def test_missing_site_has_no_etag(self):
+        """Test that 404 responses are left to the view."""
+        response = self.client.get('/api/sites/999')
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(response.headers.get('ETag'))
+
+
+if __name__ == '__main__':
+    unittest.main()
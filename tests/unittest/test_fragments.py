@@ -0,0 +1,140 @@
+import unittest
+import json
+from flask import g, render_template_string
+from app import create_app, db, cache, fragments
+from app.models import Dive, User
+from config import Config
+from datetime import datetime
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class FragmentCacheTestCase(unittest.TestCase):
+    """Test case for cached dive card fragments."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = User(username='testuser', email='test@example.com', status='active')
+        self.user.set_password('Password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+        self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'test@example.com', 'password': 'Password123'}),
+            content_type='application/json'
+        )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_dive(self, location='Blue Hole'):
+        dive = Dive(
+            user_id=self.user.id,
+            start_time=datetime(2025, 5, 10, 9, 0),
+            end_time=datetime(2025, 5, 10, 10, 0),
+            max_depth=18.0,
+            location=location,
+            notes='<b>Turtles</b>'
+        )
+        db.session.add(dive)
+        db.session.commit()
+        return dive
+
+    def test_cards_are_reused_between_requests(self):
+        """Test that a second render of My Logs hits the cache for every card."""
+        self.add_dive('Blue Hole')
+        self.add_dive('Shark Point')
+
+        first = self.client.get('/my-logs')
+        second = self.client.get('/my-logs')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data, second.data)
+
+        metrics = fragments.metrics()
+        self.assertEqual(metrics['misses'], 2)
+        self.assertEqual(metrics['hits'], 2)
+
+    def test_cached_cards_are_not_double_escaped(self):
+        """Test that cached HTML is emitted as markup and user text stays escaped."""
+        self.add_dive()
+        for _ in range(2):
+            html = self.client.get('/my-logs').get_data(as_text=True)
+            self.assertIn('<div class="log-card"', html)
+            self.assertIn('&lt;b&gt;Turtles&lt;/b&gt;', html)
+
+    def test_dive_update_renders_fresh_card(self):
+        """Test that editing a dive through the API replaces its cached card."""
+        dive = self.add_dive('Blue Hole')
+        self.client.get('/my-logs')
+
+        response = self.client.put(
+            f'/api/dives/{dive.id}',
+            data=json.dumps({'location': 'Manta Reef'}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+        html = self.client.get('/my-logs').get_data(as_text=True)
+        self.assertIn('Manta Reef', html)
+        self.assertNotIn('<h3>Blue Hole</h3>', html)
+
+    def test_commit_bumps_dive_generation(self):
+        """Test that committed dive edits bump the generation and rollbacks do not."""
+        dive = self.add_dive()
+        generation = fragments.dive_generation(dive.id)
+
+        dive.notes = 'Rolled back'
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(fragments.dive_generation(dive.id), generation)
+
+        dive.notes = 'Mantas'
+        db.session.commit()
+        self.assertGreater(fragments.dive_generation(dive.id), generation)
+
+    def test_one_commit_invalidates_fragments_and_stats(self):
+        """Test that the shared commit hook bumps both caches and a rollback bumps neither."""
+        dive = self.add_dive()
+        generation = fragments.dive_generation(dive.id)
+        version = cache.user_version(self.user.id)
+
+        dive.notes = 'Rolled back'
+        db.session.flush()
+        db.session.rollback()
+        dive.max_depth = 21.0
+        db.session.commit()
+
+        self.assertEqual(fragments.dive_generation(dive.id), generation + 1)
+        self.assertEqual(cache.user_version(self.user.id), version + 1)
+
+    def test_key_includes_template_and_locale(self):
+        """Test that the same parts in another template or locale are separate entries."""
+        source = "{% cache 'card', 1 %}{{ text }}{% endcache %}"
+        with self.app.test_request_context():
+            self.assertEqual(render_template_string(source, text='hello'), 'hello')
+            self.assertEqual(render_template_string(source, text='changed'), 'hello')
+            other = "{% cache 'card', 1 %}<i>{{ text }}</i>{% endcache %}"
+            self.assertEqual(render_template_string(other, text='other'), '<i>other</i>')
+
+            g.locale = 'fr'
+            self.assertEqual(render_template_string(source, text='bonjour'), 'bonjour')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import unittest
+import json
+import threading
+from unittest import mock
+from flask import abort
+from app import create_app, db, lifecycle
+from app.models import User
+from config import Config
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+    RATELIMIT_ENABLED = False
+
+
+class HealthTestCase(unittest.TestCase):
+    """Test case for health checks and draining before shutdown."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        user = User(username='testuser', email='test@example.com', status='active')
+        user.set_password('Password123')
+        db.session.add(user)
+        db.session.commit()
+
+        self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'test@example.com', 'password': 'Password123'}),
+            content_type='application/json'
+        )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_healthz_and_readyz(self):
+        """Test that a running worker is alive and ready."""
+        response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'status': 'ok'})
+
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'status': 'ready'})
+
+    def test_readyz_fails_without_database(self):
+        """Test that readiness fails when the database cannot be queried."""
+        with mock.patch('app.health.routes.db.session.execute', side_effect=OSError('connection refused')):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['status'], 'unavailable')
+
+    def test_draining_worker_is_not_ready_but_alive(self):
+        """Test that /readyz fails while draining and /healthz keeps passing."""
+        lifecycle.begin_drain()
+        self.assertTrue(lifecycle.is_draining())
+
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json(), {'status': 'draining', 'uploads_in_flight': 0})
+        self.assertEqual(self.client.get('/healthz').status_code, 200)
+
+    def test_new_uploads_are_refused_while_draining(self):
+        """Test that uploads get 503 with Retry-After once the worker drains."""
+        lifecycle.begin_drain()
+        response = self.client.put('/api/dives/1/media?filename=photo.jpg', data=b'image',
+                                   content_type='image/jpeg')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+        # Other requests are still served until the worker stops
+        self.assertEqual(self.client.get('/api/dives/').status_code, 200)
+
+    def test_uploads_are_counted_while_in_flight(self):
+        """Test that an upload counts as in flight until its view returns."""
+        seen = []
+
+        def ownership(dive_id):
+            seen.append(lifecycle.uploads_in_flight())
+            abort(404)
+
+        with mock.patch('app.dives.routes.check_dive_ownership', side_effect=ownership):
+            response = self.client.put('/api/dives/1/media?filename=photo.jpg', data=b'image',
+                                       content_type='image/jpeg')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(seen, [1])
+        self.assertEqual(lifecycle.uploads_in_flight(), 0)
+
+    def test_wait_for_uploads(self):
+        """Test that shutdown waits for running uploads and reports any left at the timeout."""
+        started = threading.Event()
+        release = threading.Event()
+
+        @lifecycle.upload
+        def slow_upload():
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        def run():
+            with self.app.test_request_context():
+                slow_upload()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        started.wait(5)
+
+        self.assertEqual(lifecycle.wait_for_uploads(0.05, app=self.app), 1)
+        release.set()
+        self.assertEqual(lifecycle.wait_for_uploads(5, app=self.app), 0)
+        thread.join()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import json
+import queue
+import logging
+import unittest
+import tempfile
+import threading
+from app import create_app, db, logs
+from app.logs import AsyncQueueHandler, is_sampled
+from config import Config
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class LogPipelineTestCase(unittest.TestCase):
+    """Test case for queued JSON logging with request ids."""
+
+    def setUp(self):
+        """Set up an app logging to a temporary file."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.log_path = os.path.join(self.tmpdir.name, 'app.log')
+        self.make_app()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        logs.stop()
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        self.tmpdir.cleanup()
+
+    def make_app(self, **settings):
+        if hasattr(self, 'app_context'):
+            self.app_context.pop()
+        config = type('LogConfig', (TestConfig,), {'LOG_FILE': self.log_path, **settings})
+        self.app = create_app(config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        @self.app.route('/log-test')
+        def log_test():
+            self.app.logger.info("Hello %s", 'diver', extra={'dive_id': 7})
+            self.app.logger.debug("Debug detail")
+            return 'ok'
+
+    def entries(self):
+        # Stopping the listener writes out everything still queued
+        logs.stop()
+        with open(self.log_path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def test_records_are_json_with_request_fields(self):
+        """Test that a record carries the request id, method, path and extra fields."""
+        response = self.client.get('/log-test', headers={'X-Request-ID': 'abc-123'})
+        self.assertEqual(response.headers['X-Request-ID'], 'abc-123')
+
+        entry = [e for e in self.entries() if e['message'] == 'Hello diver'][0]
+        self.assertEqual(entry['level'], 'INFO')
+        self.assertEqual(entry['request_id'], 'abc-123')
+        self.assertEqual(entry['method'], 'GET')
+        self.assertEqual(entry['path'], '/log-test')
+        self.assertEqual(entry['dive_id'], 7)
+
+    def test_request_ids_are_generated_and_sanitised(self):
+        """Test that a missing or unsafe X-Request-ID is replaced with a new id."""
+        first = self.client.get('/log-test').headers['X-Request-ID']
+        second = self.client.get('/log-test', headers={'X-Request-ID': 'bad id <script>'}).headers['X-Request-ID']
+        self.assertEqual(len(first), 32)
+        self.assertNotEqual(first, second)
+        self.assertNotIn(' ', second)
+
+    def test_records_are_written_off_the_request_thread(self):
+        """Test that the app logger only queues records and a listener writes them."""
+        self.assertIsInstance(logs.handler, AsyncQueueHandler)
+        written_by = []
+        target = logs.listener.handlers[0]
+        emit = target.emit
+        target.emit = lambda record: written_by.append(threading.current_thread()) or emit(record)
+
+        self.client.get('/log-test')
+        self.entries()
+        self.assertTrue(written_by)
+        self.assertNotIn(threading.current_thread(), written_by)
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test that records beyond the queue size are counted and dropped."""
+        handler = AsyncQueueHandler(queue.Queue(1))
+        for i in range(3):
+            handler.handle(logging.makeLogRecord({'msg': 'line %d', 'args': (i,)}))
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(handler.dropped, 2)
+
+    def test_message_is_fixed_when_logged(self):
+        """Test that arguments changed after the call do not alter the queued message."""
+        handler = AsyncQueueHandler(queue.Queue())
+        depths = [18]
+        handler.handle(logging.makeLogRecord({'msg': 'depths %s', 'args': (depths,)}))
+        depths.append(30)
+        record = handler.queue.get_nowait()
+        self.assertEqual(record.getMessage(), 'depths [18]')
+
+    def test_debug_lines_are_sampled_per_request(self):
+        """Test that LOG_DEBUG_SAMPLE_RATE keeps or drops a request's debug lines together."""
+        self.make_app(LOG_LEVEL='DEBUG', LOG_DEBUG_SAMPLE_RATE=0.0)
+        self.client.get('/log-test')
+        messages = [e['message'] for e in self.entries()]
+        self.assertIn('Hello diver', messages)
+        self.assertNotIn('Debug detail', messages)
+
+        self.assertEqual(is_sampled('abc-123', 0.5), is_sampled('abc-123', 0.5))
+        self.assertTrue(is_sampled('abc-123', 1.0))
+        kept = sum(is_sampled(f'request-{i}', 0.25) for i in range(2000))
+        self.assertTrue(350 < kept < 650)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,253 @@
+import unittest
+from app import create_app, db, media_store
+from app.media import blob_key, images
+from app.models import Dive, User, MediaBlob, MediaVariant
+from config import Config
+from datetime import datetime
+from io import BytesIO
+from unittest import mock
+import hashlib
+import json
+import tempfile
+import shutil
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+    MEDIA_CHUNK_SIZE = 4  # exercise the chunked copy
+    MEDIA_VARIANTS_ASYNC = False
+
+
+class MediaStoreTestCase(unittest.TestCase):
+    """Test case for content-addressed media storage."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.media_root = tempfile.mkdtemp()
+        TestConfig.MEDIA_ROOT = self.media_root
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.test_user = User(username='testuser', email='test@example.com', status='active')
+        self.test_user.set_password('Password123')
+        db.session.add(self.test_user)
+        db.session.commit()
+
+        self.dives = []
+        for number in range(2):
+            dive = Dive(user_id=self.test_user.id, start_time=datetime(2025, 6, 1, 9, 0),
+                        end_time=datetime(2025, 6, 1, 10, 0), max_depth=15.0, location='Ningaloo Reef')
+            db.session.add(dive)
+            self.dives.append(dive)
+        db.session.commit()
+
+        self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'test@example.com', 'password': 'Password123'}),
+            content_type='application/json'
+        )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, dive, content, filename='photo.jpg'):
+        response = self.client.post(
+            f'/api/dives/{dive.id}/upload',
+            data={'media': (BytesIO(content), filename)},
+            content_type='multipart/form-data'
+        )
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.data)['media_url']
+
+    def stored_keys(self):
+        return [key for key, _ in media_store.backend.keys()]
+
+    def test_identical_uploads_are_stored_once(self):
+        """Test deduplication and reference counting."""
+        first = self.upload(self.dives[0], b'same image bytes')
+        second = self.upload(self.dives[1], b'same image bytes', filename='copy.jpeg')
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.stored_keys()), 1)
+        self.assertEqual(MediaBlob.query.one().refcount, 2)
+
+    def test_replaced_media_is_collected(self):
+        """Test that replacing a dive's media releases the old blob for GC."""
+        old = self.upload(self.dives[0], b'first photo')
+        new = self.upload(self.dives[0], b'second photo')
+        self.assertNotEqual(old, new)
+
+        result = media_store.collect_garbage(grace_seconds=0)
+        self.assertEqual(result['blobs'], 1)
+        self.assertEqual(self.stored_keys(), [new[len('/static/uploads/media/'):]])
+
+        self.client.delete(f'/api/dives/{self.dives[0].id}')
+        media_store.collect_garbage(grace_seconds=0)
+        self.assertEqual(self.stored_keys(), [])
+        self.assertEqual(MediaBlob.query.count(), 0)
+
+    def test_concurrent_first_upload_reuses_blob(self):
+        """Test that losing the insert race to another upload reuses its blob."""
+        content = b'raced image bytes'
+        digest = hashlib.sha256(content).hexdigest()
+        db.session.add(MediaBlob(sha256=digest, key=blob_key(digest, 'jpg'), size=len(content), refcount=1))
+        db.session.commit()
+
+        # The other upload commits between our lookup and our insert
+        with mock.patch('flask_sqlalchemy.query.Query.first', return_value=None):
+            blob = media_store.save(BytesIO(content), 'photo.jpg')
+        media_store.retain(media_store.url(blob))
+        db.session.commit()
+        self.assertEqual(MediaBlob.query.one().refcount, 2)
+
+    def test_concurrent_first_upload_without_native_upsert(self):
+        """Test the select-then-insert fallback when the other upload wins the insert."""
+        content = b'raced image bytes'
+        digest = hashlib.sha256(content).hexdigest()
+        db.session.add(MediaBlob(sha256=digest, key=blob_key(digest, 'jpg'), size=len(content), refcount=1))
+        db.session.commit()
+
+        # Both our lookup and the fallback's existence check miss the committed row
+        with mock.patch.object(db.engine.dialect, 'name', 'other'), \
+                mock.patch('flask_sqlalchemy.query.Query.first', return_value=None), \
+                mock.patch('sqlalchemy.orm.Query.scalar', return_value=False):
+            blob = media_store.save(BytesIO(content), 'photo.jpg')
+        media_store.retain(media_store.url(blob))
+        db.session.commit()
+        self.assertEqual(MediaBlob.query.one().refcount, 2)
+
+    def locked_queries(self):
+        from sqlalchemy import event
+        from sqlalchemy.dialects import postgresql
+
+        locked = []
+
+        def record(state):
+            if state.is_select and 'FOR UPDATE' in str(state.statement.compile(dialect=postgresql.dialect())):
+                locked.append(state.statement)
+
+        event.listen(db.session, 'do_orm_execute', record)
+        self.addCleanup(event.remove, db.session, 'do_orm_execute', record)
+        return locked
+
+    def test_discard_rechecks_references_under_lock(self):
+        """Test that discard only unlinks an unreferenced blob, holding its row lock."""
+        url = self.upload(self.dives[0], b'kept photo')
+        locked = self.locked_queries()
+        media_store.discard(url)
+        self.assertEqual(len(self.stored_keys()), 1)
+        self.assertEqual(MediaBlob.query.one().refcount, 1)
+        self.assertEqual(len(locked), 1)
+
+        # An upload whose transaction rolled back leaves only its file behind
+        blob = media_store.save(BytesIO(b'rolled back photo'), 'photo.jpg')
+        rolled_back = media_store.url(blob)
+        db.session.rollback()
+        self.assertEqual(len(self.stored_keys()), 2)
+        media_store.discard(rolled_back)
+        self.assertEqual(len(self.stored_keys()), 1)
+        self.assertEqual(MediaBlob.query.count(), 1)
+
+    def test_garbage_collection_locks_blob_rows(self):
+        """Test that GC selects unreferenced blobs with FOR UPDATE."""
+        self.upload(self.dives[0], b'first photo')
+        self.upload(self.dives[0], b'second photo')
+        locked = self.locked_queries()
+        self.assertEqual(media_store.collect_garbage(grace_seconds=0)['blobs'], 1)
+        self.assertEqual(len(locked), 1)
+
+    def test_media_url_cannot_be_set_from_json(self):
+        """Test that a dive can't take a reference to another dive's blob through the JSON API."""
+        url = self.upload(self.dives[0], b'someone elses photo')
+        response = self.client.post('/api/dives/', data=json.dumps({
+            'start_time': '2025-06-02T09:00:00', 'end_time': '2025-06-02T10:00:00',
+            'max_depth': 12.0, 'location': 'Ningaloo Reef', 'media': url,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(db.session.get(Dive, response.get_json()['id']).media)
+
+        self.client.delete(f"/api/dives/{response.get_json()['id']}")
+        self.assertEqual(MediaBlob.query.one().refcount, 1)
+
+    def test_grace_period_protects_recent_blobs(self):
+        """Test that GC leaves recently released blobs and files alone."""
+        self.upload(self.dives[0], b'first photo')
+        self.upload(self.dives[0], b'second photo')
+        self.assertEqual(media_store.collect_garbage(grace_seconds=3600), {'blobs': 0, 'orphans': 0})
+        self.assertEqual(len(self.stored_keys()), 2)
+
+    def test_stream_upload(self):
+        """Test the raw-body streaming endpoint."""
+        response = self.client.put(
+            f'/api/dives/{self.dives[0].id}/media',
+            data=b'streamed image bytes',
+            content_type='image/png'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(json.loads(response.data)['media_url'].endswith('.png'))
+
+        response = self.client.put(
+            f'/api/dives/{self.dives[0].id}/media',
+            data=b'not an image',
+            content_type='text/plain'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def sample_jpeg(self):
+        from PIL import Image
+        buffer = BytesIO()
+        exif = Image.Exif()
+        exif[0x010f] = 'Test Camera'  # Make
+        exif[0x8825] = {1: 'N', 2: (8.0, 30.0, 0.0)}  # GPSInfo
+        Image.new('RGB', (1200, 800), (0, 120, 200)).save(buffer, 'JPEG', exif=exif.tobytes())
+        return buffer.getvalue()
+
+    @unittest.skipUnless(images.available(), 'Pillow is not installed')
+    def test_variants_are_generated_without_exif(self):
+        """Test renditions, EXIF stripping and the template filter."""
+        from PIL import Image
+        url = self.upload(self.dives[0], self.sample_jpeg())
+
+        variants = {(v.name, v.format): v for v in MediaVariant.query}
+        self.assertEqual(len(variants), 6)
+        self.assertEqual((variants[('card', 'jpeg')].width, variants[('card', 'jpeg')].height), (480, 320))
+        self.assertEqual(variants[('full', 'webp')].width, 1200)  # never upscaled
+
+        with media_store.backend.open(variants[('thumb', 'jpeg')].key) as stored:
+            self.assertEqual(len(Image.open(stored).getexif()), 0)
+
+        # The public original is re-encoded too
+        blob = media_store.blob_for_url(url)
+        with media_store.backend.open(blob.key) as stored:
+            original = Image.open(stored)
+            self.assertEqual(original.size, (1200, 800))
+            self.assertEqual(len(original.getexif()), 0)
+            stored.seek(0)
+            self.assertNotIn(b'Test Camera', stored.read())
+
+        response = self.client.get('/my-logs')
+        self.assertIn(variants[('card', 'webp')].key.encode(), response.data)
+
+        self.client.delete(f'/api/dives/{self.dives[0].id}')
+        media_store.collect_garbage(grace_seconds=0)
+        self.assertEqual(self.stored_keys(), [])
+        self.assertEqual(MediaVariant.query.count(), 0)
+
+    def test_unknown_urls_are_served_unchanged(self):
+        """Test that legacy and external URLs pass through the filter."""
+        with self.app.test_request_context():
+            self.assertEqual(media_store.variant_url('/static/uploads/dives/abc_photo.jpg'), '/static/uploads/dives/abc_photo.jpg')
+            self.assertIsNone(media_store.variant_url(None))
+
+if __name__ == '__main__':
+    unittest.main()
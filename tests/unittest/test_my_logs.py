@@ -0,0 +1,165 @@
+import unittest
+import json
+import re
+from unittest import mock
+from app import create_app, db, cache
+from app.models import Dive, User
+from config import Config
+from datetime import datetime, timedelta
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+    MY_LOGS_PAGE_SIZE = 3
+
+
+class MyLogsPaginationTestCase(unittest.TestCase):
+    """Test case for keyset-paginated My Logs pages."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = User(username='testuser', email='test@example.com', status='active')
+        self.user.set_password('Password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+        # Eight dives; the first two share a start time to exercise the id tie-break
+        base = datetime(2025, 1, 1, 9, 0)
+        starts = [base, base] + [base + timedelta(days=day) for day in range(1, 7)]
+        for index, start in enumerate(starts):
+            db.session.add(Dive(
+                user_id=self.user.id,
+                start_time=start,
+                end_time=start + timedelta(minutes=45),
+                max_depth=10.0 + index,
+                location='Blue Hole' if index % 2 else 'Shark Point'
+            ))
+        db.session.commit()
+
+        self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'test@example.com', 'password': 'Password123'}),
+            content_type='application/json'
+        )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def card_ids(self, html):
+        return [int(dive_id) for dive_id in re.findall(r'class="log-card" id="dive-(\d+)"', html)]
+
+    def collect_pages(self, query=''):
+        html = self.client.get(f'/my-logs{query}').get_data(as_text=True)
+        ids = self.card_ids(html)
+        cursor = re.search(r'data-next-cursor="([^"]*)"', html).group(1)
+        separator = '&' if query else '?'
+        while cursor:
+            response = self.client.get(f'/my-logs/page{query}{separator}cursor={cursor}')
+            self.assertEqual(response.status_code, 200)
+            page = response.get_json()
+            self.assertLessEqual(page['count'], TestConfig.MY_LOGS_PAGE_SIZE)
+            ids.extend(self.card_ids(page['html']))
+            cursor = page['next_cursor']
+        return ids
+
+    def expected_ids(self, **filters):
+        query = Dive.query.filter_by(user_id=self.user.id, **filters)
+        return [dive.id for dive in query.order_by(Dive.start_time.desc(), Dive.id.desc())]
+
+    def test_first_page_renders_only_page_size_cards(self):
+        """Test that My Logs renders one page plus a cursor for the next."""
+        html = self.client.get('/my-logs').get_data(as_text=True)
+        self.assertEqual(self.card_ids(html), self.expected_ids()[:3])
+        self.assertIn('id="logs-sentinel"', html)
+
+    def test_pages_cover_every_dive_once_in_order(self):
+        """Test that following cursors walks the whole logbook without gaps or repeats."""
+        self.assertEqual(self.collect_pages(), self.expected_ids())
+
+    def test_filters_are_preserved_across_pages(self):
+        """Test that the page URL carries the filters and later pages honour them."""
+        html = self.client.get('/my-logs?location=Blue+Hole').get_data(as_text=True)
+        self.assertIn('data-page-url="/my-logs/page?location=Blue+Hole"', html)
+        self.assertIn('<option value="Blue Hole" selected>', html)
+
+        self.assertEqual(self.collect_pages('?location=Blue+Hole'), self.expected_ids(location='Blue Hole'))
+
+    def test_last_page_has_no_cursor(self):
+        """Test that the sentinel is omitted once everything fits on one page."""
+        html = self.client.get('/my-logs?min_depth=16').get_data(as_text=True)
+        self.assertEqual(len(self.card_ids(html)), 2)
+        self.assertIn('data-next-cursor=""', html)
+        self.assertNotIn('id="logs-sentinel"', html)
+
+    def test_invalid_cursor_is_rejected(self):
+        """Test that a malformed cursor returns 400."""
+        response = self.client.get('/my-logs/page?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.get_json())
+
+
+    def test_header_stats_are_rendered(self):
+        """Test that the sidebar shows logbook totals computed in SQL."""
+        html = self.client.get('/my-logs?location=Blue+Hole').get_data(as_text=True)
+        stats = dict(re.findall(
+            r'<span class="stat-label">([^<]+)</span>\s*<span class="stat-value">([^<]+)</span>', html
+        ))
+        # Totals cover the whole logbook, not just the filtered page
+        self.assertEqual(stats['Total Dives'], '8')
+        self.assertEqual(stats['Max Depth'], '17.0 m')
+        self.assertEqual(stats['Longest Dive'], '45 min')
+        self.assertEqual(stats['Total Dive Time'], '6.0 hours')
+
+    def test_stats_and_locations_are_cached_until_a_write(self):
+        """Test that repeat visits reuse the summary and location list until a dive changes."""
+        self.client.get('/my-logs')
+        misses = cache.metrics()['misses']
+        self.client.get('/my-logs')
+        self.assertEqual(cache.metrics()['misses'], misses)
+
+        dive = Dive.query.first()
+        dive.location = 'Manta Reef'
+        db.session.commit()
+
+        html = self.client.get('/my-logs').get_data(as_text=True)
+        self.assertIn('<option value="Manta Reef" >Manta Reef</option>', html)
+        self.assertEqual(cache.metrics()['misses'], misses + 2)
+
+    def test_write_in_another_worker_is_not_rendered_stale(self):
+        """Test that a worker which missed the version bump still shows the new dive."""
+        self.client.get('/my-logs')
+
+        # Another worker commits; this process's version counter never moves
+        with mock.patch('app.caching.ResponseCache.bump_user_version'):
+            dive = Dive.query.first()
+            dive.location = 'Manta Reef'
+            db.session.add(Dive(
+                user_id=self.user.id,
+                start_time=datetime(2025, 2, 1, 9, 0),
+                end_time=datetime(2025, 2, 1, 10, 30),
+                max_depth=30.0,
+                location='Manta Reef'
+            ))
+            db.session.commit()
+
+        html = self.client.get('/my-logs').get_data(as_text=True)
+        self.assertIn('<option value="Manta Reef" >Manta Reef</option>', html)
+        self.assertIn('<span class="stat-value">9</span>', html)
+        self.assertIn('<span class="stat-value">30.0 m</span>', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
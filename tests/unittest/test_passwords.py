@@ -0,0 +1,160 @@
+import unittest
+import json
+import threading
+import importlib
+from unittest import mock
+from werkzeug.security import generate_password_hash
+from app import create_app, db, passwords
+from app.models import User
+from app.passwords import PasswordVerifyBusy, canonical_method
+from config import Config
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class PasswordPolicyTestCase(unittest.TestCase):
+    """Test case for the password hashing policy and rehash on login."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = User(username='testuser', email='test@example.com', status='active')
+        self.user.set_password('Password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self, password='Password123'):
+        return self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'test@example.com', 'password': password}),
+            content_type='application/json'
+        )
+
+    def test_testing_uses_cheap_policy(self):
+        """Test that TESTING without a configured method hashes with the cheap method."""
+        self.assertTrue(self.user.password_hash.startswith('pbkdf2:sha256:1000$'))
+        self.assertFalse(passwords.needs_rehash(self.user.password_hash))
+
+    def test_canonical_method_spells_out_defaults(self):
+        """Test that short method names compare equal to stored hash prefixes."""
+        for method in ('pbkdf2', 'pbkdf2:sha256', 'scrypt', 'scrypt:16384:8:1'):
+            stored = generate_password_hash('x', method=method).split('$', 1)[0]
+            self.assertEqual(canonical_method(method), stored)
+
+    def test_login_rehashes_outdated_hash(self):
+        """Test that a hash from an older policy is replaced after a successful login."""
+        self.user.password_hash = generate_password_hash('Password123', method='pbkdf2:sha256:500')
+        db.session.commit()
+
+        self.assertEqual(self.login().status_code, 200)
+        user = db.session.get(User, self.user.id)
+        self.assertTrue(user.password_hash.startswith('pbkdf2:sha256:1000$'))
+        self.assertTrue(user.check_password('Password123'))
+
+    def test_failed_login_keeps_hash(self):
+        """Test that a wrong password never triggers a rehash."""
+        old_hash = generate_password_hash('Password123', method='pbkdf2:sha256:500')
+        self.user.password_hash = old_hash
+        db.session.commit()
+
+        self.assertEqual(self.login('WrongPassword1').status_code, 401)
+        self.assertEqual(db.session.get(User, self.user.id).password_hash, old_hash)
+
+    def test_full_verify_pool_rejects_login(self):
+        """Test that logins get a 503 once every verify slot is taken."""
+        slots = self.app.extensions['passwords']['slots']
+        taken = 0
+        while slots.acquire(blocking=False):
+            taken += 1
+        try:
+            with self.assertRaises(PasswordVerifyBusy):
+                passwords.verify(self.user.password_hash, 'Password123')
+            response = self.login()
+            self.assertEqual(response.status_code, 503)
+            self.assertIn('Retry-After', response.headers)
+        finally:
+            for _ in range(taken):
+                slots.release()
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_slow_verify_rejects_login(self):
+        """Test that a check outliving PASSWORD_VERIFY_TIMEOUT gives a 503, not a 500."""
+        module = importlib.import_module('app.passwords')
+        original = module.check_password_hash
+        release = threading.Event()
+
+        def stalled_check(password_hash, password):
+            release.wait(5)
+            return original(password_hash, password)
+
+        self.app.config['PASSWORD_VERIFY_TIMEOUT'] = 0.05
+        with mock.patch.object(module, 'check_password_hash', side_effect=stalled_check):
+            response = self.login()
+            release.set()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+    def test_rehash_runs_on_pool_threads(self):
+        """Test that the upgraded hash is computed off the request thread."""
+        self.user.password_hash = generate_password_hash('Password123', method='pbkdf2:sha256:500')
+        db.session.commit()
+
+        module = importlib.import_module('app.passwords')
+        original = module.generate_password_hash
+        threads = []
+
+        def recording_hash(password, method):
+            threads.append(threading.current_thread().name)
+            return original(password, method)
+
+        with mock.patch.object(module, 'generate_password_hash', side_effect=recording_hash):
+            self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith('password-verify'))
+
+    def test_verify_runs_on_pool_threads(self):
+        """Test that checks run off the request thread and free their slot afterwards."""
+        # `app.passwords` is the extension instance; patch the module itself
+        module = importlib.import_module('app.passwords')
+        original = module.check_password_hash
+        threads = []
+
+        def recording_check(password_hash, password):
+            threads.append(threading.current_thread().name)
+            return original(password_hash, password)
+
+        with mock.patch.object(module, 'check_password_hash', side_effect=recording_check):
+            self.assertTrue(self.user.check_password('Password123'))
+            self.assertFalse(self.user.check_password('Nope'))
+        self.assertTrue(all(name.startswith('password-verify') for name in threads))
+        self.assertEqual(len(threads), 2)
+
+        # Every slot is free again once the checks have finished
+        slots = self.app.extensions['passwords']['slots']
+        taken = 0
+        while slots.acquire(blocking=False):
+            taken += 1
+        for _ in range(taken):
+            slots.release()
+        self.assertEqual(taken, TestConfig.PASSWORD_VERIFY_WORKERS + TestConfig.PASSWORD_VERIFY_MAX_PENDING)
+
+
+if __name__ == '__main__':
+    unittest.main()
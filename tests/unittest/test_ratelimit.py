@@ -0,0 +1,141 @@
+import unittest
+import json
+from io import BytesIO
+from unittest import mock
+from flask import Request
+from app import create_app, db, limiter
+from app.models import User
+from app.ratelimit import MemoryBackend, parse_rate
+from config import Config
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+    RATELIMIT_POLICIES = {
+        'login': '3/minute',
+        'search': '2/minute',
+    }
+
+
+class RateLimitTestCase(unittest.TestCase):
+    """Test case for token-bucket rate limiting."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        for username in ('testuser', 'otheruser'):
+            user = User(username=username, email=f'{username}@example.com', status='active')
+            user.set_password('Password123')
+            db.session.add(user)
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self, client, email='testuser@example.com', password='Password123', ip='10.0.0.1'):
+        return client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': email, 'password': password}),
+            content_type='application/json',
+            environ_base={'REMOTE_ADDR': ip}
+        )
+
+    def test_parse_rate(self):
+        """Test that rates become a bucket capacity and a refill rate."""
+        self.assertEqual(parse_rate('10/minute'), (10, 10 / 60))
+        self.assertEqual(parse_rate('5/hours'), (5, 5 / 3600))
+        for rate in ('ten/minute', '10/fortnight', '0/second'):
+            with self.assertRaises(ValueError):
+                parse_rate(rate)
+
+    def test_bucket_refills_over_time(self):
+        """Test that an empty bucket admits requests again once tokens refill."""
+        backend = MemoryBackend()
+        with mock.patch('time.monotonic', return_value=100.0):
+            self.assertTrue(backend.take('k', 2, 1.0)[0])
+            self.assertTrue(backend.take('k', 2, 1.0)[0])
+            allowed, _, retry_after = backend.take('k', 2, 1.0)
+            self.assertFalse(allowed)
+            self.assertAlmostEqual(retry_after, 1.0)
+        with mock.patch('time.monotonic', return_value=101.0):
+            self.assertTrue(backend.take('k', 2, 1.0)[0])
+
+    def test_login_is_limited_per_ip(self):
+        """Test that failed logins past the burst get 429 with Retry-After."""
+        for _ in range(3):
+            self.assertEqual(self.login(self.client, password='WrongPassword1').status_code, 401)
+        response = self.login(self.client)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+
+        # Another address has its own bucket
+        self.assertEqual(self.login(self.app.test_client(), ip='10.0.0.2').status_code, 200)
+
+    def test_search_is_limited_per_user(self):
+        """Test that each user gets their own search bucket."""
+        self.login(self.client)
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/users/search?q=user').status_code, 200)
+        self.assertEqual(self.client.get('/api/users/search?q=user').status_code, 429)
+
+        # Same IP, different user
+        other = self.app.test_client()
+        self.app_context.pop()
+        try:
+            self.login(other, email='otheruser@example.com', ip='10.0.0.3')
+            self.assertEqual(other.get('/api/users/search?q=user').status_code, 200)
+        finally:
+            self.app_context.push()
+
+    def test_rejected_upload_body_is_never_parsed(self):
+        """Test that limits apply before CSRFProtect reads a multipart body."""
+        self.app.config['WTF_CSRF_ENABLED'] = True
+        self.app.extensions['ratelimit']['policies']['upload'] = parse_rate('1/minute')
+
+        def upload():
+            return self.client.post('/api/dives/1/upload', data={'media': (BytesIO(b'x' * 4096), 'photo.jpg')},
+                                    content_type='multipart/form-data')
+
+        # The first request spends the token and is then refused by the CSRF check
+        self.assertEqual(upload().status_code, 400)
+        with mock.patch.object(Request, '_load_form_data', autospec=True) as load_form:
+            response = upload()
+        self.assertEqual(response.status_code, 429)
+        load_form.assert_not_called()
+
+    def test_disabled_limiter_lets_everything_through(self):
+        """Test that RATELIMIT_ENABLED = False turns every policy off."""
+        self.app.config['RATELIMIT_ENABLED'] = False
+        for _ in range(5):
+            self.assertEqual(self.login(self.client, password='WrongPassword1').status_code, 401)
+
+    def test_unconfigured_policy_is_unlimited(self):
+        """Test that routes whose policy is not configured are not throttled."""
+        self.assertNotIn('register', limiter._state['policies'])
+        for index in range(3):
+            response = self.client.post(
+                '/api/auth/register',
+                data=json.dumps({
+                    'username': f'new{index}',
+                    'email': f'new{index}@example.com',
+                    'password': 'Password123'
+                }),
+                content_type='application/json'
+            )
+            self.assertEqual(response.status_code, 201)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import json
+import unittest
+import tempfile
+from unittest import mock
+from sqlalchemy import text
+from app import create_app, db
+from app.models import Site
+from config import Config
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    """Test case for read-replica routing with a primary and a replica SQLite file."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        config = type('ReplicaConfig', (TestConfig,), {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(self.tmpdir.name, 'primary.db'),
+            'SQLALCHEMY_BINDS': {'replica1': 'sqlite:///' + os.path.join(self.tmpdir.name, 'replica.db')}
+        })
+        self.app = create_app(config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+        db.metadata.create_all(db.engines['replica1'])
+
+        # The replica holds a copy that has not caught up with the primary yet
+        db.session.add(Site(name='Primary Reef'))
+        db.session.commit()
+        with db.engines['replica1'].begin() as conn:
+            conn.execute(text("INSERT INTO sites (id, name) VALUES (1, 'Replica Reef')"))
+        db.session.remove()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        for engine in db.engines.values():
+            engine.dispose()
+        self.app_context.pop()
+        # init_app registered metadata for the bind on the shared db object;
+        # later apps without the bind would try to create tables for it
+        db.metadatas.pop('replica1', None)
+        self.tmpdir.cleanup()
+
+    def site_names(self):
+        response = self.client.get('/api/sites/')
+        self.assertEqual(response.status_code, 200)
+        return [site['name'] for site in response.get_json()]
+
+    def test_replicas_default_to_binds_named_replica(self):
+        """Test that DB_REPLICAS is filled from SQLALCHEMY_BINDS."""
+        self.assertEqual(self.app.config['DB_REPLICAS'], ['replica1'])
+
+    def test_read_only_requests_use_the_replica(self):
+        """Test that GETs on listed routes read from the replica."""
+        self.assertEqual(self.site_names(), ['Replica Reef'])
+
+    def test_writes_go_to_the_primary_and_pin_the_client(self):
+        """Test that a write lands on the primary and the writer then reads the primary."""
+        response = self.client.post('/api/sites/', data=json.dumps({'name': 'New Reef'}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        with db.engines['replica1'].connect() as conn:
+            self.assertEqual(conn.execute(text('SELECT COUNT(*) FROM sites')).scalar(), 1)
+
+        self.assertEqual(self.site_names(), ['Primary Reef', 'New Reef'])
+
+        # A different client has not written and still reads the replica
+        self.client = self.app.test_client()
+        self.assertEqual(self.site_names(), ['Replica Reef'])
+
+    def test_lagging_or_unreachable_replica_falls_back_to_primary(self):
+        """Test that replicas beyond DB_REPLICA_MAX_LAG or failing the probe are skipped."""
+        self.app.config['DB_REPLICA_LAG_CHECK_INTERVAL'] = 0
+        with mock.patch('app.database.replica_lag', return_value=60.0):
+            self.assertEqual(self.site_names(), ['Primary Reef'])
+        with mock.patch('app.database.replica_lag', side_effect=OSError('connection refused')):
+            self.assertEqual(self.site_names(), ['Primary Reef'])
+        self.assertEqual(self.site_names(), ['Replica Reef'])
+
+    def test_reads_after_a_flush_use_the_primary(self):
+        """Test that a session reads its own writes once it has flushed."""
+        db.session.info['replica'] = 'replica1'
+        self.assertEqual([site.name for site in Site.query.order_by(Site.id)], ['Replica Reef'])
+
+        db.session.add(Site(name='Flushed Reef'))
+        db.session.flush()
+        self.assertEqual([site.name for site in Site.query.order_by(Site.id)], ['Primary Reef', 'Flushed Reef'])
+        db.session.rollback()
+
+    def test_other_requests_use_the_primary(self):
+        """Test that routes outside DB_REPLICA_ROUTES are not routed."""
+        self.app.config['DB_REPLICA_ROUTES'] = ['/api/dives/*']
+        self.assertEqual(self.site_names(), ['Primary Reef'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from app import create_app, db
+from app.models import Site
+from config import Config
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class SiteCatalogueTestCase(unittest.TestCase):
+    """Test case for the packed site catalogue behind the home map."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        for name, lat, lng in (
+            ('Cod Hole', -16.6818, 145.9919),
+            ('Blue Hole', 17.3162, -87.5351),
+            ('Silfra', 64.2558, -21.1168),
+            ('Namena', -17.1, 179.1),
+            ('Rainbow Reef', -16.8, -179.9)
+        ):
+            db.session.add(Site(name=name, lat=lat, lng=lng, difficulty='Intermediate',
+                                description='A long description that markers do not need'))
+        db.session.add(Site(name='Unmapped'))
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def names(self, response):
+        data = response.get_json()
+        name_index = data['fields'].index('name')
+        return sorted(row[name_index] for row in data['sites'])
+
+    def test_catalogue_is_packed_and_skips_unmapped_sites(self):
+        """Test that rows are arrays of marker fields only."""
+        response = self.client.get('/api/sites/catalogue')
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data['fields'], ['id', 'name', 'lat', 'lng', 'difficulty'])
+        self.assertEqual(len(data['sites']), 5)
+        self.assertFalse(data['truncated'])
+        self.assertNotIn('description', response.get_data(as_text=True))
+
+    def test_bbox_filters_sites(self):
+        """Test bounding-box filtering, including boxes across the antimeridian."""
+        response = self.client.get('/api/sites/catalogue?bbox=-100,0,0,70')
+        self.assertEqual(self.names(response), ['Blue Hole', 'Silfra'])
+
+        response = self.client.get('/api/sites/catalogue?bbox=170,-20,-170,-10')
+        self.assertEqual(self.names(response), ['Namena', 'Rainbow Reef'])
+
+    def test_invalid_bbox_is_rejected(self):
+        """Test that malformed or out-of-range boxes return 400."""
+        self.assertEqual(self.client.get('/api/sites/catalogue?bbox=1,2,3').status_code, 400)
+        self.assertEqual(self.client.get('/api/sites/catalogue?bbox=0,-95,10,0').status_code, 400)
+
+    def test_catalogue_revalidates_until_sites_change(self):
+        """Test that the ETag answers 304 until a site is added."""
+        response = self.client.get('/api/sites/catalogue?bbox=-180,-90,180,90')
+        etag = response.headers['ETag']
+        self.assertIn('public', response.headers['Cache-Control'])
+
+        response = self.client.get('/api/sites/catalogue?bbox=-180,-90,180,90', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        db.session.add(Site(name='Tubbataha', lat=8.9, lng=119.9))
+        db.session.commit()
+        response = self.client.get('/api/sites/catalogue?bbox=-180,-90,180,90', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Tubbataha', self.names(response))
+
+    def test_catalogue_is_capped(self):
+        """Test that large catalogues are truncated at SITE_CATALOGUE_MAX_SITES."""
+        self.app.config['SITE_CATALOGUE_MAX_SITES'] = 2
+        data = self.client.get('/api/sites/catalogue').get_json()
+        self.assertEqual(len(data['sites']), 2)
+        self.assertTrue(data['truncated'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from app import create_app, db
+from app.models import Dive, DiveSpecies, User, SpeciesOccurrence
+from config import Config
+from datetime import datetime
+import json
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class SpeciesBatchTestCase(unittest.TestCase):
+    """Test case for the bulk species endpoint."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.test_user = User(username='testuser', email='test@example.com', status='active')
+        self.test_user.set_password('Password123')
+        db.session.add(self.test_user)
+        db.session.commit()
+
+        self.dive = Dive(user_id=self.test_user.id, start_time=datetime(2025, 6, 1, 9, 0),
+                         end_time=datetime(2025, 6, 1, 10, 0), max_depth=15.0, location='Ningaloo Reef')
+        db.session.add(self.dive)
+        db.session.commit()
+        self.url = f'/api/species/dive/{self.dive.id}/species/batch'
+
+        self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'test@example.com', 'password': 'Password123'}),
+            content_type='application/json'
+        )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def post_batch(self, payload):
+        return self.client.post(self.url, data=json.dumps(payload), content_type='application/json')
+
+    def test_insert_deduplicates(self):
+        """Test that repeated taxa in one request produce one row."""
+        response = self.post_batch({'species': [
+            {'taxon_id': 39681, 'scientific_name': 'Chelonia mydas'},
+            {'taxon_id': 47273, 'scientific_name': 'Rhincodon typus'},
+            {'taxon_id': 39681, 'scientific_name': 'Chelonia mydas', 'common_name': 'Green Sea Turtle'},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([s['taxon_id'] for s in data], [39681, 47273])
+        self.assertEqual(data[0]['common_name'], 'Green Sea Turtle')
+        self.assertEqual(SpeciesOccurrence.query.filter_by(month=0).count(), 2)
+
+    def test_update_remove_and_replace(self):
+        """Test in-place updates, explicit removal and replace mode."""
+        self.post_batch({'species': [
+            {'taxon_id': 1, 'scientific_name': 'A'},
+            {'taxon_id': 2, 'scientific_name': 'B'},
+            {'taxon_id': 3, 'scientific_name': 'C'},
+        ]})
+
+        data = json.loads(self.post_batch({
+            'species': [{'taxon_id': 1, 'notes': 'Resting on the sand'}],
+            'remove': [2]
+        }).data)
+        self.assertEqual([s['taxon_id'] for s in data], [1, 3])
+        self.assertEqual(data[0]['notes'], 'Resting on the sand')
+
+        data = json.loads(self.post_batch({'species': [{'taxon_id': 3}], 'replace': True}).data)
+        self.assertEqual([s['taxon_id'] for s in data], [3])
+        self.assertEqual(DiveSpecies.query.count(), 1)
+        self.assertEqual(SpeciesOccurrence.query.filter_by(month=0).count(), 1)
+
+    def test_invalid_batch_is_rolled_back(self):
+        """Test that a bad entry leaves the dive untouched."""
+        response = self.post_batch({'species': [
+            {'taxon_id': 1, 'scientific_name': 'A'},
+            {'taxon_id': 2},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(DiveSpecies.query.count(), 0)
+
+        self.assertEqual(self.post_batch({'species': [{'taxon_id': 'x'}]}).status_code, 400)
+
+    def test_single_add_rejects_duplicate(self):
+        """Test that the single-species endpoint honours the unique constraint."""
+        url = f'/api/species/dive/{self.dive.id}/species'
+        payload = json.dumps({'taxon_id': 1, 'scientific_name': 'A'})
+        self.assertEqual(self.client.post(url, data=payload, content_type='application/json').status_code, 201)
+        self.assertEqual(self.client.post(url, data=payload, content_type='application/json').status_code, 409)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import unittest
+from app import create_app, db
+from app.models import Dive, DiveSpecies, User, Site, SpeciesOccurrence
+from app.services import occurrence
+from config import Config
+from datetime import datetime
+import json
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+TURTLE = {'taxon_id': 39681, 'scientific_name': 'Chelonia mydas', 'common_name': 'Green Sea Turtle'}
+WHALE_SHARK = {'taxon_id': 47273, 'scientific_name': 'Rhincodon typus', 'common_name': 'Whale Shark'}
+
+
+class SpeciesOccurrenceTestCase(unittest.TestCase):
+    """Test case for the cross-user species occurrence cube."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.test_user = User(username='testuser', email='test@example.com', status='active')
+        self.test_user.set_password('Password123')
+        db.session.add(self.test_user)
+        db.session.commit()
+
+        self.june_dive = self.make_dive(datetime(2025, 6, 1, 9, 0), 'Ningaloo Reef (-22.6950, 113.6760)')
+        self.july_dive = self.make_dive(datetime(2025, 7, 1, 9, 0), 'ningaloo  reef')
+
+        self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'test@example.com', 'password': 'Password123'}),
+            content_type='application/json'
+        )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def make_dive(self, start_time, location):
+        dive = Dive(user_id=self.test_user.id, start_time=start_time,
+                    end_time=start_time.replace(hour=10), max_depth=15.0, location=location)
+        db.session.add(dive)
+        db.session.commit()
+        return dive
+
+    def add_species(self, dive, species):
+        response = self.client.post(
+            f'/api/species/dive/{dive.id}/species',
+            data=json.dumps(species),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return json.loads(response.data)['id']
+
+    def get_occurrence(self, query):
+        response = self.client.get(f'/api/species/occurrence?{query}')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)['species']
+
+    def test_counts_follow_added_and_removed_species(self):
+        """Test incremental updates per month and for the whole year."""
+        self.add_species(self.june_dive, TURTLE)
+        self.add_species(self.july_dive, TURTLE)
+        shark_id = self.add_species(self.june_dive, WHALE_SHARK)
+
+        year = self.get_occurrence('location=Ningaloo Reef')
+        self.assertEqual([(s['taxon_id'], s['count']) for s in year], [(39681, 2), (47273, 1)])
+        june = self.get_occurrence('location=Ningaloo Reef&month=6')
+        self.assertEqual(len(june), 2)
+
+        self.client.delete(f'/api/species/dive/{self.june_dive.id}/species/{shark_id}')
+        june = self.get_occurrence('location=Ningaloo Reef&month=6')
+        self.assertEqual([s['taxon_id'] for s in june], [39681])
+
+    def test_dive_move_and_delete(self):
+        """Test that editing or deleting a dive re-files its sightings."""
+        self.add_species(self.june_dive, WHALE_SHARK)
+        self.client.put(
+            f'/api/dives/{self.june_dive.id}',
+            data=json.dumps({'location': 'Exmouth Gulf', 'start_time': '2025-08-01T09:00:00'}),
+            content_type='application/json'
+        )
+        self.assertEqual(self.get_occurrence('location=Ningaloo Reef'), [])
+        self.assertEqual(len(self.get_occurrence('location=Exmouth Gulf&month=8')), 1)
+
+        self.client.delete(f'/api/dives/{self.june_dive.id}')
+        self.assertEqual(SpeciesOccurrence.query.count(), 0)
+
+    def test_site_lookup_and_rebuild(self):
+        """Test site_id lookup and that a rebuild matches incremental counts."""
+        site = Site(name='Ningaloo Reef')
+        db.session.add(site)
+        db.session.commit()
+        self.add_species(self.june_dive, TURTLE)
+        self.add_species(self.july_dive, WHALE_SHARK)
+        before = self.get_occurrence(f'site_id={site.id}')
+
+        self.assertEqual(occurrence.rebuild(), 4)
+        self.assertEqual(self.get_occurrence(f'site_id={site.id}'), before)
+
+    def test_counts_are_adjusted_in_the_database(self):
+        """Test that a counter changed by another request since it was loaded keeps that change."""
+        self.add_species(self.june_dive, TURTLE)
+        cell = occurrence.location_cell(self.june_dive.location)
+        counter = SpeciesOccurrence.query.filter_by(cell=cell, month=0).one()
+
+        # Another worker logs the same taxon after this session read the row
+        table = SpeciesOccurrence.__table__
+        db.session.connection().execute(table.update().values(count=table.c.count + 1))
+        species = DiveSpecies(dive_id=self.july_dive.id, **TURTLE)
+        occurrence.add_sighting(self.july_dive, species)
+        db.session.commit()
+        self.assertEqual(db.session.get(SpeciesOccurrence, counter.id).count, 3)
+
+        occurrence.remove_sighting(self.june_dive, species)
+        occurrence.remove_sighting(self.june_dive, species)
+        occurrence.remove_sighting(self.june_dive, species)
+        db.session.commit()
+        self.assertEqual(SpeciesOccurrence.query.filter_by(cell=cell, month=0).count(), 0)
+
+    def test_invalid_requests(self):
+        """Test parameter validation."""
+        self.assertEqual(self.client.get('/api/species/occurrence').status_code, 400)
+        self.assertEqual(self.client.get('/api/species/occurrence?location=x&month=13').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
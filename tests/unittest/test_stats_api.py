@@ -0,0 +1,189 @@
+import unittest
+from unittest.mock import patch
+from app import create_app, db
+from app.models import Dive, DiveSpecies, User
+from config import Config
+from datetime import datetime
+import json
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class StatsApiTestCase(unittest.TestCase):
+    """Test case for the diving statistics JSON datasets."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.test_user = User(username='testuser', email='test@example.com', status='active')
+        self.test_user.set_password('Password123')
+        self.other_user = User(username='otheruser', email='other@example.com', status='active')
+        self.other_user.set_password('Password123')
+        db.session.add_all([self.test_user, self.other_user])
+        db.session.commit()
+
+        dives = [
+            Dive(user_id=self.test_user.id, start_time=datetime(2025, 1, 5, 9, 0),
+                 end_time=datetime(2025, 1, 5, 9, 40), max_depth=18.0,
+                 location='Ningaloo Reef (-22.6950, 113.6760)'),
+            Dive(user_id=self.test_user.id, start_time=datetime(2025, 3, 2, 9, 0),
+                 end_time=datetime(2025, 3, 2, 10, 0), max_depth=25.5,
+                 location='Ningaloo Reef (-22.6950, 113.6760)'),
+            Dive(user_id=self.test_user.id, start_time=datetime(2024, 3, 9, 9, 0),
+                 end_time=datetime(2024, 3, 9, 9, 30), max_depth=12.0,
+                 location='Rottnest Island'),
+        ]
+        db.session.add_all(dives)
+        db.session.commit()
+
+        db.session.add_all([
+            DiveSpecies(dive_id=dives[0].id, taxon_id=39681, scientific_name='Chelonia mydas', common_name='Green Sea Turtle'),
+            DiveSpecies(dive_id=dives[1].id, taxon_id=39681, scientific_name='Chelonia mydas', common_name='Green Sea Turtle'),
+            DiveSpecies(dive_id=dives[1].id, taxon_id=47273, scientific_name='Rhincodon typus'),
+        ])
+        db.session.commit()
+
+        self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'test@example.com', 'password': 'Password123'}),
+            content_type='application/json'
+        )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def get_dataset(self, name):
+        response = self.client.get(f'/api/users/{self.test_user.id}/{name}')
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.data)
+
+    def test_page_renders_without_data(self):
+        """Test that the stats page is an empty shell."""
+        response = self.client.get('/diving-stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'data-user-id="{self.test_user.id}"'.encode(), response.data)
+
+    def test_summary(self):
+        """Test the header card aggregates."""
+        data = self.get_dataset('summary')
+        self.assertEqual(data['total_dives'], 3)
+        self.assertEqual(data['max_depth'], 25.5)
+        self.assertEqual(data['longest_dive'], 60)
+        self.assertEqual(data['total_dive_time'], 2.2)
+
+    def test_durations_without_a_sql_expression(self):
+        """Test that dialects without a duration expression fall back to Python arithmetic."""
+        from app.services import stats as stats_service
+        expected = (stats_service.summary(self.test_user.id), stats_service.timeline(self.test_user.id))
+
+        with patch.object(db.engine.dialect, 'name', 'other'):
+            self.assertIsNone(stats_service.duration_minutes(Dive.start_time, Dive.end_time))
+            self.assertEqual(stats_service.summary(self.test_user.id), expected[0])
+            self.assertEqual(stats_service.timeline(self.test_user.id), expected[1])
+
+    def test_timeline_and_monthly(self):
+        """Test the time series and month histogram."""
+        timeline = self.get_dataset('timeline')
+        self.assertEqual(timeline['dates'][0], '09 Mar 2024')
+        self.assertEqual(timeline['durations'], [30, 40, 60])
+
+        monthly = self.get_dataset('monthly')
+        self.assertEqual(monthly['dives_per_month'][0], 1)
+        self.assertEqual(monthly['dives_per_month'][2], 2)
+
+    def test_locations(self):
+        """Test that locations are grouped and geotagged ones are mapped."""
+        data = self.get_dataset('locations')
+        self.assertEqual(data['locations'], ['Ningaloo Reef', 'Rottnest Island'])
+        self.assertEqual(data['dives_per_location'], [2, 1])
+        self.assertEqual(data['location_names'], ['Ningaloo Reef'])
+        self.assertEqual(data['coordinates'], [[-22.695, 113.676]])
+
+    def test_species(self):
+        """Test species grouping and the top species list."""
+        data = self.get_dataset('species-chart')
+        self.assertEqual(data['species_names'], ['Green Sea Turtle', 'Rhincodon typus'])
+        self.assertEqual(data['species_counts'], [2, 1])
+
+        with patch('app.services.stats.taxon_photo_url', return_value=None):
+            top = self.get_dataset('top-species')['top_species']
+        self.assertEqual(top[0]['taxon_id'], 39681)
+        self.assertEqual(top[0]['count'], 2)
+
+    def test_life_list(self):
+        """Test the paginated life list and its sort orders."""
+        data = self.get_dataset('species/life-list?per_page=1')
+        self.assertEqual(data['total'], 2)
+        self.assertEqual(data['pages'], 2)
+        self.assertEqual(data['items'][0]['taxon_id'], 39681)
+        self.assertEqual(data['items'][0]['sightings'], 2)
+        self.assertEqual(data['items'][0]['first_seen'], '2025-01-05T09:00:00')
+
+        data = self.get_dataset('species/life-list?sort=name&page=2&per_page=1')
+        self.assertEqual(data['items'][0]['scientific_name'], 'Rhincodon typus')
+
+        response = self.client.get(f'/api/users/{self.test_user.id}/species/life-list?sort=bogus')
+        self.assertEqual(response.status_code, 400)
+
+    def test_species_by_site_and_month(self):
+        """Test the per-site and per-month sighting breakdowns."""
+        data = self.get_dataset('species/by-site?taxon_id=39681')
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['items'][0]['sightings'], 2)
+
+        data = self.get_dataset('species/by-month')
+        self.assertEqual(data['sightings'][0], 1)
+        self.assertEqual(data['sightings'][2], 2)
+
+    def test_species_etags_follow_dive_and_sighting_edits(self):
+        """Test that editing a dive or a sighting in place changes the species ETag."""
+        url = f'/api/users/{self.test_user.id}/species/by-site'
+        etag = self.client.get(url).headers['ETag']
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        dive = Dive.query.filter_by(location='Rottnest Island').one()
+        dive.location = 'Rottnest Island (-32.0, 115.5)'
+        db.session.commit()
+        moved = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertEqual(moved.status_code, 200)
+
+        sighting = DiveSpecies.query.filter_by(taxon_id=47273).one()
+        sighting.common_name = 'Whale Shark'
+        db.session.commit()
+        renamed = self.client.get(url, headers={'If-None-Match': moved.headers['ETag']})
+        self.assertEqual(renamed.status_code, 200)
+
+    def test_other_users_stats_are_forbidden(self):
+        """Test that datasets are only served to their owner."""
+        for name in ('summary', 'stats', 'depth-time-chart', 'frequency-chart'):
+            response = self.client.get(f'/api/users/{self.other_user.id}/{name}')
+            self.assertEqual(response.status_code, 403)
+            self.assertNotIn('details', response.get_json())
+
+        anonymous = self.app.test_client()
+        self.app_context.pop()
+        try:
+            for name in ('stats', 'depth-time-chart', 'frequency-chart'):
+                response = anonymous.get(f'/api/users/{self.test_user.id}/{name}')
+                self.assertNotEqual(response.status_code, 200)
+                self.assertNotIn(b'total_dives', response.data)
+        finally:
+            self.app_context.push()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import json
+from sqlalchemy import event
+from app import create_app, db, user_cache
+from app.models import User
+from config import Config
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class UserCacheTestCase(unittest.TestCase):
+    """Test case for the cached Flask-Login user loader."""
+
+    def setUp(self):
+        """Set up test environment before each test."""
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        self.user = User(username='testuser', email='test@example.com', status='active', bio='Diver')
+        self.user.set_password('Password123')
+        db.session.add(self.user)
+        db.session.commit()
+        self.user_id = self.user.id
+        self.engine = db.engine
+
+        self.client.post(
+            '/api/auth/login',
+            data=json.dumps({'email': 'test@example.com', 'password': 'Password123'}),
+            content_type='application/json'
+        )
+
+    def tearDown(self):
+        """Clean up after each test."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def user_selects(self, action):
+        """Run `action` and return the SELECT statements it sent for users."""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith('SELECT') and 'FROM users' in statement:
+                statements.append(statement)
+
+        event.listen(self.engine, 'before_cursor_execute', record)
+        try:
+            result = action()
+        finally:
+            event.remove(self.engine, 'before_cursor_execute', record)
+        return result, statements
+
+    def request(self, method, url, data=None):
+        """Send a request in its own app context, as a real server would."""
+        self.app_context.pop()
+        try:
+            if data is None:
+                return getattr(self.client, method)(url)
+            return getattr(self.client, method)(url, data=json.dumps(data), content_type='application/json')
+        finally:
+            self.app_context.push()
+
+    def reload(self):
+        """Load the user the way Flask-Login does at the start of a request."""
+        db.session.remove()
+        return user_cache.load(self.user_id)
+
+    def test_repeat_loads_skip_the_database(self):
+        """Test that a cached user is rebuilt without a query and attached to the session."""
+        self.reload()
+        user, statements = self.user_selects(self.reload)
+        self.assertEqual(statements, [])
+        self.assertEqual(user.username, 'testuser')
+        self.assertIn(user, db.session)
+        self.assertGreaterEqual(user_cache.metrics()['hits'], 1)
+
+    def test_password_hash_is_not_cached(self):
+        """Test that the hash is left out of the entry and loaded on demand."""
+        self.reload()
+        payload = user_cache.backend.get(user_cache.key(self.user_id))
+        self.assertNotIn('password_hash', json.loads(payload))
+
+        user = self.reload()
+        self.assertTrue(user.check_password('Password123'))
+
+    def test_authenticated_pages_skip_user_select(self):
+        """Test that page views after the first identify the user from the cache."""
+        self.request('get', '/')
+        response, statements = self.user_selects(lambda: self.request('get', '/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(statements, [])
+
+    def test_profile_update_invalidates(self):
+        """Test that PUT /api/users/me is visible to the next load."""
+        self.reload()
+        response = self.request('put', '/api/users/me', {'bio': 'Cave diver'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.reload().bio, 'Cave diver')
+
+    def test_deactivation_invalidates(self):
+        """Test that a deactivated account is not served from a stale entry."""
+        self.reload()
+        response = self.request('post', '/api/users/me/deactivate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.reload().status, 'deactivated')
+
+    def test_password_reset_invalidates(self):
+        """Test that a password reset bumps the user's version."""
+        self.reload()
+        version = user_cache.version(self.user_id)
+        token = self.request('post', '/api/auth/forgot-password', {'email': 'test@example.com'}).get_json()['debug_token']
+        response = self.request('post', '/api/auth/reset-password', {'token': token, 'new_password': 'NewPassword456'})
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(user_cache.version(self.user_id), version)
+        self.assertTrue(self.reload().check_password('NewPassword456'))
+
+    def test_rollback_keeps_version(self):
+        """Test that only committed changes invalidate the entry."""
+        user = self.reload()
+        version = user_cache.version(self.user_id)
+        user.bio = 'Rolled back'
+        db.session.flush()
+        db.session.rollback()
+        self.assertEqual(user_cache.version(self.user_id), version)
+        self.assertEqual(self.reload().bio, 'Diver')
+
+    def test_missing_user_is_not_cached(self):
+        """Test that unknown ids load as None."""
+        self.assertIsNone(user_cache.load(9999))
+        self.assertIsNone(user_cache.backend.get(user_cache.key(9999)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import json
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+from flask_wtf.csrf import generate_csrf
+from app import create_app, db
+from app.models import SharkWarning, User
+from app.validation import Field, Schema, ValidationError, integer, iso_datetime, number, string
+from config import Config
+
+
+class TestConfig(Config):
+    """Test configuration."""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    WTF_CSRF_ENABLED = False
+    SECRET_KEY = 'test-secret-key'
+
+
+class SchemaTestCase(unittest.TestCase):
+    """Test case for loading JSON bodies with a Schema."""
+
+    def setUp(self):
+        self.schema = Schema({
+            'start_time': Field(iso_datetime, required=True),
+            'max_depth': Field(number(minimum=0), required=True),
+            'location': Field(string(10)),
+            'dive_number': Field(integer(minimum=1)),
+            'status': Field(string(choices=('active', 'resolved')), default='active'),
+        })
+
+    def test_values_are_coerced(self):
+        """Test that parsers convert JSON values to the column types."""
+        data = self.schema.load({
+            'start_time': '2025-05-10T09:00:00',
+            'max_depth': '18.5',
+            'dive_number': 3.0,
+            'location': 'Reef',
+            'ignored': True,
+        })
+        self.assertEqual(data['start_time'], datetime(2025, 5, 10, 9, 0))
+        self.assertEqual(data['max_depth'], 18.5)
+        self.assertEqual(data['dive_number'], 3)
+        self.assertEqual(data['status'], 'active')
+        self.assertNotIn('ignored', data)
+
+    def test_every_error_is_reported(self):
+        """Test that all invalid and missing fields are reported together."""
+        with self.assertRaises(ValidationError) as caught:
+            self.schema.load({
+                'max_depth': -1,
+                'location': 'A very long location',
+                'dive_number': 1.5,
+                'status': 'open',
+            })
+        self.assertEqual(set(caught.exception.fields),
+                         {'start_time', 'max_depth', 'location', 'dive_number', 'status'})
+        self.assertEqual(caught.exception.fields['start_time'], 'is required')
+
+    def test_partial_and_strict_loads(self):
+        """Test that partial loads skip required fields and strict schemas reject unknown ones."""
+        self.assertEqual(self.schema.load({'dive_number': ''}, partial=True), {'dive_number': None})
+        with self.assertRaises(ValidationError):
+            self.schema.load({'max_depth': ''}, partial=True)
+
+        strict = Schema(self.schema.fields, strict=True)
+        with self.assertRaises(ValidationError) as caught:
+            strict.load({'user_id': 2}, partial=True)
+        self.assertIn('user_id', caught.exception.fields)
+
+        with self.assertRaises(ValidationError):
+            self.schema.load(['not', 'an', 'object'])
+
+
+class ValidatedRouteTestCase(unittest.TestCase):
+    """Test case for @validated on the JSON API routes."""
+
+    def setUp(self):
+        self.make_app(TestConfig)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def make_app(self, config):
+        if hasattr(self, 'app_context'):
+            db.session.remove()
+            self.app_context.pop()
+        self.app = create_app(config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client = self.app.test_client()
+        db.create_all()
+
+        @self.app.route('/csrf-token')
+        def csrf_token():
+            return generate_csrf()
+
+    def post_json(self, url, body, **kwargs):
+        return self.client.post(url, data=json.dumps(body), content_type='application/json', **kwargs)
+
+    def test_invalid_dive_lists_fields(self):
+        """Test that a bad dive body returns 400 with a message per field."""
+        user = User(username='testuser', email='test@example.com', firstname='Test',
+                    lastname='User', registration_date=datetime.now(timezone.utc), status='active')
+        user.set_password('Password123')
+        db.session.add(user)
+        db.session.commit()
+        self.post_json('/api/auth/login', {'email': 'test@example.com', 'password': 'Password123'})
+
+        response = self.post_json('/api/dives/', {
+            'start_time': 'yesterday',
+            'end_time': '2025-05-10T10:00:00',
+            'max_depth': 'deep',
+        })
+        self.assertEqual(response.status_code, 400)
+        fields = response.get_json()['fields']
+        self.assertEqual(set(fields), {'start_time', 'max_depth', 'location'})
+
+        response = self.client.post('/api/dives/', data='{not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_shark_warning_choices(self):
+        """Test that shark warnings reject unknown severities and apply defaults."""
+        response = self.post_json('/api/shark-warnings/site/1', {'user_id': 1, 'severity': 'extreme'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('severity', response.get_json()['fields'])
+
+        response = self.post_json('/api/shark-warnings/site/1', {'user_id': 1})
+        self.assertEqual(response.status_code, 201)
+        warning = db.session.get(SharkWarning, response.get_json()['id'])
+        self.assertEqual((warning.severity, warning.status), ('medium', 'active'))
+        self.assertIsNotNone(warning.sighting_time)
+
+    def test_csrf_is_checked_once(self):
+        """Test that a missing token is a JSON 400 and a valid one is not validated again."""
+        self.make_app(type('CSRFConfig', (TestConfig,), {'WTF_CSRF_ENABLED': True}))
+
+        response = self.post_json('/api/shark-warnings/site/1', {'user_id': 1})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json(), {'error': 'Invalid or missing CSRF token'})
+
+        token = self.client.get('/csrf-token').get_data(as_text=True)
+        with mock.patch('app.validation.validate_csrf') as validate:
+            response = self.post_json('/api/shark-warnings/site/1', {'user_id': 1},
+                                      headers={'X-CSRFToken': token})
+        self.assertEqual(response.status_code, 201)
+        validate.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,11 @@
+# WSGI entry point for production servers:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+from werkzeug.middleware.proxy_fix import ProxyFix
+from app import create_app
+
+app = create_app()
+
+# Behind a reverse proxy, take the client address from X-Forwarded-For so
+# rate limits and logs see real clients rather than the proxy
+if app.config['PROXY_FIX_X_FOR']:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'], x_proto=1)